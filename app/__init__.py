@@ -2,30 +2,26 @@
 from .calculator import Calculator
 from .calculator_config import AppConfig
 from .exceptions import HistoryError, PersistenceError, OperationError, ValidationError
-from .logger import init_logging, colorize, LoggingObserver, AutoSaveObserver
+from .logger import init_logging, stop_logging, colorize, set_color, LoggingObserver, AutoSaveObserver
 from .help import BaseHelp, OperationListHelp
 from .command import (
     CommandRegistry, OperationCommand, UndoCommand, RedoCommand,
-    HistoryCommand, ClearCommand, SaveCommand, LoadCommand
+    HistoryCommand, FindCommand, SummaryCommand, ClearCommand, SaveCommand, LoadCommand, ExportCommand, ImportCommand, CacheCommand, EvalCommand, StatsCommand,
+    CheckpointCommand, RollbackCommand, CheckpointsCommand, ObserversCommand,
 )
-from colorama import init as colorama_init
-
-
-def main():  # pragma: no cover
-    """Main entry point for the Advanced Calculator REPL."""
-    # Git Bash (mintty) supports ANSI; do not strip/convert.
-    colorama_init(autoreset=True, strip=False, convert=False)
-
-    cfg = AppConfig.load()
-    init_logging(cfg)
-    calc = Calculator(config=cfg)
-
-    # Observers
-    calc.register_observer(LoggingObserver(cfg))
-    if cfg.auto_save:
-        calc.register_observer(AutoSaveObserver(cfg))
-
-    # ---- Command registry ----
+from .pipe import run_pipe, ERROR_POLICIES
+from .history_view import HistoryView
+from .metrics import METRICS, MetricsExporter
+from .observer_bus import ObserverBus, OVERFLOW_POLICIES
+import sys
+
+
+def build_registry(calc: Calculator, files: bool = True) -> CommandRegistry:
+    """
+    Wire every REPL command to ``calc`` (shared by the REPL, pipe mode and the
+    server). ``files=False`` leaves out the commands that take a path on this
+    machine: save, load, export and import.
+    """
     registry = CommandRegistry()
 
     # Dynamically register all operations from the Factory (Factory Pattern)
@@ -33,26 +29,97 @@ def main():  # pragma: no cover
     for op_name in OperationFactory._registry.keys():
         registry.register(op_name, OperationCommand(op_name, calc.compute))
 
+    registry.register("eval", EvalCommand(calc.evaluate))
+
     # ---- Utility commands ----
     registry.register("undo", UndoCommand(calc.undo))
     registry.register("redo", RedoCommand(calc.redo))
     registry.register(
         "history",
-        HistoryCommand(
-            lambda: [
-                f"{idx+1}. {item.operation}({float(item.a)}, {float(item.b)}) = {item.result} @ {item.timestamp}"
-                for idx, item in enumerate(calc.history.items[: calc.history._cursor + 1])
-            ]
-        ),
+        HistoryCommand(HistoryView(lambda: calc.history), page_size=calc.config.history_page_size),
     )
+    registry.register("find", FindCommand(lambda **kw: calc.history.query(**kw)))
+    registry.register("summary", SummaryCommand(lambda: calc.history.stats()))
     registry.register("clear", ClearCommand(calc.clear_history))
-    registry.register("save", SaveCommand(calc.save_history))
-    registry.register("load", LoadCommand(calc.load_history))
+    if files:
+        registry.register("save", SaveCommand(calc.save_history))
+        registry.register("load", LoadCommand(calc.load_history))
+        registry.register("export", ExportCommand(calc.export_history))
+        registry.register("import", ImportCommand(calc.import_history))
+    registry.register("checkpoint", CheckpointCommand(calc.checkpoint))
+    registry.register("rollback", RollbackCommand(calc.rollback))
+    registry.register("checkpoints", CheckpointsCommand(lambda: calc.checkpoints, calc.checkpoint_memory))
+    registry.register("cache", CacheCommand(lambda: calc.cache))
+    registry.register("stats", StatsCommand())
+    registry.register("observers", ObserversCommand(lambda: calc.observers))
+    return registry
+
+
+def _parse_args(argv, cfg: AppConfig):  # pragma: no cover
+    import argparse
+    parser = argparse.ArgumentParser(prog="python -m app", description="Advanced Calculator")
+    parser.add_argument(
+        "--on-error", choices=ERROR_POLICIES, default=cfg.pipe_error_policy,
+        help="pipe mode: keep going or stop at the first failing command",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:  # pragma: no cover
+    """Main entry point for the Advanced Calculator REPL."""
+    cfg = AppConfig.load()
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["serve"]:
+        from .server import serve_main  # imported on demand to keep REPL startup light
+        return serve_main(argv[1:], cfg)
+    if argv[:1] == ["run-file"]:
+        from .run_file import run_file_main
+        return run_file_main(argv[1:], cfg)
+    args = _parse_args(argv, cfg)
+    interactive = sys.stdin.isatty()
+
+    if interactive:
+        from colorama import init as colorama_init
+        # Git Bash (mintty) supports ANSI; do not strip/convert.
+        colorama_init(autoreset=True, strip=False, convert=False)
+        # The REPL prints each result itself, and the queued console echo
+        # would land after the next prompt: log to the file only.
+        cfg.log_console = False
+    else:
+        set_color(False)
+
+    init_logging(cfg)
+    METRICS.configure(cfg)
+    exporter = MetricsExporter(cfg.metrics_path, cfg.metrics_interval).start() if METRICS.enabled else None
+    calc = Calculator(config=cfg)
+
+    # Observers
+    calc.register_observer(LoggingObserver(cfg))
+    if cfg.auto_save:
+        calc.register_observer(AutoSaveObserver(cfg))
+
+    # ---- Command registry ----
+    registry = build_registry(calc)
 
     # ---- Decorated Help (auto-updates when operations change) ----
     help_view = OperationListHelp(BaseHelp())
 
-    print(colorize("Advanced Calculator REPL. Type 'help' for commands.", "cyan"))
+    try:
+        if not interactive:
+            return run_pipe(registry, help_view, sys.stdin, sys.stdout, sys.stderr,
+                            on_error=args.on_error)
+        print(colorize("Advanced Calculator REPL. Type 'help' for commands.", "cyan"))
+        _repl(registry, help_view)
+        return 0
+    finally:
+        # Flush pending auto-save records on exit/quit, EOF and Ctrl+C alike.
+        calc.close()
+        if exporter is not None:
+            exporter.stop()
+        stop_logging()
+
+
+def _repl(registry, help_view):  # pragma: no cover
     while True:
         try:
             raw = input(colorize("> ", "yellow")).strip()
@@ -78,11 +145,14 @@ def main():  # pragma: no cover
             continue
 
         # Dispatch to command (Command Pattern)
-        command = registry.get(cmd)
-        if command:
-            out = command.execute(parts)
-            if out:
-                print(out)
+        if registry.get(cmd):
+            out = registry.execute(cmd, parts)
+            if isinstance(out, str):
+                if out:
+                    print(out)
+            elif out is not None:
+                for line in out:  # streamed output, e.g. history
+                    print(line)
         else:
             print(colorize(f"Unknown command: {cmd}", "red"))
 
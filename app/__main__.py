@@ -1,3 +1,4 @@
+import sys
 from . import main
 if __name__ == "__main__":  # pragma: no cover
-    main()                  # pragma: no cover
+    sys.exit(main())        # pragma: no cover
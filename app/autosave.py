@@ -0,0 +1,85 @@
+# app/autosave.py
+from __future__ import annotations
+import atexit
+import threading
+import time
+from typing import Callable, Optional
+
+
+class AutoSaveWriter:
+    """
+    Group-commit writer: callers mark the history dirty, a background thread
+    performs one ``flush()`` per ``interval`` seconds or per ``batch_size``
+    dirty marks, whichever comes first. Nothing touches the disk on the
+    caller's thread.
+    """
+
+    def __init__(self, flush: Callable[[], None], interval: float = 1.0, batch_size: int = 100):
+        self._flush = flush
+        self.interval = max(float(interval), 0.0)
+        self.batch_size = max(int(batch_size), 1)
+        self._cond = threading.Condition()
+        self._dirty = 0
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def pending(self) -> int:
+        return self._dirty
+
+    def mark_dirty(self, count: int = 1) -> None:
+        with self._cond:
+            if self._closed:
+                return
+            self._dirty += count
+            if self._thread is None:
+                self._start()
+            if self._dirty == count or self._dirty >= self.batch_size:
+                self._cond.notify()     # wake an idle writer, or flush a full batch
+
+    def _start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name='autosave-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed and not self._dirty:
+                    self._cond.wait()   # idle: nothing to time out for
+                deadline = time.monotonic() + self.interval
+                while not self._closed and self._dirty < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._closed:
+                    return
+                if not self._dirty:
+                    continue
+                self._dirty = 0
+            self._safe_flush()
+
+    def _safe_flush(self) -> None:
+        try:
+            self._flush()
+        except Exception:
+            pass  # best-effort; the next flush retries the pending records
+
+    def flush(self) -> None:
+        """Synchronously write everything pending on the caller's thread."""
+        with self._cond:
+            self._dirty = 0
+        self._flush()
+
+    def close(self) -> None:
+        """Stop the background thread and flush for the last time."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            atexit.unregister(self.close)
+        self.flush()
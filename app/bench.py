@@ -0,0 +1,245 @@
+# app/bench.py
+"""
+Microbenchmarks for the calculator hot paths: ``python -m app.bench``.
+
+Covers Calculator.compute per operation, History push/undo/redo at several
+history sizes, History CSV and binary save/load at 1k/100k/1M rows, input parsing and
+REPL dispatch through CommandRegistry. Results are written as JSON; pass
+``--baseline`` to compare against a stored run and fail on regressions.
+"""
+from __future__ import annotations
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+
+from .calculation import Calculation
+from .calculator import Calculator
+from .calculator_config import AppConfig
+from .history import History
+from .input_validators import parse_two_numbers, validate_number
+from .operations import OperationFactory
+
+DEFAULT_HISTORY_SIZES = (1_000, 100_000, 1_000_000)
+DEFAULT_CSV_ROWS = (1_000, 100_000, 1_000_000)
+QUICK_SIZES = (100, 1_000)
+
+SAFE_ARGS = {
+    "add": (2, 3), "subtract": (5, 2), "multiply": (3, 4), "divide": (8, 2),
+    "power": (2, 10), "root": (27, 3), "modulus": (7, 3), "int_divide": (7, 3),
+    "percent": (10, 50), "abs_diff": (9, 4),
+}
+
+
+@dataclass
+class BenchResult:
+    name: str
+    iterations: int
+    ns_per_op: float        # median over repeats
+    best_ns_per_op: float
+
+    @property
+    def ops_per_sec(self) -> float:
+        return 1e9 / self.ns_per_op if self.ns_per_op else 0.0
+
+
+def measure(name: str, fn: Callable[[int], None], iterations: int, repeats: int = 5) -> BenchResult:
+    """Time ``fn(iterations)`` ``repeats`` times; report per-iteration cost."""
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter_ns()
+        fn(iterations)
+        samples.append((time.perf_counter_ns() - t0) / iterations)
+    return BenchResult(name, iterations, statistics.median(samples), min(samples))
+
+
+def _config(workdir: str) -> AppConfig:
+    return AppConfig(log_dir=os.path.join(workdir, "logs"), history_dir=os.path.join(workdir, "history"),
+                     auto_save=False, cache_enabled=False)
+
+
+def _filled_history(size: int) -> History:
+    h = History(max_size=size)
+    calc = Calculation.create("add", 1, 2, 3.0)
+    h.extend([calc] * size)
+    return h
+
+
+# ---- Cases ----
+def bench_compute(workdir: str, iterations: int, repeats: int) -> List[BenchResult]:
+    calc = Calculator(config=_config(workdir))
+    out = []
+    for op_name in OperationFactory._registry:
+        a, b = SAFE_ARGS.get(op_name, (2, 2))
+
+        def run(n, op_name=op_name, a=a, b=b):
+            compute = calc.compute
+            for _ in range(n):
+                compute(op_name, a, b)
+        out.append(measure(f"compute.{op_name}", run, iterations, repeats))
+    return out
+
+
+def bench_history(sizes: Sequence[int], iterations: int, repeats: int) -> List[BenchResult]:
+    calc = Calculation.create("multiply", 3, 4, 12.0)
+    out = []
+    for size in sizes:
+        h = _filled_history(size)
+
+        def push(n, h=h):
+            for _ in range(n):
+                h.push(calc)
+
+        def undo_redo(n, h=h):
+            for _ in range(n):
+                h.undo()
+                h.redo()
+        out.append(measure(f"history.push@{size}", push, iterations, repeats))
+        out.append(measure(f"history.undo_redo@{size}", undo_redo, iterations, repeats))
+    return out
+
+
+def bench_csv(workdir: str, rows: Sequence[int], repeats: int) -> List[BenchResult]:
+    out = []
+    for n in rows:
+        h = _filled_history(n)
+        path = os.path.join(workdir, f"bench_{n}.csv")
+        target = History(max_size=n)
+        out.append(measure(f"history.save_csv@{n}", lambda _: h.save_csv(path), 1, repeats))
+        out.append(measure(f"history.load_csv@{n}", lambda _: target.load_csv(path), 1, repeats))
+        os.remove(path)
+        path = os.path.join(workdir, f"bench_{n}.chist")
+        out.append(measure(f"history.save_binary@{n}", lambda _: h.save_binary(path), 1, repeats))
+        out.append(measure(f"history.load_binary@{n}", lambda _: target.load_binary(path), 1, repeats))
+        os.remove(path)
+    return out
+
+
+def bench_validators(iterations: int, repeats: int) -> List[BenchResult]:
+    def parse(n):
+        for _ in range(n):
+            parse_two_numbers(["12.5", "7"])
+
+    def validate(n):
+        for _ in range(n):
+            validate_number("123.456")
+    return [measure("input.parse_two_numbers", parse, iterations, repeats),
+            measure("input.validate_number", validate, iterations, repeats)]
+
+
+def bench_dispatch(workdir: str, iterations: int, repeats: int) -> List[BenchResult]:
+    from . import build_registry
+    from .logger import set_color
+    set_color(False)
+    registry = build_registry(Calculator(config=_config(workdir)))
+    parts = "add 2 3".split()
+
+    def dispatch(n):
+        execute = registry.execute
+        for _ in range(n):
+            execute(parts[0], parts)
+    try:
+        return [measure("repl.dispatch", dispatch, iterations, repeats)]
+    finally:
+        set_color(True)
+
+
+def run(history_sizes: Sequence[int] = DEFAULT_HISTORY_SIZES, csv_rows: Sequence[int] = DEFAULT_CSV_ROWS,
+        iterations: int = 20_000, repeats: int = 5) -> Dict[str, BenchResult]:
+    with tempfile.TemporaryDirectory() as workdir:
+        results: List[BenchResult] = []
+        results += bench_compute(workdir, iterations, repeats)
+        results += bench_history(history_sizes, iterations, repeats)
+        results += bench_csv(workdir, csv_rows, repeats)
+        results += bench_validators(iterations, repeats)
+        results += bench_dispatch(workdir, iterations, repeats)
+    return {r.name: r for r in results}
+
+
+# ---- Reporting ----
+def to_json(results: Dict[str, BenchResult]) -> dict:
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": {name: dict(asdict(r), ops_per_sec=r.ops_per_sec) for name, r in results.items()},
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float = 0.10) -> List[dict]:
+    """
+    Compare two JSON reports; returns one row per benchmark present in both.
+    A row is a regression when it got slower by more than ``threshold``.
+    """
+    rows = []
+    base = baseline.get("results", {})
+    for name, cur in current.get("results", {}).items():
+        if name not in base or not base[name]["ns_per_op"]:
+            continue
+        ratio = cur["ns_per_op"] / base[name]["ns_per_op"]
+        rows.append({"name": name, "baseline_ns": base[name]["ns_per_op"], "current_ns": cur["ns_per_op"],
+                     "ratio": ratio, "regression": ratio > 1.0 + threshold})
+    return rows
+
+
+def format_table(report: dict, comparison: Optional[List[dict]] = None) -> str:
+    cmp = {row["name"]: row for row in comparison or []}
+    lines = [f"{'benchmark':<32} {'ns/op':>14} {'ops/s':>14} {'vs base':>9}"]
+    for name, r in report["results"].items():
+        delta = ""
+        if name in cmp:
+            delta = f"{(cmp[name]['ratio'] - 1) * 100:+.1f}%" + (" !" if cmp[name]["regression"] else "")
+        lines.append(f"{name:<32} {r['ns_per_op']:>14,.0f} {r['ops_per_sec']:>14,.0f} {delta:>9}")
+    return "\n".join(lines)
+
+
+def _sizes(text: str) -> List[int]:
+    return [int(float(x)) for x in text.split(",") if x.strip()]
+
+
+def main(argv=None) -> int:  # pragma: no cover
+    import argparse
+    parser = argparse.ArgumentParser(prog="python -m app.bench", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="bench.json", help="where to write the JSON report")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="allowed slowdown before a benchmark counts as a regression (0.10 = 10%%)")
+    parser.add_argument("--history-sizes", type=_sizes, default=list(DEFAULT_HISTORY_SIZES))
+    parser.add_argument("--csv-rows", type=_sizes, default=list(DEFAULT_CSV_ROWS))
+    parser.add_argument("--iterations", type=int, default=20_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--quick", action="store_true", help="small sizes for a smoke run")
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        args.history_sizes = args.csv_rows = list(QUICK_SIZES)
+        args.iterations, args.repeats = 2_000, 3
+
+    report = to_json(run(args.history_sizes, args.csv_rows, args.iterations, args.repeats))
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+
+    comparison = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            comparison = compare(report, json.load(fh), args.threshold)
+    print(format_table(report, comparison))
+    print(f"\nWrote {args.output}")
+
+    regressions = [row["name"] for row in comparison or [] if row["regression"]]
+    if regressions:
+        print(f"Regressions beyond {args.threshold:.0%}: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
@@ -1,14 +1,100 @@
-from dataclasses import dataclass
-from datetime import datetime
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Union
+
+_EPOCH = datetime(1970, 1, 1)
+_US = timedelta(microseconds=1)
+
+
+def _micros_from_iso(ts: str) -> Optional[int]:
+    """Epoch microseconds for the naive UTC ISO strings we write, else None."""
+    # Only the two shapes isoformat() produces round-trip exactly.
+    if len(ts) not in (19, 26) or ts[10] != 'T':
+        return None
+    try:
+        return (datetime.fromisoformat(ts) - _EPOCH) // _US
+    except (ValueError, TypeError):
+        return None
+
 
-@dataclass(frozen=True)
 class Calculation:
-    operation: str
-    a: float
-    b: float
-    result: float
-    timestamp: str
+    """
+    Immutable record of one computation.
+
+    Slotted (no per-instance ``__dict__``), with the operation name interned
+    and the timestamp held as integer epoch microseconds (UTC). ``timestamp``
+    formats it to ISO 8601 on access. Timestamps that are not in our ISO
+    format are kept verbatim.
+    """
+    __slots__ = ('operation', 'a', 'b', 'result', '_ts')
+
+    def __init__(self, operation: str, a: float, b: float, result: float,
+                 timestamp: Union[int, str]):
+        if isinstance(timestamp, str):
+            micros = _micros_from_iso(timestamp)
+            if micros is not None:
+                timestamp = micros
+        _set_op(self, sys.intern(operation))
+        _set_a(self, a)
+        _set_b(self, b)
+        _set_result(self, result)
+        _set_ts(self, timestamp)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"cannot assign to field {name!r}")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"cannot delete field {name!r}")
+
+    def __reduce__(self):
+        return (Calculation, (self.operation, self.a, self.b, self.result, self._ts))
+
+    @property
+    def timestamp(self) -> str:
+        ts = self._ts
+        return ts if isinstance(ts, str) else (_EPOCH + ts * _US).isoformat()
+
+    @property
+    def ts_micros(self) -> Optional[int]:
+        """Epoch microseconds, or None for a verbatim (non-ISO) timestamp."""
+        return None if isinstance(self._ts, str) else self._ts
+
+    def _key(self):
+        return (self.operation, self.a, self.b, self.result, self._ts)
+
+    def __eq__(self, other):
+        if other.__class__ is not Calculation:
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return (f"Calculation(operation={self.operation!r}, a={self.a!r}, b={self.b!r}, "
+                f"result={self.result!r}, timestamp={self.timestamp!r})")
 
     @staticmethod
     def create(operation: str, a: float, b: float, result: float) -> 'Calculation':
-        return Calculation(operation=operation, a=a, b=b, result=result, timestamp=datetime.utcnow().isoformat())
\ No newline at end of file
+        return Calculation(operation, a, b, result, time.time_ns() // 1000)
+
+    @staticmethod
+    def create_many(operation: str, a: Iterable[float], b: Iterable[float],
+                    results: Iterable[float]) -> List['Calculation']:
+        """Bulk variant of create(); the whole batch shares one timestamp."""
+        ts = time.time_ns() // 1000
+        return [Calculation(operation, x, y, r, ts) for x, y, r in zip(a, b, results)]
+
+
+# Slot setters bypass the read-only __setattr__ without going through object.__setattr__.
+_set_op = Calculation.operation.__set__
+_set_a = Calculation.a.__set__
+_set_b = Calculation.b.__set__
+_set_result = Calculation.result.__set__
+_set_ts = Calculation._ts.__set__
+
+# Approximate memory held per history entry: the object, its three floats,
+# its timestamp int and the vector slot pointing at it.
+ENTRY_BYTES = (sys.getsizeof(Calculation('add', 0.5, 0.5, 1.0, 0))
+               + 3 * sys.getsizeof(0.5) + sys.getsizeof(1 << 50) + 8)
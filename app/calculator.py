@@ -1,67 +1,238 @@
 from __future__ import annotations
-from typing import List, Callable
+from collections import OrderedDict
+from typing import List, Tuple
 import math
-import os
+import time
 import logging
-import pandas as pd
 
-from .operations import OperationFactory
+from .operations import OperationFactory, BatchResult
 from .calculation import Calculation
 from .history import History
+from .history_spill import HistorySpill
 from .calculator_memento import CalculatorMemento
-from .exceptions import OperationError, HistoryError, PersistenceError, ValidationError
+from .history_store import HistoryStore, open_store
+from .autosave import AutoSaveWriter
+from .exceptions import OperationError, HistoryError, ValidationError
 from .calculator_config import AppConfig
-from .input_validators import validate_bounds
+from .input_validators import validate_bounds, validate_arrays
+from .result_cache import ResultCache
+from .expression import ExpressionEngine, default_engine
+from .metrics import METRICS
+from .pvector import node_bytes
+from .observer_bus import ObserverBus
 
 class Calculator:
-    def __init__(self, config: AppConfig | None = None):
+    def __init__(self, config: AppConfig | None = None, cache: ResultCache | None = None,
+                 expressions: ExpressionEngine | None = None, observers: ObserverBus | None = None):
         self.config = config or AppConfig.load()
-        self.history = History(max_size=self.config.max_history_size)
-        self._observers: List[Callable[[Calculation], None]] = []
+        # Operations are pure, so results can be memoized (and shared between
+        # calculators by passing the same cache in).
+        if cache is None and self.config.cache_enabled:
+            cache = ResultCache(self.config.cache_max_entries, self.config.cache_max_bytes)
+        self.cache = cache
+        self.expressions = expressions or default_engine()
+        # Entries evicted from memory go to compressed segment files if enabled.
+        self.spill = (HistorySpill.claim(self.config.spill_dir, self.config.history_segment_rows)
+                      if self.config.history_spill else None)
+        self.history = self._new_history()
+        # Named mementos; they share structure with the history, so each is O(1).
+        self.checkpoints: "OrderedDict[str, CalculatorMemento]" = OrderedDict()
+        # Observers run on their own threads; calculators may share one bus.
+        self._owns_observers = observers is None
+        self.observers = observers if observers is not None else ObserverBus.from_config(self.config)
+        # Persistence backend (history file + journal, or SQLite).
+        self.store: HistoryStore = open_store(self.config)
+        self.autosaver = AutoSaveWriter(
+            self.store.flush,
+            interval=self.config.autosave_interval,
+            batch_size=self.config.autosave_batch_size,
+        )
 
-    # Observer registration
-    def register_observer(self, observer) -> None:
-        if hasattr(observer, 'on_new_calculation'):
-            self._observers.append(observer.on_new_calculation)
+    def _new_history(self) -> History:
+        history = History(max_size=self.config.history_capacity)
+        if self.spill is not None:
+            history.attach_spill(self.spill)
+        return history
 
-    def _notify(self, calc: Calculation) -> None:
-        for fn in self._observers:
-            try:
-                fn(calc)
-            except Exception:
-                pass  # observers are best-effort
+    # Observer registration
+    def register_observer(self, observer, overflow: str | None = None) -> None:
+        if hasattr(observer, 'on_new_calculation') or hasattr(observer, 'on_new_calculations'):
+            self.observers.register(observer, overflow)
 
     # Core compute
     def compute(self, op_name: str, a: float, b: float) -> float:
-        validate_bounds(a, b, self.config)
+        phases = METRICS.phases()
+        validate_bounds(a, b, max_value=self.config.max_input_value)
         op = OperationFactory.create(op_name)
-        result = op.execute(a, b)
-        # round to configured precision for display/persistence
-        result = float(round(result, self.config.precision))
+        phases.lap('validate')
+        key = (op_name, a, b, self.config.precision)
+        result = self.cache.get(key) if self.cache is not None else None
+        if result is None:
+            result = op.execute_budgeted(a, b, self.config.max_result_bits)
+            # round to configured precision for display/persistence
+            result = float(round(result, self.config.precision))
+            if self.cache is not None:
+                self.cache.put(key, result)
         calc = Calculation.create(op_name, a, b, result)
         self.history.push(calc)
-        self._notify(calc)
-        if self.config.auto_save:
-            # best-effort save after notify
-            try:
-                self.save_history()
-            except Exception:
-                pass
+        phases.lap('compute')
+        self._autosave('push', [calc])
+        phases.lap('persist')
+        self.observers.publish(calc)
+        phases.lap('notify')
         return result
 
+    def compute_many(self, op_name: str, a_array, b_array) -> BatchResult:
+        """
+        Vectorized compute over operand arrays. Invalid rows (bad input, divide
+        by zero, ...) come back as NaN and are listed in ``BatchResult.errors``
+        instead of aborting the batch. Only the rows that survive history_capacity
+        trimming (unless spilled) are materialized as Calculations, pushed, notified and journaled.
+        """
+        import numpy as np
+        op = OperationFactory.create(op_name)
+        a, b, errors = validate_arrays(a_array, b_array, self.config.max_input_value)
+        if errors:
+            bad = np.zeros(a.shape, dtype=bool)
+            for idx in errors.values():
+                bad[idx] = True
+            ok_idx = np.flatnonzero(~bad)
+            sub = op.execute_many(a.ravel()[ok_idx], b.ravel()[ok_idx])
+            results = np.full(a.shape, np.nan)
+            results.ravel()[ok_idx] = sub.results
+            for message, idx in sub.errors.items():
+                errors[message] = ok_idx[idx]
+        else:
+            batch = op.execute_many(a, b)
+            results, errors = batch.results, batch.errors
+        batch = BatchResult(np.round(results, self.config.precision), errors)
+
+        ok_idx = np.flatnonzero(~batch.error_mask)
+        cap = self.config.history_capacity
+        if self.spill is not None:
+            keep = ok_idx     # rows past the capacity are spilled, not dropped
+        else:
+            keep = ok_idx[-cap:] if cap > 0 else ok_idx[:0]
+        calcs = Calculation.create_many(
+            op_name, a.ravel()[keep].tolist(), b.ravel()[keep].tolist(),
+            batch.results.ravel()[keep].tolist(),
+        )
+        self.record(calcs)
+        return batch
+
+    def record(self, calcs: List[Calculation]) -> None:
+        """Bulk push of finished calculations: history, observers, then the journal."""
+        self.history.extend(calcs)
+        self.observers.publish_many(calcs)
+        self._autosave('push', calcs)
+
+    def record_rows(self, rows) -> None:
+        """record() for (operation, a, b, result) rows computed elsewhere, e.g. by run-file."""
+        ts = time.time_ns() // 1000
+        self.record([Calculation(op, a, b, r, ts) for op, a, b, r in rows])
+
+    def evaluate(self, source: str) -> float:
+        """
+        Evaluate an expression such as ``(2 + 3) ^ 4 / root(81, 4)`` through a
+        compiled plan. Errors surface as ValidationError (syntax) or
+        OperationError (arithmetic), exactly like compute().
+        """
+        value = self.expressions.evaluate(source, self.config.max_input_value)
+        return float(round(value, self.config.precision))
+
     # Undo/redo via memento
     def undo(self) -> None:
         self.history.undo()
+        self._autosave('undo')
 
     def redo(self) -> None:
         self.history.redo()
+        self._autosave('redo')
 
     def clear_history(self) -> None:
-        self.history = History(max_size=self.config.max_history_size)
+        if self.spill is not None:
+            self.spill.clear()
+        self.history = self._new_history()
+        self._autosave('clear')
+
+    # Named checkpoints (mementos)
+    def checkpoint(self, name: str) -> None:
+        self.checkpoints[name] = self.history.save()
+        self.checkpoints.move_to_end(name)
+
+    def rollback(self, name: str) -> None:
+        memento = self.checkpoints.get(name)
+        if memento is None:
+            raise HistoryError(f"No checkpoint named {name!r}.")
+        self.history.restore(memento)
+        if self.config.auto_save:
+            # The journal cannot express a jump, so write a fresh snapshot.
+            self.save_history()
+
+    def checkpoint_memory(self) -> Tuple[int, int]:
+        """
+        (shared, copied) bytes of history structure behind the checkpoints and
+        the live history: what they use together versus as independent copies.
+        """
+        mementos = list(self.checkpoints.values()) + [self.history.save()]
+        return node_bytes(m.items.vector for m in mementos)
 
     # Persistence
+    def _autosave(self, event: str, calcs: List[Calculation] | None = None) -> None:
+        """
+        Buffer the event in the store and let the background writer commit
+        it; cost does not depend on history size and never includes disk I/O.
+        """
+        if not self.config.auto_save or (event in ('push', 'merge') and not calcs):
+            return
+        try:
+            self.store.record(event, self.history, calcs)
+            self.autosaver.mark_dirty(len(calcs) if calcs else 1)
+        except Exception:
+            pass  # best-effort, like the observers
+
+    def flush_history(self) -> None:
+        """Write any auto-save records still buffered for the background writer."""
+        self.autosaver.flush()
+
+    def close(self) -> None:
+        """Deliver pending observer events, then stop the background writer after a final flush."""
+        if self._owns_observers:
+            self.observers.close()
+        self.autosaver.close()
+        self.store.close()
+        if self.spill is not None:
+            self.spill.close()
+
     def save_history(self) -> None:
-        self.history.save_csv(self.config.history_path, encoding=self.config.encoding)
+        self.store.save(self.history)
+
+    def load_history(self, append: bool = False) -> None:
+        """
+        Replace the history with the persisted one; ``append`` instead adds
+        the persisted entries this session does not hold after the current ones.
+        """
+        if append:
+            calcs = self.store.read_new(self.config.history_capacity if self.spill is None
+                                        else self.config.max_history_size)
+            self.history.extend(calcs)
+            self._autosave('merge', calcs)
+            return
+        if self.spill is None:
+            self.store.load(self.history)
+            return
+        # Whatever the load pushes out was spilled by the session that wrote it.
+        with self.spill.paused():
+            self.store.load(self.history)
+
+    def import_history(self, path: str) -> None:
+        """Append the entries of a CSV or binary history file (see export_history)."""
+        h = History(max_size=self.config.max_history_size)
+        h.load_file(path, encoding=self.config.encoding)
+        calcs = list(h)
+        self.history.extend(calcs)
+        self._autosave('push', calcs)
 
-    def load_history(self) -> None:
-        self.history.load_csv(self.config.history_path)
\ No newline at end of file
+    def export_history(self, path: str) -> None:
+        """Write the applied history, spilled entries first, to ``path`` (CSV unless it ends in .chist)."""
+        self.history.save_file(path, encoding=self.config.encoding, spilled=True)
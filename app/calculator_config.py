@@ -1,6 +1,7 @@
 import os
 from dataclasses import dataclass
-from dotenv import load_dotenv
+
+MIN_AUTOSAVE_INTERVAL = 0.01    # seconds; CALCULATOR_AUTOSAVE_INTERVAL is clamped to it
 
 @dataclass
 class AppConfig:
@@ -10,14 +11,72 @@ class AppConfig:
     auto_save: bool = True
     precision: int = 6
     max_input_value: float = 1e12
+    max_result_bits: int = 64
     encoding: str = 'utf-8'
     log_file: str = 'calculator.log'
+    log_max_bytes: int = 10 * 1024 * 1024
+    log_backup_count: int = 5
+    log_rotate_when: str = ''
+    log_console: bool = True
+    log_flush_interval: float = 0.05
     history_file: str = 'history.csv'
+    history_format: str = 'auto'
+    history_backend: str = 'file'
+    history_db: str = 'history.db'
+    history_mmap_threshold: int = 64 * 1024 * 1024
+    history_page_size: int = 20
+    history_spill: bool = False
+    history_max_bytes: int = 0
+    history_segment_rows: int = 10000
+    journal_compact_threshold: int = 10000
+    autosave_interval: float = 1.0
+    autosave_batch_size: int = 100
+    pipe_error_policy: str = 'continue'
+    cache_enabled: bool = False
+    cache_max_entries: int = 10000
+    cache_max_bytes: int = 8 * 1024 * 1024
+    metrics_enabled: bool = False
+    metrics_interval: float = 15.0
+    metrics_file: str = 'calculator.prom'
+    server_idle_timeout: float = 300.0
+    server_drain_timeout: float = 10.0
+    server_max_sessions: int = 1000
+    run_file_workers: int = 0
+    run_file_chunk_bytes: int = 4 * 1024 * 1024
+    observer_queue_size: int = 1024
+    observer_overflow: str = 'drop-oldest'
 
     @property
     def history_path(self) -> str:
         return os.path.join(self.history_dir, self.history_file)
 
+    @property
+    def history_db_path(self) -> str:
+        return os.path.join(self.history_dir, self.history_db)
+
+    @property
+    def metrics_path(self) -> str:
+        return os.path.join(self.log_dir, self.metrics_file)
+
+    @property
+    def spill_dir(self) -> str:
+        return os.path.join(self.history_dir, 'segments')
+
+    @property
+    def history_capacity(self) -> int:
+        """
+        Entries kept in memory: max_history_size, lowered to fit
+        history_max_bytes when spilling (without a spill that would drop history).
+        """
+        if not self.history_spill or self.history_max_bytes <= 0:
+            return self.max_history_size
+        from .calculation import ENTRY_BYTES
+        return min(self.max_history_size, max(self.history_max_bytes // ENTRY_BYTES, 1))
+
+    @property
+    def journal_path(self) -> str:
+        return self.history_path + '.journal'
+
     def ensure_dirs(self):
         os.makedirs(self.log_dir, exist_ok=True)
         os.makedirs(self.history_dir, exist_ok=True)
@@ -30,6 +89,7 @@ class AppConfig:
 
     @classmethod
     def load(cls) -> 'AppConfig':
+        from dotenv import load_dotenv  # imported on demand to keep startup light
         load_dotenv(override=False)
         cfg = cls(
             log_dir=os.getenv('CALCULATOR_LOG_DIR','logs'),
@@ -38,9 +98,40 @@ class AppConfig:
             auto_save=cls._parse_bool(os.getenv('CALCULATOR_AUTO_SAVE','true')),
             precision=int(float(os.getenv('CALCULATOR_PRECISION','6'))),
             max_input_value=float(os.getenv('CALCULATOR_MAX_INPUT_VALUE','1e12')),
+            max_result_bits=int(float(os.getenv('CALCULATOR_MAX_RESULT_BITS','64'))),
             encoding=os.getenv('CALCULATOR_DEFAULT_ENCODING','utf-8'),
             log_file=os.getenv('CALCULATOR_LOG_FILE','calculator.log'),
+            log_max_bytes=int(float(os.getenv('CALCULATOR_LOG_MAX_BYTES', str(10 * 1024 * 1024)))),
+            log_backup_count=int(float(os.getenv('CALCULATOR_LOG_BACKUP_COUNT','5'))),
+            log_rotate_when=os.getenv('CALCULATOR_LOG_ROTATE_WHEN','').strip(),
+            log_console=cls._parse_bool(os.getenv('CALCULATOR_LOG_CONSOLE','true')),
+            log_flush_interval=float(os.getenv('CALCULATOR_LOG_FLUSH_INTERVAL','0.05')),
             history_file=os.getenv('CALCULATOR_HISTORY_FILE','history.csv'),
+            history_format=os.getenv('CALCULATOR_HISTORY_FORMAT','auto').strip().lower(),
+            history_backend=os.getenv('CALCULATOR_HISTORY_BACKEND','file').strip().lower(),
+            history_db=os.getenv('CALCULATOR_HISTORY_DB','history.db'),
+            history_page_size=int(float(os.getenv('CALCULATOR_HISTORY_PAGE_SIZE','20'))),
+            history_mmap_threshold=int(float(os.getenv('CALCULATOR_HISTORY_MMAP_THRESHOLD', str(64 * 1024 * 1024)))),
+            history_spill=cls._parse_bool(os.getenv('CALCULATOR_HISTORY_SPILL','false')),
+            history_max_bytes=int(float(os.getenv('CALCULATOR_HISTORY_MAX_BYTES','0'))),
+            history_segment_rows=int(float(os.getenv('CALCULATOR_HISTORY_SEGMENT_ROWS','10000'))),
+            journal_compact_threshold=int(float(os.getenv('CALCULATOR_JOURNAL_COMPACT_THRESHOLD','10000'))),
+            autosave_interval=max(float(os.getenv('CALCULATOR_AUTOSAVE_INTERVAL','1.0')), MIN_AUTOSAVE_INTERVAL),
+            autosave_batch_size=int(float(os.getenv('CALCULATOR_AUTOSAVE_BATCH_SIZE','100'))),
+            pipe_error_policy=os.getenv('CALCULATOR_PIPE_ERROR_POLICY','continue').strip().lower(),
+            cache_enabled=cls._parse_bool(os.getenv('CALCULATOR_CACHE_ENABLED','false')),
+            cache_max_entries=int(float(os.getenv('CALCULATOR_CACHE_MAX_ENTRIES','10000'))),
+            cache_max_bytes=int(float(os.getenv('CALCULATOR_CACHE_MAX_BYTES', str(8 * 1024 * 1024)))),
+            metrics_enabled=cls._parse_bool(os.getenv('CALCULATOR_METRICS_ENABLED','false')),
+            metrics_interval=float(os.getenv('CALCULATOR_METRICS_INTERVAL','15')),
+            metrics_file=os.getenv('CALCULATOR_METRICS_FILE','calculator.prom'),
+            server_idle_timeout=float(os.getenv('CALCULATOR_SERVER_IDLE_TIMEOUT','300')),
+            server_drain_timeout=float(os.getenv('CALCULATOR_SERVER_DRAIN_TIMEOUT','10')),
+            server_max_sessions=int(float(os.getenv('CALCULATOR_SERVER_MAX_SESSIONS','1000'))),
+            run_file_workers=int(float(os.getenv('CALCULATOR_RUN_FILE_WORKERS','0'))),
+            run_file_chunk_bytes=int(float(os.getenv('CALCULATOR_RUN_FILE_CHUNK_BYTES', str(4 * 1024 * 1024)))),
+            observer_queue_size=int(float(os.getenv('CALCULATOR_OBSERVER_QUEUE_SIZE','1024'))),
+            observer_overflow=os.getenv('CALCULATOR_OBSERVER_OVERFLOW','drop-oldest').strip().lower(),
         )
         cfg.ensure_dirs()
         return cfg
\ No newline at end of file
@@ -1,10 +1,22 @@
 # app/command.py
 from __future__ import annotations
 from abc import ABC, abstractmethod
+from datetime import datetime
+import math
+import re
+import time
 from typing import Callable, Dict, Optional, Tuple
 from .exceptions import ValidationError, HistoryError, PersistenceError, OperationError
 from .input_validators import parse_two_numbers
+from .history_view import format_entry
 from .logger import colorize
+from .metrics import METRICS
+
+class ErrorOutput(str):
+    """Command output that reports a failure (lets pipe mode count errors)."""
+
+def error(message: str) -> ErrorOutput:
+    return ErrorOutput(colorize(message, "red"))
 
 class Command(ABC):
     """Encapsulate a REQ with execute()."""
@@ -21,6 +33,20 @@ class CommandRegistry:
     def get(self, name: str) -> Optional[Command]:
         return self._registry.get(name)
 
+    def execute(self, name: str, line_parts: list[str]) -> Optional[str]:
+        """Run command ``name``; records count/errors/latency when metrics are on."""
+        cmd = self._registry[name]
+        if not METRICS.enabled:
+            return cmd.execute(line_parts)
+        started = time.perf_counter()
+        try:
+            out = cmd.execute(line_parts)
+        except BaseException:
+            METRICS.observe_command(name, time.perf_counter() - started, error=True)
+            raise
+        METRICS.observe_command(name, time.perf_counter() - started, error=isinstance(out, ErrorOutput))
+        return out
+
     @property
     def names(self):
         return sorted(self._registry.keys())
@@ -41,9 +67,23 @@ class OperationCommand(Command):
             # Normalize operands to floats so tests see 2.0, 3.0 etc.
             return colorize(f"{self.op_name}({float(a)}, {float(b)}) = {result}", "green")
         except (ValidationError, OperationError) as e:
-            return colorize(str(e), "red")
+            return error(str(e))
         except Exception as e:  # pragma: no cover (defensive)
-            return colorize(str(e), "red")
+            return error(str(e))
+
+class EvalCommand(Command):
+    """Wraps calculator.evaluate(expression) for `eval <expression>`."""
+    def __init__(self, evaluate: Callable[[str], float]):
+        self._evaluate = evaluate
+
+    def execute(self, line_parts: list[str]) -> str:
+        source = " ".join(line_parts[1:])
+        if not source:
+            return error("Usage: eval <expression>")
+        try:
+            return colorize(f"{source} = {self._evaluate(source)}", "green")
+        except (ValidationError, OperationError) as e:
+            return error(str(e))
 
 class UndoCommand(Command):
     def __init__(self, undo: Callable[[], None]):
@@ -53,7 +93,7 @@ class UndoCommand(Command):
             self._undo()
             return colorize("Undo completed.", "green")
         except HistoryError as e:
-            return colorize(str(e), "red")
+            return error(str(e))
 
 class RedoCommand(Command):
     def __init__(self, redo: Callable[[], None]):
@@ -63,14 +103,173 @@ class RedoCommand(Command):
             self._redo()
             return colorize("Redo completed.", "green")
         except HistoryError as e:
-            return colorize(str(e), "red")
+            return error(str(e))
 
 class HistoryCommand(Command):
-    def __init__(self, iter_history: Callable[[], list[str]]):
+    """
+    `history [--last N] [--offset K] [--page]`. Given a HistoryView, only the
+    requested window is formatted and it is returned as a line generator;
+    `--page` shows ``page_size`` lines and the next `history --page`
+    continues where it stopped. A plain callable returning all lines still works.
+    """
+    USAGE = "Usage: history [--last N] [--offset K] [--page]"
+
+    def __init__(self, iter_history: Callable[[], list[str]], page_size: int = 20):
         self._iter = iter_history
-    def execute(self, _: list[str]) -> str:
-        items = self._iter()
-        return "\n".join(items) if items else colorize("(empty)", "yellow")
+        self.page_size = max(page_size, 1)
+        self._next_page: Optional[Tuple[Tuple[int, int], int]] = None  # (window, next start)
+
+    @classmethod
+    def _parse(cls, args: list[str]):
+        last, offset, page = None, 0, False
+        it = iter(args)
+        for arg in it:
+            if arg == "--page":
+                page = True
+            elif arg in ("--last", "--offset"):
+                try:
+                    value = int(next(it))
+                except (StopIteration, ValueError):
+                    raise ValidationError(cls.USAGE)
+                if value < 0:
+                    raise ValidationError(cls.USAGE)
+                if arg == "--last":
+                    last = value
+                else:
+                    offset = value
+            else:
+                raise ValidationError(cls.USAGE)
+        return last, offset, page
+
+    def execute(self, line_parts: list[str]):
+        if not hasattr(self._iter, "lines"):
+            items = self._iter()
+            return "\n".join(items) if items else colorize("(empty)", "yellow")
+        try:
+            last, offset, page = self._parse(line_parts[1:])
+        except ValidationError as e:
+            return error(str(e))
+        view = self._iter
+        window = start, stop = view.window(last, offset)
+        if start >= stop:
+            return colorize("(empty)", "yellow")
+        if not page:
+            self._next_page = None
+            return view.lines(start, stop)
+        if self._next_page and self._next_page[0] == window:
+            start = self._next_page[1]
+        end = min(start + self.page_size, stop)
+        self._next_page = (window, end) if end < stop else None
+        more = "'history --page' for more" if end < stop else "end"
+        footer = colorize(f"-- {start + 1}-{end} of {len(view)} ({more}) --", "cyan")
+        return self._page(view.lines(start, end), footer)
+
+    @staticmethod
+    def _page(lines, footer: str):
+        yield from lines
+        yield footer
+
+class FindCommand(Command):
+    """
+    `find [op] [field<op>value ...] [since=..] [until=..] [sort=..] [limit=N]`:
+    filtered history lookup through ``History.query``. Fields are ``a``,
+    ``b`` and ``result`` with ``= < <= > >=``; ``since``/``until`` take an
+    age (``30s``, ``15m``, ``1h``, ``2d``) or an ISO time (UTC).
+    """
+    USAGE = ("Usage: find [operation] [a|b|result(<|<=|=|>=|>)N ...] [since=1h] [until=ISO] "
+             "[sort=index|result|time (prefix - to reverse)] [limit=N]")
+    _TOKEN = re.compile(r"^(op|a|b|result|since|until|sort|limit)(>=|<=|=|>|<)(.+)$")
+    _AGE = re.compile(r"^(\d+(?:\.\d+)?)([smhd])$")
+    _UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+    def __init__(self, query: Callable[..., list]):
+        self._query = query
+
+    @classmethod
+    def _when(cls, value: str, now: float) -> float:
+        age = cls._AGE.match(value)
+        if age:
+            return now - float(age.group(1)) * cls._UNITS[age.group(2)]
+        try:
+            dt = datetime.fromisoformat(value)
+        except ValueError:
+            raise ValidationError(f"Not a time or age: {value!r}")
+        if dt.tzinfo is None:
+            return (dt - datetime(1970, 1, 1)).total_seconds()
+        return dt.timestamp()
+
+    @classmethod
+    def _parse(cls, args: list[str], now: float) -> dict:
+        kw: dict = {}
+        for arg in args:
+            m = cls._TOKEN.match(arg)
+            if m is None:
+                if not arg.isidentifier() or "operation" in kw:
+                    raise ValidationError(cls.USAGE)
+                kw["operation"] = arg.lower()
+                continue
+            field, cmp, value = m.groups()
+            if field in ("op", "sort", "limit", "since", "until") and cmp != "=":
+                raise ValidationError(cls.USAGE)
+            if field == "op":
+                kw["operation"] = value.lower()
+            elif field == "sort":
+                kw["sort"] = value.lower()
+            elif field == "limit":
+                if not value.isdigit():
+                    raise ValidationError(cls.USAGE)
+                kw["limit"] = int(value)
+            elif field in ("since", "until"):
+                kw[field] = cls._when(value, now)
+            else:
+                try:
+                    x = float(value)
+                except ValueError:
+                    raise ValidationError(f"Not a valid number: {value!r}")
+                lo, hi = kw.get(field) or (None, None)
+                if cmp in ("=", ">=", ">"):
+                    x_lo = math.nextafter(x, math.inf) if cmp == ">" else x
+                    lo = x_lo if lo is None else max(lo, x_lo)
+                if cmp in ("=", "<=", "<"):
+                    x_hi = math.nextafter(x, -math.inf) if cmp == "<" else x
+                    hi = x_hi if hi is None else min(hi, x_hi)
+                kw[field] = (lo, hi)
+        return kw
+
+    def execute(self, line_parts: list[str]):
+        try:
+            matches = self._query(**self._parse(line_parts[1:], time.time()))
+        except ValidationError as e:
+            return error(str(e))
+        except ValueError as e:   # unknown sort key
+            return error(str(e))
+        if not matches:
+            return colorize("(no matches)", "yellow")
+        return (f"{i + 1}. {format_entry(calc)}" for i, calc in matches)
+
+class SummaryCommand(Command):
+    """`summary` shows result statistics, overall and per operation (``History.stats``)."""
+    _FIELDS = ("sum", "mean", "std", "min", "p50", "p90", "p99", "max")
+
+    def __init__(self, get_stats: Callable[[], object]):
+        self._get_stats = get_stats
+
+    @classmethod
+    def _row(cls, name: str, st) -> str:
+        cells = ["-" if (v := getattr(st, f)) is None else f"{v:.6g}" for f in cls._FIELDS]
+        return f"{name:<12} {st.count:>9,} " + " ".join(f"{c:>11}" for c in cells)
+
+    def execute(self, line_parts: list[str]) -> str:
+        if len(line_parts) > 1:
+            return error("Usage: summary")
+        summary = self._get_stats()
+        if not summary.overall.count:
+            return colorize("(no results)", "yellow")
+        lines = [f"{'operation':<12} {'count':>9} " + " ".join(f"{f:>11}" for f in self._FIELDS)]
+        lines.extend(self._row(op, st) for op, st in summary.by_operation.items())
+        lines.append(colorize(self._row("(all)", summary.overall), "cyan"))
+        lines.append("p50/p90/p99 are approximate (within 1%).")
+        return "\n".join(lines)
 
 class ClearCommand(Command):
     def __init__(self, clear: Callable[[], None]):
@@ -87,14 +286,147 @@ class SaveCommand(Command):
             self._save()
             return colorize("History saved.", "green")
         except PersistenceError as e:
-            return colorize(str(e), "red")
+            return error(str(e))
 
 class LoadCommand(Command):
-    def __init__(self, load: Callable[[], None]):
+    """`load [--append]`: replace the history with the saved one, or append what it does not hold yet."""
+    def __init__(self, load: Callable[..., None]):
         self._load = load
-    def execute(self, _: list[str]) -> str:
+    def execute(self, line_parts: list[str]) -> str:
+        args = line_parts[1:]
+        if args not in ([], ["--append"]):
+            return error("Usage: load [--append]")
         try:
+            if args:
+                self._load(append=True)
+                return colorize("History merged.", "green")
             self._load()
             return colorize("History loaded.", "green")
         except PersistenceError as e:
-            return colorize(str(e), "red")
+            return error(str(e))
+
+class ExportCommand(Command):
+    """`export <path>` writes the history as CSV (or binary for *.chist)."""
+    def __init__(self, export: Callable[[str], None]):
+        self._export = export
+    def execute(self, line_parts: list[str]) -> str:
+        if len(line_parts) != 2:
+            return error("Usage: export <path>")
+        try:
+            self._export(line_parts[1])
+            return colorize(f"History exported to {line_parts[1]}.", "green")
+        except PersistenceError as e:
+            return error(str(e))
+
+
+class ImportCommand(Command):
+    """`import <path>` appends the entries of a CSV (or binary *.chist) history file."""
+    def __init__(self, import_: Callable[[str], None]):
+        self._import = import_
+    def execute(self, line_parts: list[str]) -> str:
+        if len(line_parts) != 2:
+            return error("Usage: import <path>")
+        try:
+            self._import(line_parts[1])
+            return colorize(f"History imported from {line_parts[1]}.", "green")
+        except PersistenceError as e:
+            return error(str(e))
+
+
+class CheckpointCommand(Command):
+    """`checkpoint <name>` saves an O(1) snapshot of the history."""
+    def __init__(self, checkpoint: Callable[[str], None]):
+        self._checkpoint = checkpoint
+    def execute(self, line_parts: list[str]) -> str:
+        if len(line_parts) != 2:
+            return error("Usage: checkpoint <name>")
+        self._checkpoint(line_parts[1])
+        return colorize(f"Checkpoint '{line_parts[1]}' saved.", "green")
+
+
+class RollbackCommand(Command):
+    """`rollback <name>` restores the history saved by `checkpoint <name>`."""
+    def __init__(self, rollback: Callable[[str], None]):
+        self._rollback = rollback
+    def execute(self, line_parts: list[str]) -> str:
+        if len(line_parts) != 2:
+            return error("Usage: rollback <name>")
+        try:
+            self._rollback(line_parts[1])
+            return colorize(f"Rolled back to '{line_parts[1]}'.", "green")
+        except (HistoryError, PersistenceError) as e:
+            return error(str(e))
+
+
+class CheckpointsCommand(Command):
+    """`checkpoints` lists checkpoints and how much history structure they share."""
+    def __init__(self, get_checkpoints: Callable[[], dict], memory: Callable[[], Tuple[int, int]]):
+        self._get_checkpoints = get_checkpoints
+        self._memory = memory
+    def execute(self, _: list[str]) -> str:
+        checkpoints = self._get_checkpoints()
+        if not checkpoints:
+            return colorize("(no checkpoints)", "yellow")
+        lines = [colorize("Checkpoints:", "cyan")]
+        for name, m in checkpoints.items():
+            lines.append(f"  {name:<16} {len(m.items):>10,} entries (at {m.index + 1:,})")
+        shared, copied = self._memory()
+        saved = 1 - shared / copied if copied else 0.0
+        lines.append(f"  memory: {shared / 1024:.1f} KiB with sharing, "
+                     f"{copied / 1024:.1f} KiB as copies ({saved:.0%} shared)")
+        return "\n".join(lines)
+
+
+class CacheCommand(Command):
+    """`cache` shows result-cache stats; `cache clear` empties it."""
+    def __init__(self, get_cache: Callable[[], object]):
+        self._get_cache = get_cache
+    def execute(self, line_parts: list[str]) -> str:
+        cache = self._get_cache()
+        if cache is None:
+            return colorize("Result cache is disabled (set CALCULATOR_CACHE_ENABLED=true).", "yellow")
+        sub = line_parts[1].lower() if len(line_parts) > 1 else ""
+        if sub == "clear":
+            cache.clear()
+            return colorize("Result cache cleared.", "green")
+        if sub:
+            return error("Usage: cache [clear]")
+        st = cache.stats()
+        return "\n".join([
+            colorize("Result cache:", "cyan"),
+            f"  hits       {st.hits}",
+            f"  misses     {st.misses}",
+            f"  hit rate   {st.hit_rate:.1%}",
+            f"  evictions  {st.evictions}",
+            f"  entries    {st.entries} / {st.max_entries}",
+            f"  memory     {st.bytes / 1024:.1f} KiB / {st.max_bytes / 1024:.1f} KiB",
+        ])
+
+
+class ObserversCommand(Command):
+    """`observers` shows per-observer delivery, drop and latency counters."""
+    def __init__(self, get_bus: Callable[[], object]):
+        self._get_bus = get_bus
+    def execute(self, line_parts: list[str]) -> str:
+        if len(line_parts) > 1:
+            return error("Usage: observers")
+        bus = self._get_bus()
+        if not len(bus):
+            return colorize("(no observers)", "yellow")
+        return bus.render_text()
+
+
+class StatsCommand(Command):
+    """`stats` shows per-command latency metrics; `stats reset` zeroes them."""
+    def __init__(self, metrics=METRICS):
+        self._metrics = metrics
+    def execute(self, line_parts: list[str]) -> str:
+        if not self._metrics.enabled:
+            return colorize("Metrics are disabled (set CALCULATOR_METRICS_ENABLED=true).", "yellow")
+        sub = line_parts[1].lower() if len(line_parts) > 1 else ""
+        if sub == "reset":
+            self._metrics.reset()
+            return colorize("Metrics reset.", "green")
+        if sub:
+            return error("Usage: stats [reset]")
+        return self._metrics.render_text()
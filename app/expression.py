@@ -0,0 +1,258 @@
+# app/expression.py
+"""
+Expression engine for the ``eval`` command, e.g. ``eval (2 + 3) ^ 4 / root(81, 4)``.
+
+Source text is tokenized and reduced to a *shape*: the token stream with every
+numeric literal replaced by a parameter slot. The shape is parsed once into an
+AST over the existing ``Operation`` classes, constant sub-trees (named
+constants like ``pi``) are folded, and the result is compiled into a closure
+that takes the literal values. Plans are cached by shape, so re-evaluating
+``(2 + 3) ^ 4`` as ``(7 + 1) ^ 2`` skips parsing and compilation entirely.
+"""
+from __future__ import annotations
+import math
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+from .exceptions import OperationError, ValidationError
+from .input_validators import validate_number
+from .operations import Operation, OperationFactory
+
+Number = Union[int, float]
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<num>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+      | (?P<op>\*\*|//|[-+*/%^(),])
+      | (?P<name>[A-Za-z_]\w*)
+      | (?P<bad>\S)
+    )""", re.VERBOSE)
+
+BINARY_OPERATORS = {
+    "+": "add", "-": "subtract", "*": "multiply", "/": "divide",
+    "^": "power", "**": "power", "%": "modulus", "//": "int_divide",
+}
+CONSTANTS = {"pi": math.pi, "e": math.e, "tau": math.tau}
+
+
+# ---- AST ----
+@dataclass(frozen=True)
+class Param:
+    index: int
+
+@dataclass(frozen=True)
+class Const:
+    value: Number
+
+@dataclass(frozen=True)
+class Neg:
+    operand: "Node"
+
+@dataclass(frozen=True)
+class Apply:
+    op_name: str
+    left: "Node"
+    right: "Node"
+
+Node = Union[Param, Const, Neg, Apply]
+
+
+def tokenize(source: str, max_value: Optional[float] = None) -> Tuple[str, List[Number]]:
+    """
+    Split ``source`` into (shape, literal values); numbers become '#'.
+    Literals above ``max_value`` in magnitude are rejected like compute() inputs.
+    """
+    shape: List[str] = []
+    params: List[Number] = []
+    pos, end = 0, len(source.rstrip())
+    while pos < end:
+        m = _TOKEN.match(source, pos)
+        pos = m.end()
+        if m.group("num") is not None:
+            value = validate_number(m.group("num"))
+            if isinstance(value, float) and not math.isfinite(value):
+                raise ValidationError(f"Number out of range: {m.group('num')!r}")
+            if max_value is not None and value > max_value:    # literals are never negative
+                raise ValidationError(f"Input exceeds maximum allowed value of {max_value:g}.")
+            params.append(value)
+            shape.append("#")
+        elif m.group("op") is not None:
+            shape.append(m.group("op"))
+        elif m.group("name") is not None:
+            shape.append(m.group("name").lower())
+        else:
+            raise ValidationError(f"Unexpected character {m.group('bad')!r} in expression.")
+    if not shape:
+        raise ValidationError("Empty expression.")
+    return " ".join(shape), params
+
+
+class _Parser:
+    """Recursive-descent parser over a shape's tokens (precedence climbing)."""
+
+    def __init__(self, tokens: Sequence[str]):
+        self.tokens = tokens
+        self.pos = 0
+        self.params = 0
+
+    def parse(self) -> Node:
+        node = self.expr()
+        if self.pos != len(self.tokens):
+            raise ValidationError(f"Unexpected token {self.tokens[self.pos]!r} in expression.")
+        return node
+
+    def peek(self) -> str | None:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self, expected: str | None = None) -> str:
+        tok = self.peek()
+        if tok is None or (expected is not None and tok != expected):
+            want = repr(expected) if expected else "more input"
+            raise ValidationError(f"Expected {want} in expression.")
+        self.pos += 1
+        return tok
+
+    def expr(self) -> Node:
+        node = self.term()
+        while self.peek() in ("+", "-"):
+            node = Apply(BINARY_OPERATORS[self.take()], node, self.term())
+        return node
+
+    def term(self) -> Node:
+        node = self.unary()
+        while self.peek() in ("*", "/", "%", "//"):
+            node = Apply(BINARY_OPERATORS[self.take()], node, self.unary())
+        return node
+
+    def unary(self) -> Node:
+        if self.peek() in ("-", "+"):
+            return Neg(self.unary()) if self.take() == "-" else self.unary()
+        return self.power()
+
+    def power(self) -> Node:
+        base = self.atom()
+        if self.peek() in ("^", "**"):
+            self.take()
+            return Apply("power", base, self.unary())  # right-associative
+        return base
+
+    def atom(self) -> Node:
+        tok = self.take()
+        if tok == "#":
+            self.params += 1
+            return Param(self.params - 1)
+        if tok == "(":
+            node = self.expr()
+            self.take(")")
+            return node
+        if tok in CONSTANTS:
+            return Const(CONSTANTS[tok])
+        if tok in OperationFactory._registry:
+            self.take("(")
+            left = self.expr()
+            self.take(",")
+            right = self.expr()
+            self.take(")")
+            return Apply(tok, left, right)
+        raise ValidationError(f"Unknown name or token {tok!r} in expression.")
+
+
+# ---- Compilation ----
+Plan = Callable[[Sequence[Number]], Number]
+
+
+def _checked(value: Number) -> Number:
+    """Every sub-result must be a finite real number."""
+    if isinstance(value, complex):
+        raise OperationError("Result is not a real number.")
+    if isinstance(value, float) and not math.isfinite(value):
+        raise OperationError("Result is not a finite number.")
+    return value
+
+
+def fold(node: Node) -> Node:
+    """Fold sub-trees without parameters into constants (errors stay at runtime)."""
+    if isinstance(node, Neg):
+        inner = fold(node.operand)
+        return Const(-inner.value) if isinstance(inner, Const) else Neg(inner)
+    if isinstance(node, Apply):
+        left, right = fold(node.left), fold(node.right)
+        if isinstance(left, Const) and isinstance(right, Const):
+            try:
+                return Const(_checked(OperationFactory.create(node.op_name).execute_budgeted(left.value, right.value)))
+            except (OperationError, ArithmeticError):
+                pass
+        return Apply(node.op_name, left, right)
+    return node
+
+
+def compile_node(node: Node) -> Plan:
+    if isinstance(node, Param):
+        i = node.index
+        return lambda p: p[i]
+    if isinstance(node, Const):
+        v = node.value
+        return lambda p: v
+    if isinstance(node, Neg):
+        f = compile_node(node.operand)
+        return lambda p: -f(p)
+    op: Operation = OperationFactory.create(node.op_name)
+    fl, fr = compile_node(node.left), compile_node(node.right)
+
+    def apply(p):
+        try:
+            return _checked(op.execute_budgeted(fl(p), fr(p)))
+        except (OverflowError, ZeroDivisionError) as e:
+            raise OperationError(str(e))
+    return apply
+
+
+@dataclass(frozen=True)
+class CompiledExpression:
+    shape: str
+    ast: Node
+    run: Plan
+
+
+class ExpressionEngine:
+    """Parses, folds and compiles expressions; keeps an LRU of plans by shape."""
+
+    def __init__(self, max_plans: int = 256):
+        self.max_plans = max_plans
+        self._plans: "OrderedDict[str, CompiledExpression]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.compiled = 0
+        self.reused = 0
+
+    def compile(self, shape: str) -> CompiledExpression:
+        with self._lock:
+            plan = self._plans.get(shape)
+            if plan is not None:
+                self._plans.move_to_end(shape)
+                self.reused += 1
+                return plan
+        ast = fold(_Parser(shape.split()).parse())
+        plan = CompiledExpression(shape, ast, compile_node(ast))
+        with self._lock:
+            self._plans[shape] = plan
+            self.compiled += 1
+            while len(self._plans) > self.max_plans:
+                self._plans.popitem(last=False)
+        return plan
+
+    def evaluate(self, source: str, max_value: Optional[float] = None) -> Number:
+        shape, params = tokenize(source, max_value)
+        return self.compile(shape).run(params)
+
+
+_default_engine: ExpressionEngine | None = None
+
+
+def default_engine() -> ExpressionEngine:
+    """Process-wide engine so every calculator shares one plan cache."""
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = ExpressionEngine()
+    return _default_engine
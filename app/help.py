@@ -10,16 +10,31 @@ class HelpComponent(ABC):
     def render(self) -> str: ...
 
 class BaseHelp(HelpComponent):
-    """Static core help (non-operation commands)."""
+    """Static core help (non-operation commands); ``files=False`` omits save/load/export/import."""
+    def __init__(self, files: bool = True):
+        self.files = files
+
     def render(self) -> str:
+        file_commands = (
+            "  save     - Save calculation history to CSV\n"
+            "  load     - Load calculation history from CSV (--append merges it into the current one)\n"
+            "  export   - Export history to a file ('export out.csv')\n"
+            "  import   - Append the entries of a history file ('import old.csv')\n"
+        ) if self.files else ""
         core = (
             f"{colorize('Core commands:', 'cyan')}\n"
-            "  history  - Show calculation history\n"
+            "  history  - Show calculation history [--last N] [--offset K] [--page]\n"
+            "  find     - Search history ('find divide result>1e6 since=1h sort=-result limit=10')\n"
+            "  summary  - Show count, sum, mean, std, min/max and p50/p90/p99 of results per operation\n"
             "  clear    - Clear calculation history\n"
             "  undo     - Undo last calculation\n"
             "  redo     - Redo last undone calculation\n"
-            "  save     - Save calculation history to CSV\n"
-            "  load     - Load calculation history from CSV\n"
+            f"{file_commands}"
+            "  checkpoint <name> / rollback <name> - Save or return to a named snapshot\n"
+            "  checkpoints - List checkpoints and the memory they share\n"
+            "  cache    - Show result-cache stats ('cache clear' empties it)\n"
+            "  stats    - Show per-command latency metrics ('stats reset' zeroes them)\n"
+            "  observers - Show per-observer delivery, drops and latency\n"
             "  help     - Show this help\n"
             "  exit     - Exit the application\n"
         )
@@ -44,11 +59,12 @@ class OperationListHelp(HelpDecorator):
         base = self._component.render()
         ops = sorted(set(list(OperationFactory._registry.keys()) + self._extra_ops))
         ops_line = colorize("Operation commands:", "cyan") + "\n  " + ", ".join(ops) + "\n"
-        usage = colorize("Usage:", "cyan") + "\n  <operation> <a> <b>\n"
+        usage = colorize("Usage:", "cyan") + "\n  <operation> <a> <b>\n  eval <expression>\n"
         examples = (
             colorize("Examples:", "cyan") + "\n"
             "  add 2 3\n"
             "  power 2 8\n"
             "  percent 5 20\n"
+            "  eval (2 + 3) ^ 4 / root(81, 4)\n"
         )
         return ops_line + base + "\n" + usage + examples
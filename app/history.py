@@ -1,91 +1,474 @@
 from __future__ import annotations
-from typing import List
-import pandas as pd
+from typing import TYPE_CHECKING, Iterator, List, Optional, Tuple
+from itertools import chain, islice
+import csv
 import os
 from .calculation import Calculation
 from .calculator_memento import CalculatorMemento
 from .exceptions import HistoryError, PersistenceError
+from . import history_format
+from .history_csv import CSV_COLUMNS, load_csv
+from .history_mmap import MappedRows, open_mapped
+from .pvector import EMPTY, MASK, WIDTH, PVector
+
+if TYPE_CHECKING:  # pandas is only imported when a DataFrame is requested
+    import pandas as pd
+    from .history_index import HistoryIndex, Range
+    from .history_stats import HistoryStats, HistorySummary
+    from .history_spill import HistorySpill
+
+class HistorySnapshot:
+    """
+    Immutable view of a History's stored entries (held by CalculatorMemento).
+    It shares the persistent vector with the history, so taking one is O(1).
+    """
+    __slots__ = ('_base', '_base_off', '_base_len', 'vector', '_start', '_size')
+
+    def __init__(self, base, base_off: int, base_len: int, vector: PVector, start: int, size: int):
+        self._base = base
+        self._base_off = base_off
+        self._base_len = base_len
+        self.vector = vector
+        self._start = start
+        self._size = size
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index: int) -> Calculation:
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("snapshot index out of range")
+        if index < self._base_len:
+            return self._base[self._base_off + index]
+        return self.vector[self._start + index - self._base_len]
+
+    def __iter__(self) -> Iterator[Calculation]:
+        return (self[i] for i in range(self._size))
+
 
 class History:
+    """
+    Undo/redo history backed by a persistent vector (see pvector).
+
+    New entries collect in a short mutable tail that is frozen into the
+    vector 32 at a time, so push/undo/redo stay O(1) and ``save()`` only has
+    to freeze that tail: mementos share everything else with the live
+    history. When full, a push evicts the oldest entry; the evicted prefix is
+    dropped by an occasional rebuild (amortized O(1)). Logical index 0 is the
+    oldest stored entry; ``_cursor`` is the logical index of the last
+    applied one.
+
+    After ``load_file(..., lazy=True)`` the oldest entries live in a
+    memory-mapped *base segment* and are materialized on access; new entries
+    follow it, and the base shrinks from the front as they push it out.
+    """
     def __init__(self, max_size: int = 1000):
-        self.items: List[Calculation] = []
-        self._cursor = -1  # last applied index
-        self.max_size = max_size
+        self._max_size = max(max_size, 0)
+        self._vec: PVector = EMPTY  # whole leaves only
+        self._pending: List[Calculation] = []  # mutable tail, < WIDTH entries
+        self._start = 0     # evicted entries still at the front of vec+pending
+        self._size = 0      # stored entries, applied + redo "future"
+        self._cursor = -1   # last applied index
+        self._base: Optional[MappedRows] = None
+        self._base_off = 0  # first live row of the base segment
+        self._base_len = 0  # live base rows; logical indexes [0, _base_len)
+        self._first_seq = 0  # sequence number of logical index 0
+        self._listeners: List[object] = []
+        self._push_hooks: List[object] = []   # listeners' on_push, called for every push
+        self._evict_hooks: List[object] = []  # listeners' on_evict
+        self._index: Optional[HistoryIndex] = None
+        self._stats: Optional[HistoryStats] = None
+        self.spill: Optional[HistorySpill] = None   # cold tier for evicted entries
+
+    @property
+    def max_size(self) -> int:
+        return self._max_size
+
+    @property
+    def first_seq(self) -> int:
+        """
+        Sequence number of the oldest stored entry. Entry ``i`` keeps the
+        number ``first_seq + i`` until it is discarded, even as older entries
+        are evicted, so it can key caches that outlive index shifts.
+        """
+        return self._first_seq
+
+    def subscribe(self, listener: object) -> None:
+        """
+        Register a listener; optional hooks are ``on_push(seq, calc)`` (an
+        entry was stored and applied), ``on_undo(seq, calc)`` and
+        ``on_redo(seq, calc)`` (the entry left or rejoined the applied ones),
+        ``on_evict(seq, calc)`` (the oldest entry made room for a push),
+        ``on_discard(seq)`` (entries from ``seq`` on were dropped) and
+        ``on_reset()`` (contents replaced).
+        """
+        self._listeners.append(listener)
+        if hasattr(listener, 'on_push'):
+            self._push_hooks.append(listener.on_push)
+        if hasattr(listener, 'on_evict'):
+            self._evict_hooks.append(listener.on_evict)
+
+    def attach_spill(self, spill: HistorySpill) -> None:
+        """Send evicted entries to ``spill``; queries and exports then cover both tiers."""
+        self.spill = spill
+        self.subscribe(spill)
+
+    @property
+    def spilled(self) -> int:
+        """Entries in the cold tier (they precede logical index 0)."""
+        return len(self.spill) if self.spill is not None else 0
+
+    def _emit(self, hook: str, *args) -> None:
+        for listener in self._listeners:
+            fn = getattr(listener, hook, None)
+            if fn is not None:
+                fn(*args)
+
+    @property
+    def items(self) -> List[Calculation]:
+        """Stored entries, oldest first (a copy; includes the redo future)."""
+        return [self[i] for i in range(self._size)]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[Calculation]:
+        """Stored entries, oldest first, without per-index lookups."""
+        if self._base_len:
+            base = self._base
+            yield from (base[i] for i in range(self._base_off, self._base_off + self._base_len))
+        yield from islice(chain(self._vec, self._pending), self._start,
+                          self._start + self._size - self._base_len)
+
+    def __getitem__(self, index: int) -> Calculation:
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("history index out of range")
+        if index < self._base_len:
+            return self._base[self._base_off + index]
+        pos = self._start + index - self._base_len
+        n = len(self._vec)
+        return self._vec[pos] if pos < n else self._pending[pos - n]
+
+    def _drop_base(self) -> None:
+        self._base = None   # the mapping closes once no row view holds it
+        self._base_off = self._base_len = 0
+
+    def _set_entries(self, calcs: List[Calculation]) -> None:
+        full = len(calcs) & ~MASK
+        self._vec = PVector.from_iterable(calcs[:full])
+        self._pending = list(calcs[full:])
+        self._start = 0
+
+    def _attach(self, rows: MappedRows) -> None:
+        """Make ``rows`` the (lazy) contents, keeping the newest ``max_size``."""
+        cap = self._max_size
+        self._drop_base()
+        self._set_entries([])
+        self._first_seq = 0
+        self._emit('on_reset')
+        if min(len(rows), cap):
+            self._base = rows
+            self._base_len = min(len(rows), cap)
+            self._base_off = len(rows) - self._base_len
+        self._size = self._base_len
+        self._cursor = self._size - 1
+
+    @property
+    def lazy_rows(self) -> int:
+        """Entries still backed by a memory-mapped file."""
+        return self._base_len
+
+    def _reset(self, calcs: List[Calculation], cursor: int) -> None:
+        """Replace the contents, keeping the newest ``max_size`` entries."""
+        self._drop_base()
+        self._first_seq = 0
+        self._emit('on_reset')
+        drop = max(len(calcs) - self._max_size, 0)
+        calcs = list(calcs[drop:])
+        self._set_entries(calcs)
+        self._size = len(calcs)
+        self._cursor = min(max(cursor - drop, -1), self._size - 1)
 
     # Memento controls
     def save(self) -> CalculatorMemento:
-        return CalculatorMemento(items=self.items.copy(), index=self._cursor)
+        """O(1) snapshot: freezes the short tail and shares the vector."""
+        vec = self._vec.append_leaf(tuple(self._pending)) if self._pending else self._vec
+        snap = HistorySnapshot(self._base, self._base_off, self._base_len, vec, self._start, self._size)
+        return CalculatorMemento(items=snap, index=self._cursor)
 
     def restore(self, m: CalculatorMemento) -> None:
-        self.items = m.items.copy()
-        self._cursor = m.index
+        snap = m.items
+        if not isinstance(snap, HistorySnapshot) or len(snap) > self._max_size:
+            self._reset(list(snap), m.index)
+            return
+        self._emit('on_reset')
+        self._first_seq = 0
+        self._base, self._base_off, self._base_len = snap._base, snap._base_off, snap._base_len
+        vec = snap.vector
+        full = len(vec) & ~MASK
+        self._vec = vec.take(full)
+        self._pending = [vec[i] for i in range(full, len(vec))]
+        self._start = snap._start
+        self._size = len(snap)
+        self._cursor = min(m.index, self._size - 1)
 
     # History stack methods
+    def _truncate(self, n: int) -> None:
+        """Keep the first ``n`` logical entries (drops the redo future)."""
+        if n < self._base_len:
+            self._base_len = n
+            if not n:
+                self._drop_base()
+        keep = self._start + n - self._base_len
+        nv = len(self._vec)
+        if keep >= nv:
+            del self._pending[keep - nv:]
+        else:
+            full = keep & ~MASK
+            self._pending = [self._vec[i] for i in range(full, keep)]
+            self._vec = self._vec.take(full)
+        self._size = n
+
     def push(self, calc: Calculation) -> None:
+        if not self._max_size:
+            return
         # if we add a new item after undoing, drop the "future"
-        if self._cursor < len(self.items) - 1:
-            self.items = self.items[: self._cursor + 1]
-        self.items.append(calc)
-        # enforce max_size (drop oldest)
-        if len(self.items) > self.max_size:
-            self.items = self.items[-self.max_size:]
-        self._cursor = len(self.items) - 1
+        if self._size > self._cursor + 1:
+            if self._listeners:
+                self._emit('on_discard', self._first_seq + self._cursor + 1)
+            self._truncate(self._cursor + 1)
+        if self._size == self._max_size:
+            # enforce max_size (evict oldest)
+            if self._evict_hooks:
+                oldest = self[0]
+                for hook in self._evict_hooks:
+                    hook(self._first_seq, oldest)
+            self._first_seq += 1
+            self._size -= 1
+            if self._base_len:
+                self._base_off += 1
+                self._base_len -= 1
+                if not self._base_len:
+                    self._drop_base()
+            else:
+                self._start += 1
+        pending = self._pending
+        pending.append(calc)
+        if len(pending) == WIDTH:
+            self._vec = self._vec.append_leaf(tuple(pending))
+            self._pending = []
+        self._size += 1
+        self._cursor = self._size - 1
+        if self._push_hooks:
+            seq = self._first_seq + self._cursor
+            for hook in self._push_hooks:
+                hook(seq, calc)
+        if self._start >= WIDTH and self._start >= self._size:
+            self._compact()
+
+    def _compact(self) -> None:
+        """Rebuild without the evicted prefix (mementos keep the old vector)."""
+        stored = list(self._vec)
+        stored += self._pending
+        self._set_entries(stored[self._start:])
+
+    def extend(self, calcs: List[Calculation]) -> None:
+        """Bulk push; only the newest ``max_size`` entries are written."""
+        if len(calcs) >= self._max_size:
+            seq = self._first_seq
+            if self._evict_hooks:
+                # The applied entries are pushed out...
+                for i in range(self._cursor + 1):
+                    calc = self[i]
+                    for hook in self._evict_hooks:
+                        hook(seq, calc)
+                    seq += 1
+            if self.spill is not None:
+                # ...and so is the head of the batch, which was never pushed:
+                # only the spill keeps it; other listeners never saw it.
+                for calc in calcs[:len(calcs) - self._max_size]:
+                    self.spill.on_evict(seq, calc)
+                    seq += 1
+            self._reset(calcs, len(calcs) - 1)
+            return
+        for calc in calcs:
+            self.push(calc)
+
+    def clear(self) -> None:
+        self._reset([], -1)
+
+    def replace(self, calcs: List[Calculation]) -> None:
+        """Make ``calcs`` the (applied) contents, keeping the newest ``max_size``."""
+        self._reset(calcs, len(calcs) - 1)
 
     def can_undo(self) -> bool:
         return self._cursor >= 0
 
     def can_redo(self) -> bool:
-        return self._cursor < len(self.items) - 1
+        return self._cursor < self._size - 1
 
     def undo(self) -> None:
         if not self.can_undo():
             raise HistoryError("Nothing to undo.")
+        if self._listeners:
+            self._emit('on_undo', self._first_seq + self._cursor, self[self._cursor])
         self._cursor -= 1
 
     def redo(self) -> None:
         if not self.can_redo():
             raise HistoryError("Nothing to redo.")
         self._cursor += 1
+        if self._listeners:
+            self._emit('on_redo', self._first_seq + self._cursor, self[self._cursor])
+
+    # Queries
+    def query(self, operation: Optional[str] = None, a: Optional[Range] = None,
+              b: Optional[Range] = None, result: Optional[Range] = None,
+              since: Optional[float] = None, until: Optional[float] = None,
+              sort: str = 'index', limit: Optional[int] = None) -> List[Tuple[int, Calculation]]:
+        """
+        Applied entries matching every given filter, as ``(index, calc)``.
+        ``a``, ``b`` and ``result`` are inclusive ``(min, max)`` ranges (either
+        end may be None). ``since``/``until`` are epoch seconds. ``sort`` is
+        ``index``, ``result`` or ``time``, with a ``-`` prefix for descending.
+        Served by secondary indexes (see history_index), built on first use.
+        With a spill attached, cold entries come first (indexes start at 0
+        there) and are searched segment by segment.
+        """
+        if self._index is None:
+            from .history_index import HistoryIndex
+            self._index = HistoryIndex(self)
+        matches = self._index.query(operation, a, b, result, since, until, sort, limit)
+        cold = self.spilled
+        if not cold:
+            return matches
+        from .history_index import sort_matches
+        hot = [(cold + i, calc) for i, calc in matches]
+        if sort == '-index' and limit is not None and len(hot) >= limit:
+            return hot
+        return sort_matches(self.spill.query(operation, a, b, result, since, until) + hot, sort, limit)
+
+    def stats(self) -> HistorySummary:
+        """
+        Count, sum, mean, variance, min/max and approximate p50/p90/p99 of the
+        applied results, overall and per operation. Maintained incrementally
+        (see history_stats) from the first call on.
+        """
+        if self._stats is None:
+            from .history_stats import HistoryStats
+            self._stats = HistoryStats(self)
+        return self._stats.summary()
 
     # Persistence
     def to_dataframe(self) -> pd.DataFrame:
+        import pandas as pd
         data = [
             {'operation': c.operation, 'operand1': c.a, 'operand2': c.b, 'result': c.result, 'timestamp': c.timestamp}
-            for c in self.items[: self._cursor + 1]
+            for c in (self[i] for i in range(self._cursor + 1))
         ]
-        return pd.DataFrame(data)
+        return pd.DataFrame(data, columns=CSV_COLUMNS)
 
-    def save_csv(self, path: str, encoding: str = 'utf-8') -> None:
+    def _applied(self, spilled: bool = False) -> Iterator[Calculation]:
+        """Applied entries, oldest first; ``spilled`` puts the cold tier in front."""
+        hot = (self[i] for i in range(self._cursor + 1))
+        return chain(self.spill, hot) if spilled and self.spill is not None else hot
+
+    def save_csv(self, path: str, encoding: str = 'utf-8', spilled: bool = False) -> None:
+        """Write applied entries with the stdlib csv writer (no pandas needed)."""
         try:
             os.makedirs(os.path.dirname(path), exist_ok=True)
-            df = self.to_dataframe()
-            df.to_csv(path, index=False, encoding=encoding)
+            # Write aside and swap in: the old file may still be memory-mapped.
+            tmp = f"{path}.tmp"
+            with open(tmp, 'w', newline='', encoding=encoding) as fh:
+                writer = csv.writer(fh)
+                writer.writerow(CSV_COLUMNS)
+                writer.writerows(
+                    (c.operation, c.a, c.b, c.result, c.timestamp) for c in self._applied(spilled)
+                )
+            os.replace(tmp, path)
         except Exception as e:
             raise PersistenceError(f"Failed to save history: {e}")
 
     @staticmethod
-    def from_dataframe(df: pd.DataFrame) -> 'History':
-        h = History()
-        for _, row in df.iterrows():
-            h.items.append(Calculation(
-                operation=row['operation'],
-                a=float(row['operand1']),
-                b=float(row['operand2']),
-                result=float(row['result']),
-                timestamp=str(row['timestamp'])
-            ))
-        h._cursor = len(h.items) - 1
+    def from_dataframe(df: pd.DataFrame, max_size: Optional[int] = None) -> 'History':
+        h = History(max_size=max_size if max_size is not None else max(len(df), 1000))
+        if len(df) > h.max_size:
+            df = df.iloc[len(df) - h.max_size:]   # only the rows that fit are converted
+        # Column-wise: one bulk conversion per column instead of a Series per row.
+        calcs = list(map(
+            Calculation,
+            map(str, df['operation'].tolist()),
+            df['operand1'].astype(float).tolist(),
+            df['operand2'].astype(float).tolist(),
+            df['result'].astype(float).tolist(),
+            map(str, df['timestamp'].tolist()),
+        ))
+        h._reset(calcs, len(calcs) - 1)
         return h
 
-    def load_csv(self, path: str) -> None:
+    def load_csv(self, path: str, encoding: str = 'utf-8') -> None:
+        """Stream a history CSV in chunks, keeping the newest ``max_size`` rows (see history_csv)."""
+        try:
+            if not os.path.exists(path):
+                raise PersistenceError("History file does not exist.")
+            calcs = load_csv(path, encoding=encoding, limit=self._max_size)
+            self._reset(calcs, len(calcs) - 1)
+        except PersistenceError:
+            raise
+        except Exception as e:
+            raise PersistenceError(f"Failed to load history: {e}")
+
+    def save_binary(self, path: str, spilled: bool = False) -> None:
+        """Write applied entries in the binary columnar format (see history_format)."""
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.tmp"
+            history_format.write_binary(tmp, self._applied(spilled))
+            os.replace(tmp, path)
+        except PersistenceError:
+            raise
+        except Exception as e:
+            raise PersistenceError(f"Failed to save history: {e}")
+
+    def load_binary(self, path: str) -> None:
         try:
             if not os.path.exists(path):
                 raise PersistenceError("History file does not exist.")
-            df = pd.read_csv(path)
-            newh = History.from_dataframe(df)
-            self.items = newh.items
-            self._cursor = newh._cursor
+            calcs = history_format.read_binary(path, limit=self._max_size)
+            self._reset(calcs, len(calcs) - 1)
         except PersistenceError:
             raise
         except Exception as e:
-            raise PersistenceError(f"Failed to load history: {e}")
\ No newline at end of file
+            raise PersistenceError(f"Failed to load history: {e}")
+
+    def save_file(self, path: str, fmt: str = 'auto', encoding: str = 'utf-8', spilled: bool = False) -> None:
+        """
+        Save as CSV or binary; ``fmt='auto'`` goes by the file extension.
+        ``spilled`` streams the cold tier in first (exports; snapshots leave it out).
+        """
+        if history_format.resolve_format(path, fmt) == 'binary':
+            self.save_binary(path, spilled=spilled)
+        else:
+            self.save_csv(path, encoding=encoding, spilled=spilled)
+
+    def load_file(self, path: str, fmt: str = 'auto', encoding: str = 'utf-8', lazy: bool = False) -> None:
+        """
+        Load CSV or binary; ``fmt='auto'`` recognises binary files by their
+        header. ``lazy=True`` memory-maps the file instead of parsing it.
+        """
+        if lazy:
+            self.load_mapped(path, fmt=fmt, encoding=encoding)
+        elif history_format.resolve_format(path, fmt) == 'binary':
+            self.load_binary(path)
+        else:
+            self.load_csv(path, encoding=encoding)
+
+    def load_mapped(self, path: str, fmt: str = 'auto', encoding: str = 'utf-8') -> None:
+        """Memory-map ``path``; rows become Calculations only when accessed."""
+        if not os.path.exists(path):
+            raise PersistenceError("History file does not exist.")
+        self._attach(open_mapped(path, fmt=fmt, encoding=encoding))
@@ -0,0 +1,144 @@
+# app/history_csv.py
+"""
+Streaming CSV history loader.
+
+The file is read ``CHUNK_ROWS`` records at a time. Each chunk is transposed
+into columns and converted a column at a time: operands and results with one
+``map(float, ...)`` each, timestamps in our ISO format with one numpy
+datetime64 parse. Rows that fail are reported by row number (the header is
+row 1) and the load is refused. Only the newest ``limit`` rows are kept while
+reading, and only those become Calculations. The cyclic garbage collector
+is paused meanwhile: none of these objects can form a cycle.
+"""
+from __future__ import annotations
+import csv
+import gc
+import re
+from collections import deque
+from contextlib import contextmanager
+from itertools import islice
+from operator import itemgetter
+from typing import Deque, List, NamedTuple, Optional, Sequence
+
+from .calculation import Calculation
+from .exceptions import PersistenceError
+
+CSV_COLUMNS = ['operation', 'operand1', 'operand2', 'result', 'timestamp']
+CHUNK_ROWS = 65536
+MAX_REPORTED = 10       # bad row numbers listed in the error
+
+# The two shapes Calculation.timestamp produces (see calculation._micros_from_iso).
+_ISO = re.compile(r"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(?:\.\d{6})?")
+_NAN = float("nan")
+
+
+class _Chunk(NamedTuple):
+    ops: Sequence[str]
+    a: List[float]
+    b: List[float]
+    result: List[float]
+    ts: Sequence[str]
+
+
+def _floats(column: Sequence[str], bad: set) -> List[float]:
+    """``column`` as floats; unparsable positions are added to ``bad``."""
+    try:
+        return list(map(float, column))
+    except ValueError:
+        pass
+    out = []
+    for i, value in enumerate(column):
+        try:
+            out.append(float(value))
+        except ValueError:
+            out.append(_NAN)
+            bad.add(i)
+    return out
+
+
+def _timestamps(column: Sequence[str]) -> Sequence:
+    """Epoch microseconds when every value is one of our ISO strings, else the text."""
+    if column and all(map(_ISO.fullmatch, column)):
+        import numpy as np
+        try:
+            return np.array(column, dtype="datetime64[us]").astype(np.int64).tolist()
+        except ValueError:
+            pass    # e.g. month 13: Calculation keeps such values verbatim
+    return column
+
+
+@contextmanager
+def _gc_paused():
+    """Millions of new objects would otherwise trigger one cyclic GC pass after another."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _chunks(reader, header: List[str], chunk_rows: int, bad_rows: List[int]):
+    """Yield the good rows of each chunk as columns, collecting bad row numbers."""
+    idx = [header.index(col) for col in CSV_COLUMNS]
+    width = max(idx) + 1
+    row_no = 1
+    for chunk in iter(lambda: list(islice(reader, chunk_rows)), []):
+        numbers = range(row_no + 1, row_no + 1 + len(chunk))
+        row_no += len(chunk)
+        if not all(chunk):      # blank lines are skipped
+            numbers = [n for n, row in zip(numbers, chunk) if row]
+            chunk = [row for row in chunk if row]
+            if not chunk:
+                continue
+        bad: set = set()
+        if min(map(len, chunk)) < width:
+            pad = [""] * width
+            for i, row in enumerate(chunk):
+                if len(row) < width:
+                    bad.add(i)
+                    chunk[i] = pad
+        ops, a, b, result, ts = (list(map(itemgetter(i), chunk)) for i in idx)
+        a, b, result = _floats(a, bad), _floats(b, bad), _floats(result, bad)
+        if bad:
+            bad_rows.extend(numbers[i] for i in sorted(bad))
+        if bad_rows:
+            continue    # the load fails; keep reading only to report every bad row
+        yield _Chunk(ops, a, b, result, ts)
+
+
+def load_csv(path: str, encoding: str = "utf-8", limit: Optional[int] = None,
+             chunk_rows: int = CHUNK_ROWS) -> List[Calculation]:
+    """The newest ``limit`` (default all) entries of a history CSV, oldest first."""
+    bad_rows: List[int] = []
+    kept: Deque[_Chunk] = deque()
+    rows = 0
+    with _gc_paused(), open(path, newline="", encoding=encoding) as fh:
+        reader = csv.reader(fh)
+        header = next(reader, None)
+        if header is None or any(col not in header for col in CSV_COLUMNS):
+            raise PersistenceError(f"History file must have columns: {', '.join(CSV_COLUMNS)}")
+        for chunk in _chunks(reader, header, max(chunk_rows, 1), bad_rows):
+            kept.append(chunk)
+            rows += len(chunk.ops)
+            # Drop chunks that newer rows have already pushed out.
+            while limit is not None and kept and rows - len(kept[0].ops) >= limit:
+                rows -= len(kept.popleft().ops)
+    if bad_rows:
+        listed = ", ".join(map(str, bad_rows[:MAX_REPORTED]))
+        more = f" and {len(bad_rows) - MAX_REPORTED} more" if len(bad_rows) > MAX_REPORTED else ""
+        raise PersistenceError(f"Bad rows in history file: {listed}{more} "
+                               "(every column is required; operands and result must be numbers)")
+    skip = rows - limit if limit is not None and rows > limit else 0
+    calcs: List[Calculation] = []
+    with _gc_paused():
+        for chunk in kept:
+            n = len(chunk.ops)
+            if skip >= n:
+                skip -= n
+                continue
+            start, skip = skip, 0
+            calcs.extend(map(Calculation, chunk.ops[start:], chunk.a[start:], chunk.b[start:],
+                             chunk.result[start:], _timestamps(chunk.ts[start:])))
+    return calcs
@@ -0,0 +1,138 @@
+# app/history_format.py
+"""
+Binary columnar history format (``.chist``).
+
+Layout (little-endian)::
+
+    header   magic b"CHIST\\0" | u16 version | u32 op count | u64 row count
+    ops      per op: u16 byte length + UTF-8 name       (dictionary)
+    codes    u16[rows]    index into ops
+    a        f64[rows]
+    b        f64[rows]
+    result   f64[rows]
+    ts       i64[rows]    microseconds since the Unix epoch (naive UTC)
+
+Each column is read with a single ``array.frombytes`` call, so loading a
+million rows is a handful of bulk reads instead of per-field text parsing.
+Fixed-width columns also make row ``i`` addressable without an index
+(see history_mmap).
+"""
+from __future__ import annotations
+import os
+import struct
+import sys
+from array import array
+from typing import Iterable, List, Optional, Tuple
+from .calculation import Calculation
+from .exceptions import PersistenceError
+
+MAGIC = b"CHIST\0"
+VERSION = 1
+BINARY_EXTENSION = ".chist"
+FORMATS = ("auto", "csv", "binary")
+
+_HEADER = struct.Struct("<6sHIQ")
+_NAME_LEN = struct.Struct("<H")
+_SWAP = sys.byteorder != "little"
+ROW_BYTES = 2 + 8 * 3 + 8   # code + a/b/result + timestamp
+
+
+def resolve_format(path: str, fmt: Optional[str] = "auto") -> str:
+    """'csv' or 'binary'; 'auto' picks by extension, or by magic for existing files."""
+    if fmt in (None, "auto"):
+        if os.path.splitext(path)[1].lower() == BINARY_EXTENSION:
+            return "binary"
+        return "binary" if is_binary(path) else "csv"
+    if fmt not in FORMATS:
+        raise PersistenceError(f"Unknown history format {fmt!r}; use one of {', '.join(FORMATS)}")
+    return fmt
+
+
+def is_binary(path: str) -> bool:
+    try:
+        with open(path, "rb") as fh:
+            return fh.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def encode_binary(calcs: Iterable[Calculation]) -> bytes:
+    """The ``.chist`` bytes for ``calcs`` (one pass, so any iterable works)."""
+    ops: dict = {}
+    codes, a, b, result, ts = array("H"), array("d"), array("d"), array("d"), array("q")
+    for c in calcs:
+        codes.append(ops.setdefault(c.operation, len(ops)))
+        a.append(float(c.a))
+        b.append(float(c.b))
+        result.append(float(c.result))
+        us = c.ts_micros
+        if us is None:
+            raise PersistenceError(f"The binary history format only holds ISO timestamps, "
+                                   f"not {c.timestamp!r}; export as CSV instead.")
+        ts.append(us)
+    parts = [_HEADER.pack(MAGIC, VERSION, len(ops), len(codes))]
+    for name in ops:
+        raw = name.encode("utf-8")
+        parts += [_NAME_LEN.pack(len(raw)), raw]
+    for col in (codes, a, b, result, ts):
+        if _SWAP:  # pragma: no cover (big-endian hosts)
+            col.byteswap()
+        parts.append(col.tobytes())
+    return b"".join(parts)
+
+
+def write_binary(path: str, calcs: Iterable[Calculation]) -> None:
+    data = encode_binary(calcs)
+    with open(path, "wb") as fh:
+        fh.write(data)
+
+
+def parse_header(buf) -> Tuple[List[str], int, int]:
+    """(ops, rows, offset of the first column) for a buffer holding a .chist file."""
+    if len(buf) < _HEADER.size:
+        raise PersistenceError("History file is truncated.")
+    magic, version, n_ops, rows = _HEADER.unpack_from(buf)
+    if magic != MAGIC:
+        raise PersistenceError("Not a binary history file.")
+    if version != VERSION:
+        raise PersistenceError(f"Unsupported history format version {version}.")
+    pos = _HEADER.size
+    ops = []
+    try:
+        for _ in range(n_ops):
+            (size,) = _NAME_LEN.unpack_from(buf, pos)
+            pos += _NAME_LEN.size
+            ops.append(bytes(buf[pos:pos + size]).decode("utf-8"))
+            pos += size
+    except struct.error:
+        raise PersistenceError("History file is truncated.")
+    if len(buf) < pos + rows * ROW_BYTES:
+        raise PersistenceError("History file is truncated.")
+    return ops, rows, pos
+
+
+def decode_columns(buf) -> Tuple[List[str], Tuple[array, array, array, array, array]]:
+    """(ops, (codes, a, b, result, ts)) for a buffer holding a .chist file."""
+    ops, rows, pos = parse_header(buf)
+    columns = []
+    for typecode in ("H", "d", "d", "d", "q"):
+        col = array(typecode)
+        end = pos + col.itemsize * rows
+        col.frombytes(buf[pos:end])
+        if _SWAP:  # pragma: no cover (big-endian hosts)
+            col.byteswap()
+        columns.append(col)
+        pos = end
+    if columns[0] and max(columns[0]) >= len(ops):
+        raise PersistenceError("History file has an invalid operation code.")
+    return ops, tuple(columns)
+
+
+def read_binary(path: str, limit: Optional[int] = None) -> List[Calculation]:
+    """Read a ``.chist`` file; ``limit`` keeps only the newest rows."""
+    with open(path, "rb") as fh:
+        raw = fh.read()
+    ops, (codes, a, b, result, ts) = decode_columns(raw)
+    rows = len(codes)
+    start = max(rows - limit, 0) if limit is not None else 0
+    return [Calculation(ops[codes[i]], a[i], b[i], result[i], ts[i]) for i in range(start, rows)]
@@ -0,0 +1,323 @@
+# app/history_index.py
+"""
+Secondary indexes behind ``History.query``.
+
+* per-operation posting lists of sequence numbers (ascending)
+* a sorted result index and a sorted time index: numpy (key, seq) arrays
+  plus a short unsorted tail that is merged in every ``merge_at`` pushes,
+  so a push costs O(1) amortized
+* a columnar copy of every entry (operation code, operands, result,
+  timestamp), so the filters that did not pick the candidates are checked
+  with numpy instead of by materializing entries
+
+Entries are keyed by sequence number (``History.first_seq + index``), which
+stays fixed while older entries are evicted. The indexes follow the history
+through its listener hooks:
+
+* ``on_push``: new entries are added incrementally
+* ``on_discard``: a push after undo drops the redo future
+* ``on_reset``: clear, load or restore; the indexes are rebuilt on the next query
+
+Undo and redo only move the history cursor. Queries stop at the cursor, and
+they skip evicted sequence numbers until the next prune drops them. The
+index is built on the first query, so histories that are never queried pay
+nothing.
+"""
+from __future__ import annotations
+import heapq
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from .calculation import Calculation
+
+if TYPE_CHECKING:
+    from .history import History
+
+Range = Tuple[Optional[float], Optional[float]]   # inclusive (min, max); None = unbounded
+SORT_KEYS = ("index", "-index", "result", "-result", "time", "-time")
+_INF = math.inf
+_NAN = math.nan
+
+
+def _bounds(rng: Optional[Range]) -> Tuple[float, float]:
+    lo, hi = rng if rng is not None else (None, None)
+    return (-_INF if lo is None else lo), (_INF if hi is None else hi)
+
+
+def filter_mask(np, columns, rows, code: Optional[int] = None, a: Optional[Range] = None,
+                b: Optional[Range] = None, result: Optional[Range] = None,
+                t_lo: Optional[float] = None, t_hi: Optional[float] = None):
+    """
+    Which of ``rows`` (an index array, or ``slice(None)`` for all) pass the
+    filters. ``columns`` has ``op``, ``a``, ``b``, ``result`` and ``ts``
+    (epoch microseconds, NaN when untimed) arrays; ``code`` is the operation
+    code to match and ``t_lo``/``t_hi`` bound ``ts``.
+    """
+    mask = np.ones(len(columns.op) if isinstance(rows, slice) else len(rows), dtype=bool)
+    if code is not None:
+        mask &= columns.op[rows] == code
+    for rng, name in ((result, "result"), (a, "a"), (b, "b")):
+        if rng is not None:
+            lo, hi = _bounds(rng)
+            values = getattr(columns, name)[rows]
+            mask &= (values >= lo) & (values <= hi)
+    if t_lo is not None or t_hi is not None:
+        values = columns.ts[rows]
+        mask &= (values >= (-_INF if t_lo is None else t_lo)) & (values <= (_INF if t_hi is None else t_hi))
+    return mask
+
+
+def sort_matches(matches: List[Tuple[int, Calculation]], sort: str = "index",
+                 limit: Optional[int] = None) -> List[Tuple[int, Calculation]]:
+    """Order ``(index, calc)`` pairs given in index order like ``HistoryIndex.query`` does."""
+    key = sort.lstrip("-")
+    desc = sort.startswith("-")
+    if key == "index":
+        ordered = matches[::-1] if desc else matches
+        return ordered[:limit] if limit is not None else list(ordered)
+
+    def value(match):
+        calc = match[1]
+        v = calc.result if key == "result" else (-_INF if (t := calc.ts_micros) is None else t)
+        if v != v:
+            return (1, 0.0)    # NaN last either way
+        return (0, -v if desc else v)
+    if limit is not None:
+        return heapq.nsmallest(limit, matches, key=value) if limit > 0 else []
+    return sorted(matches, key=value)
+
+
+class _RangeIndex:
+    """(key, seq) pairs sorted by key, plus an unsorted tail of recent pushes."""
+    merge_at = 4096
+
+    def __init__(self, np, keys, seqs):
+        order = np.argsort(keys, kind="stable")
+        self._np = np
+        self.keys = keys[order]
+        self.seqs = seqs[order]
+        self._tail_keys: List[float] = []
+        self._tail_seqs: List[int] = []
+
+    def add(self, key: float, seq: int) -> None:
+        self._tail_keys.append(key)
+        self._tail_seqs.append(seq)
+        if len(self._tail_keys) >= self.merge_at:
+            self._merge()
+
+    def _merge(self) -> None:
+        np = self._np
+        keys = np.array(self._tail_keys, dtype=np.float64)
+        seqs = np.array(self._tail_seqs, dtype=np.int64)
+        order = np.argsort(keys, kind="stable")
+        keys, seqs = keys[order], seqs[order]
+        at = np.searchsorted(self.keys, keys, side="right")
+        self.keys = np.insert(self.keys, at, keys)
+        self.seqs = np.insert(self.seqs, at, seqs)
+        self._tail_keys.clear()
+        self._tail_seqs.clear()
+
+    def keep(self, lo_seq: int, hi_seq: int) -> None:
+        """Drop entries whose seq falls outside [lo_seq, hi_seq)."""
+        self._merge()
+        mask = (self.seqs >= lo_seq) & (self.seqs < hi_seq)
+        if not mask.all():
+            self.keys, self.seqs = self.keys[mask], self.seqs[mask]
+
+    def _span(self, lo: float, hi: float) -> Tuple[int, int]:
+        np = self._np
+        return int(np.searchsorted(self.keys, lo, side="left")), int(np.searchsorted(self.keys, hi, side="right"))
+
+    def count(self, lo: float, hi: float) -> int:
+        """Upper bound on the matches (the tail is not searched)."""
+        i, j = self._span(lo, hi)
+        return j - i + len(self._tail_keys)
+
+    def seqs_in(self, lo: float, hi: float):
+        i, j = self._span(lo, hi)
+        found = self.seqs[i:j]
+        extra = [s for k, s in zip(self._tail_keys, self._tail_seqs) if lo <= k <= hi]
+        if extra:
+            found = self._np.concatenate([found, self._np.array(extra, dtype=self._np.int64)])
+        return found
+
+
+class _Columns:
+    """Growable numpy columns; row ``r`` holds sequence number ``offset + r``."""
+    NAMES = ("op", "a", "b", "result", "ts")
+
+    def __init__(self, np, offset: int, op, a, b, result, ts):
+        self._np = np
+        self.offset = offset
+        self.size = len(op)
+        self.op, self.a, self.b, self.result, self.ts = op, a, b, result, ts
+
+    def append(self, op: int, a: float, b: float, result: float, ts: float) -> None:
+        n = self.size
+        if n == len(self.op):
+            self._resize(max(2 * n, 1024))
+        self.op[n] = op
+        self.a[n] = a
+        self.b[n] = b
+        self.result[n] = result
+        self.ts[n] = ts
+        self.size = n + 1
+
+    def _resize(self, capacity: int, start: int = 0) -> None:
+        np = self._np
+        end = min(self.size, start + capacity)
+        for name in self.NAMES:
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:end - start] = old[start:end]
+            setattr(self, name, new)
+        self.size = end - start
+
+    def keep(self, lo_seq: int, hi_seq: int) -> None:
+        start = max(lo_seq - self.offset, 0)
+        self.size = min(self.size, max(hi_seq - self.offset, 0))
+        if start:
+            self._resize(max(len(self.op) - start, 1024), start)
+            self.offset += start
+
+
+class HistoryIndex:
+    """Operation, result and time indexes over one History (see module doc)."""
+
+    def __init__(self, history: "History"):
+        self._history = history
+        self._built = False
+        self._ops: Dict[str, array] = {}
+        self._codes: Dict[str, int] = {}
+        self._results: Optional[_RangeIndex] = None
+        self._times: Optional[_RangeIndex] = None
+        self._cols: Optional[_Columns] = None
+        history.subscribe(self)
+
+    # ---- History listener hooks ----
+    def on_push(self, seq: int, calc: Calculation) -> None:
+        if not self._built:
+            return
+        op = calc.operation
+        postings = self._ops.get(op)
+        if postings is None:
+            postings = self._ops[op] = array("q")
+            self._codes[op] = len(self._codes)
+        postings.append(seq)
+        result = calc.result
+        self._results.add(result, seq)
+        ts = calc.ts_micros
+        if ts is not None:
+            self._times.add(ts, seq)
+        cols = self._cols
+        cols.append(self._codes[op], calc.a, calc.b, result, _NAN if ts is None else ts)
+        first = self._history.first_seq
+        if first - cols.offset > max(cols.size - (first - cols.offset), _RangeIndex.merge_at):
+            self._keep(first, seq + 1)   # evicted entries outnumber live ones
+
+    def on_discard(self, seq: int) -> None:
+        if self._built and seq < self._cols.offset + self._cols.size:
+            self._keep(self._cols.offset, seq)
+
+    def on_reset(self) -> None:
+        self._built = False
+        self._ops, self._codes = {}, {}
+        self._results = self._times = self._cols = None
+
+    def _keep(self, lo_seq: int, hi_seq: int) -> None:
+        for postings in self._ops.values():
+            del postings[bisect_left(postings, hi_seq):]
+            del postings[:bisect_left(postings, lo_seq)]
+        self._results.keep(lo_seq, hi_seq)
+        self._times.keep(lo_seq, hi_seq)
+        self._cols.keep(lo_seq, hi_seq)
+
+    def build(self) -> None:
+        """Index every stored entry (done lazily by the first query after a reset)."""
+        import numpy as np
+        h = self._history
+        first = h.first_seq
+        calcs = list(h)
+        codes = self._codes = {}
+        op = np.array([codes.setdefault(c.operation, len(codes)) for c in calcs], dtype=np.int32)
+        result = np.array([c.result for c in calcs], dtype=np.float64)
+        ts = np.array([_NAN if (t := c.ts_micros) is None else t for c in calcs], dtype=np.float64)
+        self._cols = _Columns(np, first, op,
+                              np.array([c.a for c in calcs], dtype=np.float64),
+                              np.array([c.b for c in calcs], dtype=np.float64), result, ts)
+        seqs = np.arange(first, first + len(calcs), dtype=np.int64)
+        self._ops = {name: array("q", seqs[op == code].tobytes()) for name, code in codes.items()}
+        self._results = _RangeIndex(np, result.copy(), seqs)
+        timed = ~np.isnan(ts)
+        self._times = _RangeIndex(np, ts[timed], seqs[timed])
+        self._built = True
+
+    # ---- Queries ----
+    def query(self, operation: Optional[str] = None, a: Optional[Range] = None, b: Optional[Range] = None,
+              result: Optional[Range] = None, since: Optional[float] = None, until: Optional[float] = None,
+              sort: str = "index", limit: Optional[int] = None) -> List[Tuple[int, Calculation]]:
+        """See ``History.query``."""
+        if sort not in SORT_KEYS:
+            raise ValueError(f"sort must be one of {SORT_KEYS}, got {sort!r}")
+        if not self._built:
+            self.build()
+        import numpy as np
+        h = self._history
+        first = h.first_seq
+        last = first + h._cursor          # newest applied entry
+        if last < first or (limit is not None and limit <= 0):
+            return []
+        if operation is not None and operation not in self._codes:
+            return []
+        timed = since is not None or until is not None
+        t_lo = -_INF if since is None else since * 1e6
+        t_hi = _INF if until is None else until * 1e6
+        r_lo, r_hi = _bounds(result)
+
+        # Candidates come from the most selective index ...
+        plans = [(last - first + 1, None)]
+        if operation is not None:
+            postings = self._ops[operation]
+            plans.append((bisect_right(postings, last) - bisect_left(postings, first), "op"))
+        if result is not None:
+            plans.append((self._results.count(r_lo, r_hi), "result"))
+        if timed:
+            plans.append((self._times.count(t_lo, t_hi), "time"))
+        source = min(plans, key=lambda p: p[0])[1]
+        if source is None:
+            seqs = np.arange(first, last + 1, dtype=np.int64)
+        elif source == "op":
+            seqs = np.frombuffer(postings, dtype=np.int64)[bisect_left(postings, first):
+                                                           bisect_right(postings, last)]
+        else:
+            seqs = (self._results.seqs_in(r_lo, r_hi) if source == "result"
+                    else self._times.seqs_in(t_lo, t_hi))
+            seqs = np.sort(seqs[(seqs >= first) & (seqs <= last)])
+
+        # ... and the other filters are checked against the columns.
+        cols = self._cols
+        rows = seqs - cols.offset
+        # NaN (no timestamp) never matches a time window.
+        code = self._codes[operation] if operation is not None and source != "op" else None
+        mask = filter_mask(np, cols, rows, code, a, b, result,
+                           t_lo if timed else None, t_hi if timed else None)
+        seqs, rows = seqs[mask], rows[mask]
+
+        key = sort.lstrip("-")
+        if key != "index":
+            # Entries without a timestamp sort before every timed entry.
+            column = cols.result[rows] if key == "result" else np.nan_to_num(cols.ts[rows], nan=-_INF)
+            if sort.startswith("-"):
+                column = -column
+            if limit is not None and limit < len(column):
+                top = np.argpartition(column, limit - 1)[:limit]   # top ``limit`` without a full sort
+                seqs = seqs[top[np.argsort(column[top], kind="stable")]]
+            else:
+                seqs = seqs[np.argsort(column, kind="stable")]
+        elif sort == "-index":
+            seqs = seqs[::-1]
+        if limit is not None:
+            seqs = seqs[:limit]
+        return [(i, h[i]) for i in (seqs - first).tolist()]
@@ -0,0 +1,150 @@
+# app/history_mmap.py
+"""
+Memory-mapped, lazily materialized history files.
+
+``open_mapped(path)`` maps a history file and returns a read-only sequence of
+rows; a ``Calculation`` is only built when a row is accessed. Binary
+(``.chist``) files need no index, since their columns are fixed width. CSV
+files are checked row by row once at open, like an eager load, then get a
+row-offset index built by scanning the mapping for newlines in chunks (8 bytes
+per row: a row ends where the next one starts). Building Calculations and
+resident memory then depend on the rows actually touched, not on the file size.
+"""
+from __future__ import annotations
+import csv
+import mmap
+import struct
+from typing import Optional
+from .calculation import Calculation
+from .exceptions import PersistenceError
+from . import history_format
+
+_SCAN_CHUNK = 64 * 1024 * 1024
+_CODE = struct.Struct("<H")
+_F64 = struct.Struct("<d")
+_I64 = struct.Struct("<q")
+
+
+def _map(path: str) -> Optional[mmap.mmap]:
+    try:
+        with open(path, "rb") as fh:
+            return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:  # empty file: nothing to map
+        return None
+    except OSError as e:
+        raise PersistenceError(f"Failed to load history: {e}")
+
+
+class MappedRows:
+    """Read-only row sequence over a mapped file."""
+    def __init__(self, mm: Optional[mmap.mmap], rows: int):
+        self._mm = mm
+        self._rows = rows
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def __getitem__(self, index: int) -> Calculation:
+        if not 0 <= index < self._rows:
+            raise IndexError("row index out of range")
+        return self._row(index)
+
+    def _row(self, index: int) -> Calculation:  # pragma: no cover (abstract)
+        raise NotImplementedError
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+
+class MappedBinaryRows(MappedRows):
+    def __init__(self, path: str):
+        mm = _map(path)
+        ops, rows, pos = history_format.parse_header(mm if mm is not None else b"")
+        super().__init__(mm, rows)
+        self._ops = ops
+        self._codes = pos
+        self._a = pos + 2 * rows
+        self._b = self._a + 8 * rows
+        self._result = self._b + 8 * rows
+        self._ts = self._result + 8 * rows
+
+    def _row(self, i: int) -> Calculation:
+        mm = self._mm
+        (code,) = _CODE.unpack_from(mm, self._codes + 2 * i)
+        if code >= len(self._ops):
+            raise PersistenceError("History file has an invalid operation code.")
+        return Calculation(
+            self._ops[code],
+            _F64.unpack_from(mm, self._a + 8 * i)[0],
+            _F64.unpack_from(mm, self._b + 8 * i)[0],
+            _F64.unpack_from(mm, self._result + 8 * i)[0],
+            _I64.unpack_from(mm, self._ts + 8 * i)[0],
+        )
+
+
+class MappedCSVRows(MappedRows):
+    def __init__(self, path: str, encoding: str = "utf-8"):
+        from .history_csv import CSV_COLUMNS, load_csv
+        import numpy as np
+        mm = _map(path)
+        try:
+            load_csv(path, encoding=encoding, limit=0)   # refuse bad rows now, not on access
+        except Exception as e:
+            if mm is not None:
+                mm.close()
+            if isinstance(e, PersistenceError):
+                raise
+            raise PersistenceError(f"Failed to load history: {e}")
+        size = len(mm) if mm is not None else 0
+        # Line starts, from newlines scanned chunk by chunk so the scan itself stays small.
+        found = [np.zeros(1, dtype=np.int64)]
+        for start in range(0, size, _SCAN_CHUNK):
+            chunk = np.frombuffer(mm, dtype=np.uint8, count=min(_SCAN_CHUNK, size - start), offset=start)
+            found.append(np.flatnonzero(chunk == 0x0A) + (start + 1))
+            del chunk  # release the exported buffer so the map can be closed
+        starts = np.concatenate(found)
+        del found
+        if starts[-1] != size:
+            starts = np.append(starts, size)       # last line has no newline
+        # A line runs up to the next start. Blank lines ("", "\r") are at most
+        # two bytes with their newline; the load check above rules out short rows.
+        keep = np.diff(starts) > 2
+        keep[0] = False                            # the header
+        self._encoding = encoding
+        self._mm = mm
+        self._starts = np.append(starts[:-1][keep], size)
+        del keep
+        self._columns = [self._fields(0, int(starts[1])).index(col) for col in CSV_COLUMNS]
+        super().__init__(mm, len(self._starts) - 1)
+
+    def _fields(self, start: int, end: int) -> list:
+        line = self._mm[start:end].decode(self._encoding).rstrip("\r\n")
+        return next(csv.reader([line]), [])
+
+    def _row(self, i: int) -> Calculation:
+        # Blank lines before the next row end up in the slice; _fields strips them.
+        row = self._fields(int(self._starts[i]), int(self._starts[i + 1]))
+        op_i, a_i, b_i, r_i, ts_i = self._columns
+        try:
+            return Calculation(operation=row[op_i], a=float(row[a_i]), b=float(row[b_i]),
+                               result=float(row[r_i]), timestamp=row[ts_i])
+        except (IndexError, ValueError) as e:
+            raise PersistenceError(f"Bad history row {i + 1}: {e}")
+
+
+def supports_encoding(encoding: str) -> bool:
+    """Newline scanning needs an ASCII-compatible encoding."""
+    try:
+        return "\n,".encode(encoding) == b"\n,"
+    except LookupError:
+        return False
+
+
+def open_mapped(path: str, fmt: str = "auto", encoding: str = "utf-8") -> MappedRows:
+    if history_format.resolve_format(path, fmt) == "binary":
+        return MappedBinaryRows(path)
+    if not supports_encoding(encoding):
+        raise PersistenceError(f"Cannot memory-map a history file encoded as {encoding}.")
+    return MappedCSVRows(path, encoding)
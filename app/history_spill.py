@@ -0,0 +1,346 @@
+# app/history_spill.py
+"""
+Cold tier for evicted history entries.
+
+With spilling on, the in-memory History is the hot tier. Entries it evicts
+(see ``History.subscribe``, ``on_evict``) are buffered. Every
+``segment_rows`` entries, the buffer is written as an immutable segment: a
+zlib-compressed ``.chist`` file (see history_format). ``manifest.json`` lists
+each segment's file, row range, time span and result range, so reads and
+queries open only the segments they need.
+
+A background thread writes the full buffers; until a segment is on disk its
+rows are served from memory. ``close`` writes the partial last buffer.
+
+Cold rows are numbered from 0 (the oldest) and always count as applied:
+only hot entries can be undone. Segments persist across sessions until
+``clear``.
+
+A directory belongs to one spill at a time. ``claim`` locks the first free
+one of ``segments``, ``segments-1``, ``segments-2``, ... so calculators
+sharing a history_dir (server sessions, other processes) never write into
+each other's segments; after a restart they pick their directories up again.
+"""
+from __future__ import annotations
+import json
+import logging
+import math
+import os
+from itertools import count
+import threading
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from . import history_format
+from .calculation import Calculation
+from .exceptions import PersistenceError
+from .history_index import Range, filter_mask
+
+log = logging.getLogger(__name__)
+
+
+def _lock(path: str):
+    """An open handle holding an exclusive lock on ``path``, or None if it is taken."""
+    fh = open(path, "a+b")
+    try:
+        if os.name == "nt":  # pragma: no cover
+            import msvcrt
+            msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        fh.close()
+        return None
+    return fh
+
+
+@dataclass(frozen=True)
+class Segment:
+    file: str
+    first: int                      # cold index of the first row
+    rows: int
+    ts_min: Optional[int]           # epoch microseconds of the timed rows
+    ts_max: Optional[int]
+    result_min: Optional[float]     # over the non-NaN results
+    result_max: Optional[float]
+    verbatim: Dict[str, str] = field(default_factory=dict)   # row -> non-ISO timestamp
+
+
+class _SegmentColumns(NamedTuple):
+    op: object
+    a: object
+    b: object
+    result: object
+    ts: object      # float64, NaN for verbatim timestamps
+
+
+class HistorySpill:
+    """Evicted entries in compressed segment files (see module doc)."""
+    MANIFEST = "manifest.json"
+    level = 6               # zlib compression level
+    cached_segments = 2     # decoded segments kept for paging
+
+    def __init__(self, directory: str, segment_rows: int = 10000, lock=None):
+        self.directory = directory
+        self.segment_rows = max(int(segment_rows), 1)
+        self._dir_lock = lock   # released by close
+        self._lock = threading.Lock()
+        self._segments: List[Segment] = self._read_manifest()
+        self._sealed: List[Tuple[int, List[Calculation]]] = []   # full buffers not yet on disk
+        self._buffer: List[Calculation] = []
+        self._writer: Optional[threading.Thread] = None
+        self._error: Optional[Exception] = None
+        self._cache: "OrderedDict[str, List[Calculation]]" = OrderedDict()
+        self._paused = False
+
+    @classmethod
+    def claim(cls, directory: str, segment_rows: int = 10000) -> "HistorySpill":
+        """A spill on the first of ``directory``, ``directory-1``, ... that no one else holds."""
+        os.makedirs(os.path.dirname(directory) or ".", exist_ok=True)
+        for n in count():
+            path = directory if n == 0 else f"{directory}-{n}"
+            lock = _lock(path + ".lock")
+            if lock is not None:
+                return cls(path, segment_rows, lock=lock)
+
+    # ---- History listener hook ----
+    def on_evict(self, seq: int, calc: Calculation) -> None:
+        if self._paused:
+            return
+        self._buffer.append(calc)
+        if len(self._buffer) >= self.segment_rows:
+            self._seal()
+
+    @contextmanager
+    def paused(self):
+        """Ignore evictions, e.g. while replaying entries that were spilled before."""
+        self._paused = True
+        try:
+            yield
+        finally:
+            self._paused = False
+
+    # ---- Writing ----
+    def _count(self) -> int:
+        """Cold rows; lock held."""
+        if self._sealed:
+            first, calcs = self._sealed[-1]
+            written = first + len(calcs)
+        elif self._segments:
+            written = self._segments[-1].first + self._segments[-1].rows
+        else:
+            written = 0
+        return written + len(self._buffer)
+
+    def _seal(self) -> None:
+        """Hand the buffer to the writer thread."""
+        with self._lock:
+            if self._buffer:
+                self._sealed.append((self._count() - len(self._buffer), self._buffer))
+                self._buffer = []
+            if self._sealed and self._writer is None:
+                self._writer = threading.Thread(target=self._drain, name="history-spill", daemon=True)
+                self._writer.start()
+
+    def _drain(self) -> None:
+        while True:
+            with self._lock:
+                if not self._sealed:
+                    self._writer = None
+                    return
+                first, calcs = self._sealed[0]
+            try:
+                segment = self._write_segment(first, calcs)
+            except Exception as e:
+                # The rows stay in memory; the next seal or close retries.
+                log.exception("Failed to write history segment")
+                with self._lock:
+                    self._error = e
+                    self._writer = None
+                return
+            with self._lock:
+                self._segments.append(segment)
+                self._sealed.pop(0)
+                self._error = None
+                self._write_manifest()
+
+    def _write_segment(self, first: int, calcs: List[Calculation]) -> Segment:
+        verbatim = {str(i): c.timestamp for i, c in enumerate(calcs) if c.ts_micros is None}
+        if verbatim:   # the binary format only holds epoch microseconds
+            calcs = [Calculation(c.operation, c.a, c.b, c.result, 0) if str(i) in verbatim else c
+                     for i, c in enumerate(calcs)]
+        times = [c.ts_micros for i, c in enumerate(calcs) if str(i) not in verbatim]
+        results = [c.result for c in calcs if not math.isnan(c.result)]
+        name = f"segment-{first:012d}.chist.z"
+        path = os.path.join(self.directory, name)
+        os.makedirs(self.directory, exist_ok=True)
+        with open(path + ".tmp", "wb") as fh:
+            fh.write(zlib.compress(history_format.encode_binary(calcs), self.level))
+        os.replace(path + ".tmp", path)
+        return Segment(name, first, len(calcs), min(times, default=None), max(times, default=None),
+                       min(results, default=None), max(results, default=None), verbatim)
+
+    def _read_manifest(self) -> List[Segment]:
+        path = os.path.join(self.directory, self.MANIFEST)
+        if not os.path.exists(path):
+            return []
+        try:
+            with open(path, encoding="utf-8") as fh:
+                return [Segment(**seg) for seg in json.load(fh)["segments"]]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            raise PersistenceError(f"Failed to read history segment manifest: {e}")
+
+    def _write_manifest(self) -> None:
+        path = os.path.join(self.directory, self.MANIFEST)
+        with open(path + ".tmp", "w", encoding="utf-8") as fh:
+            json.dump({"version": 1, "segments": [asdict(s) for s in self._segments]}, fh)
+        os.replace(path + ".tmp", path)
+
+    def flush(self) -> None:
+        """Write every buffered row (the last segment may be short) and wait for it."""
+        self._seal()
+        writer = self._writer
+        if writer is not None:
+            writer.join()
+        if self._sealed:
+            raise PersistenceError(f"Failed to write history segment: {self._error}")
+
+    def close(self) -> None:
+        """Flush, then give the directory up."""
+        try:
+            self.flush()
+        finally:
+            if self._dir_lock is not None:
+                self._dir_lock.close()
+                self._dir_lock = None
+
+    def clear(self) -> None:
+        """Delete every segment and the manifest."""
+        writer = self._writer
+        if writer is not None:
+            writer.join()
+        with self._lock:
+            for seg in self._segments:
+                path = os.path.join(self.directory, seg.file)
+                if os.path.exists(path):
+                    os.remove(path)
+            manifest = os.path.join(self.directory, self.MANIFEST)
+            if os.path.exists(manifest):
+                os.remove(manifest)
+            self._segments, self._sealed, self._buffer = [], [], []
+            self._cache.clear()
+
+    # ---- Reading ----
+    @property
+    def segments(self) -> List[Segment]:
+        with self._lock:
+            return list(self._segments)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._count()
+
+    def _parts(self) -> List[Tuple[int, int, object]]:
+        """(first, rows, Segment or list of rows) covering every cold row, oldest first."""
+        with self._lock:
+            parts = [(s.first, s.rows, s) for s in self._segments]
+            parts += [(first, len(calcs), calcs) for first, calcs in self._sealed]
+            if self._buffer:
+                parts.append((self._count() - len(self._buffer), len(self._buffer), list(self._buffer)))
+        return parts
+
+    def _decode(self, seg: Segment):
+        try:
+            with open(os.path.join(self.directory, seg.file), "rb") as fh:
+                return history_format.decode_columns(zlib.decompress(fh.read()))
+        except (OSError, zlib.error) as e:
+            raise PersistenceError(f"Failed to read history segment {seg.file}: {e}")
+
+    def _rows(self, source) -> List[Calculation]:
+        if not isinstance(source, Segment):
+            return source
+        calcs = self._cache.get(source.file)
+        if calcs is None:
+            ops, (codes, a, b, result, ts) = self._decode(source)
+            calcs = [Calculation(ops[k], x, y, r, t) for k, x, y, r, t in zip(codes, a, b, result, ts)]
+            for row, text in source.verbatim.items():
+                c = calcs[int(row)]
+                calcs[int(row)] = Calculation(c.operation, c.a, c.b, c.result, text)
+            self._cache[source.file] = calcs
+            if len(self._cache) > self.cached_segments:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(source.file)
+        return calcs
+
+    def iter(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Calculation]:
+        """Cold rows [start, stop), decoding one segment at a time."""
+        for first, rows, source in self._parts():
+            if stop is not None and first >= stop:
+                break
+            if first + rows <= start:
+                continue
+            yield from self._rows(source)[max(start - first, 0):None if stop is None else stop - first]
+
+    def __iter__(self) -> Iterator[Calculation]:
+        return self.iter()
+
+    def __getitem__(self, index: int) -> Calculation:
+        for calc in self.iter(index, index + 1):
+            return calc
+        raise IndexError(index)
+
+    def query(self, operation: Optional[str] = None, a: Optional[Range] = None, b: Optional[Range] = None,
+              result: Optional[Range] = None, since: Optional[float] = None,
+              until: Optional[float] = None) -> List[Tuple[int, Calculation]]:
+        """Cold rows matching the filters of ``History.query``, oldest first."""
+        import numpy as np
+        t_lo = None if since is None else since * 1e6
+        t_hi = None if until is None else until * 1e6
+        timed = t_lo is not None or t_hi is not None
+        r_lo, r_hi = result if result is not None else (None, None)
+        out: List[Tuple[int, Calculation]] = []
+        for first, rows, source in self._parts():
+            if isinstance(source, Segment):
+                # The manifest rules out segments that cannot match.
+                if timed and (source.ts_min is None
+                              or (t_lo is not None and source.ts_max < t_lo)
+                              or (t_hi is not None and source.ts_min > t_hi)):
+                    continue
+                if result is not None and (source.result_min is None
+                                           or (r_lo is not None and source.result_max < r_lo)
+                                           or (r_hi is not None and source.result_min > r_hi)):
+                    continue
+                ops, (codes, av, bv, rv, tv) = self._decode(source)
+                ts = np.frombuffer(tv, dtype=np.int64).astype(np.float64)
+                for row in source.verbatim:
+                    ts[int(row)] = np.nan
+                cols = _SegmentColumns(np.frombuffer(codes, dtype=np.uint16), np.frombuffer(av),
+                                       np.frombuffer(bv), np.frombuffer(rv), ts)
+            else:
+                names: Dict[str, int] = {}
+                cols = _SegmentColumns(np.array([names.setdefault(c.operation, len(names)) for c in source]),
+                                       np.array([c.a for c in source], dtype=np.float64),
+                                       np.array([c.b for c in source], dtype=np.float64),
+                                       np.array([c.result for c in source], dtype=np.float64),
+                                       np.array([np.nan if (t := c.ts_micros) is None else t for c in source],
+                                                dtype=np.float64))
+                ops = list(names)
+            code = None
+            if operation is not None:
+                if operation not in ops:
+                    continue
+                code = ops.index(operation)
+            hits = np.flatnonzero(filter_mask(np, cols, slice(None), code, a, b, result, t_lo, t_hi)).tolist()
+            if not isinstance(source, Segment):
+                out.extend((first + i, source[i]) for i in hits)
+                continue
+            # Only the matching rows become Calculations.
+            for i in hits:
+                ts_i = source.verbatim.get(str(i), tv[i])
+                out.append((first + i, Calculation(ops[codes[i]], av[i], bv[i], rv[i], ts_i)))
+        return out
@@ -0,0 +1,350 @@
+# app/history_stats.py
+"""
+Running statistics over the applied history, behind ``History.stats()``.
+
+Per operation, the stats keep count, sum, mean and variance. The sum is
+compensated (Neumaier); mean and variance are folded together with the
+pairwise update of Chan et al., the batch form of Welford's method, which
+also runs in reverse to take values out. Quantiles come from a small
+log-bucketed sketch (``QuantileSketch``) that supports deletes. The overall
+figures are merged from the per-operation ones when read.
+
+Listener hooks record each change in O(1), as a value plus a signed
+operation code appended to two flat arrays:
+
+* ``on_push`` and ``on_redo`` add a result
+* ``on_undo`` and ``on_evict`` remove one
+* ``on_discard`` only trims the stored redo future
+* ``on_reset`` (clear, load, restore) rebuilds on the next call
+
+The change log is applied with numpy when the stats are read, or every
+``apply_at`` changes. A poll therefore costs O(changes since the last poll),
+not O(history). Min and max are exact: they are recomputed from a results
+column only after the current extreme leaves the window. Non-finite results
+are left out of every figure. Nothing is tracked until the first
+``History.stats()`` call.
+"""
+from __future__ import annotations
+import math
+from array import array
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from .calculation import Calculation
+
+if TYPE_CHECKING:
+    from .history import History
+
+
+class QuantileSketch:
+    """
+    Relative-error quantile sketch (DDSketch-style). Each value goes into a
+    bucket ``ceil(log_gamma |v|)``, so every estimate is within
+    ``relative_accuracy`` of a true value. Adds and removes just adjust
+    bucket counts; the bucket count grows with the value range, not with
+    the number of values.
+    """
+    MIN_VALUE = 1e-12   # smaller magnitudes count as zero
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self._pos: Dict[int, int] = {}
+        self._neg: Dict[int, int] = {}
+        self._zero = 0
+        self.count = 0
+
+    def update(self, np, values, sign: int = 1) -> None:
+        """Add (``sign=1``) or remove (``sign=-1``) every value of a numpy array."""
+        for store, part in ((self._pos, values[values > self.MIN_VALUE]),
+                            (self._neg, -values[values < -self.MIN_VALUE])):
+            if not len(part):
+                continue
+            keys, counts = np.unique(np.ceil(np.log(part) / self._log_gamma).astype(np.int64),
+                                     return_counts=True)
+            for key, n in zip(keys.tolist(), counts.tolist()):
+                n = store.get(key, 0) + sign * n
+                if n:
+                    store[key] = n
+                else:
+                    del store[key]
+        self._zero += sign * int(np.count_nonzero(np.abs(values) <= self.MIN_VALUE))
+        self.count += sign * len(values)
+
+    def merge(self, other: "QuantileSketch") -> None:
+        for mine, theirs in ((self._pos, other._pos), (self._neg, other._neg)):
+            for key, n in theirs.items():
+                mine[key] = mine.get(key, 0) + n
+        self._zero += other._zero
+        self.count += other.count
+
+    def _value(self, key: int) -> float:
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self._neg, reverse=True):
+            seen += self._neg[key]
+            if seen > rank:
+                return -self._value(key)
+        seen += self._zero
+        if seen > rank:
+            return 0.0
+        for key in sorted(self._pos):
+            seen += self._pos[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self._pos))  # pragma: no cover (rank < count)
+
+
+class RunningStats:
+    """Count, compensated sum, mean/variance, extremes and a quantile sketch."""
+    __slots__ = ("count", "_sum", "_comp", "mean", "_m2", "min", "max", "stale", "sketch")
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.count = 0
+        self._sum = self._comp = 0.0
+        self.mean = self._m2 = 0.0
+        self.min = self.max = None
+        self.stale = False           # min/max must be recomputed
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    def _add_sum(self, x: float) -> None:
+        s = self._sum
+        t = s + x
+        self._comp += (s - t) + x if abs(s) >= abs(x) else (x - t) + s
+        self._sum = t
+
+    def add(self, np, values) -> None:
+        """Fold in a numpy array of values."""
+        m = len(values)
+        if not m:
+            return
+        mean = float(values.mean())
+        m2 = float(((values - mean) ** 2).sum())
+        n = self.count + m
+        d = mean - self.mean
+        self.mean += d * m / n
+        self._m2 += m2 + d * d * self.count * m / n
+        self.count = n
+        self._add_sum(math.fsum(values.tolist()))
+        lo, hi = float(values.min()), float(values.max())
+        self.min = lo if self.min is None else min(self.min, lo)
+        self.max = hi if self.max is None else max(self.max, hi)
+        self.sketch.update(np, values)
+
+    def remove(self, np, values) -> None:
+        """Take out a numpy array of values that were added before."""
+        m = len(values)
+        if not m:
+            return
+        n = self.count - m
+        if n <= 0:
+            self.__init__(self.sketch.relative_accuracy)
+            return
+        mean = float(values.mean())
+        m2 = float(((values - mean) ** 2).sum())
+        rest = (self.mean * self.count - mean * m) / n
+        d = mean - rest
+        self._m2 = max(self._m2 - m2 - d * d * n * m / self.count, 0.0)
+        self.mean = rest
+        self.count = n
+        self._add_sum(-math.fsum(values.tolist()))
+        if float(values.min()) <= self.min or float(values.max()) >= self.max:
+            self.stale = True
+        self.sketch.update(np, values, -1)
+
+    def merge(self, other: "RunningStats") -> None:
+        """Fold ``other`` in; both must have fresh extremes."""
+        if not other.count:
+            return
+        n = self.count + other.count
+        d = other.mean - self.mean
+        self.mean += d * other.count / n
+        self._m2 += other._m2 + d * d * self.count * other.count / n
+        self.count = n
+        self._add_sum(other._sum)
+        self._add_sum(other._comp)
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self.sketch.merge(other.sketch)
+
+    @property
+    def sum(self) -> float:
+        return self._sum + self._comp
+
+    @property
+    def variance(self) -> float:
+        """Sample variance (n - 1 denominator, like pandas)."""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+
+@dataclass(frozen=True)
+class ResultStats:
+    count: int
+    sum: float
+    mean: float
+    variance: float
+    std: float
+    min: Optional[float]
+    max: Optional[float]
+    p50: Optional[float]   # quantiles are approximate (see QuantileSketch)
+    p90: Optional[float]
+    p99: Optional[float]
+
+
+@dataclass(frozen=True)
+class HistorySummary:
+    overall: ResultStats
+    by_operation: Dict[str, ResultStats]
+
+
+class HistoryStats:
+    """Running result statistics for one History (see module doc)."""
+    apply_at = 65536      # pending changes applied even without a read
+    prune_at = 4096       # evicted rows dropped from the results column
+
+    def __init__(self, history: "History", relative_accuracy: float = 0.01):
+        self._history = history
+        self.relative_accuracy = relative_accuracy
+        self.on_reset()
+        history.subscribe(self)
+
+    # ---- History listener hooks ----
+    def on_push(self, seq: int, calc: Calculation) -> None:
+        if not self._built:
+            return
+        code = self._codes.get(calc.operation)
+        if code is None:
+            code = self._codes[calc.operation] = len(self._names)
+            self._names.append(calc.operation)
+        x = calc.result
+        self._results.append(x)
+        self._ops.append(code)
+        self._log_values.append(x)
+        self._log_codes.append(code + 1)
+        if len(self._log_codes) >= self.apply_at:
+            self._apply_log()
+
+    def _log(self, calc: Calculation, sign: int) -> None:
+        if self._built:
+            self._log_values.append(calc.result)
+            self._log_codes.append(sign * (self._codes[calc.operation] + 1))
+            if len(self._log_codes) >= self.apply_at:
+                self._apply_log()
+
+    def on_redo(self, seq: int, calc: Calculation) -> None:
+        self._log(calc, 1)
+
+    def on_undo(self, seq: int, calc: Calculation) -> None:
+        self._log(calc, -1)
+
+    def on_evict(self, seq: int, calc: Calculation) -> None:
+        if not self._built:
+            return
+        self._log(calc, -1)
+        gone = seq + 1 - self._offset
+        if gone >= self.prune_at and gone * 2 >= len(self._results):
+            del self._results[:gone]
+            del self._ops[:gone]
+            self._offset = seq + 1
+
+    def on_discard(self, seq: int) -> None:
+        if self._built:
+            del self._results[seq - self._offset:]
+            del self._ops[seq - self._offset:]
+
+    def on_reset(self) -> None:
+        self._built = False
+        self._by_op: Dict[str, RunningStats] = {}
+        self._codes: Dict[str, int] = {}
+        self._names: List[str] = []
+        # Stored results and operation codes by seq (row r is seq offset + r).
+        self._results, self._ops = array("d"), array("i")
+        self._offset = 0
+        # Changes not applied yet: value and +/-(code + 1) for add/remove.
+        self._log_values, self._log_codes = array("d"), array("i")
+
+    # ---- Applying ----
+    def _apply_log(self) -> None:
+        import numpy as np
+        values = np.frombuffer(self._log_values, dtype=np.float64)
+        codes = np.frombuffer(self._log_codes, dtype=np.int32)
+        finite = np.isfinite(values)
+        for code in np.unique(np.abs(codes)).tolist():
+            name = self._names[code - 1]
+            st = self._by_op.get(name)
+            if st is None:
+                st = self._by_op[name] = RunningStats(self.relative_accuracy)
+            # Adds first: a value pushed and undone within one batch nets out.
+            st.add(np, values[finite & (codes == code)])
+            st.remove(np, values[finite & (codes == -code)])
+        del values, codes   # release the buffer exports before resizing
+        self._log_values, self._log_codes = array("d"), array("i")
+
+    def _applied(self, np):
+        """(results, op codes) of the applied entries as numpy views."""
+        h = self._history
+        start = h.first_seq - self._offset
+        stop = start + h._cursor + 1
+        return (np.frombuffer(self._results, dtype=np.float64)[start:stop],
+                np.frombuffer(self._ops, dtype=np.int32)[start:stop])
+
+    def build(self) -> None:
+        import numpy as np
+        h = self._history
+        self.on_reset()
+        codes, names = self._codes, self._names
+        calcs = list(h)
+        self._results = array("d", [c.result for c in calcs])
+        ops = []
+        for c in calcs:
+            code = codes.get(c.operation)
+            if code is None:
+                code = codes[c.operation] = len(names)
+                names.append(c.operation)
+            ops.append(code)
+        self._ops = array("i", ops)
+        self._offset = h.first_seq
+        self._built = True
+        results, ops = self._applied(np)
+        finite = np.isfinite(results)
+        for name, code in codes.items():
+            st = self._by_op[name] = RunningStats(self.relative_accuracy)
+            st.add(np, results[finite & (ops == code)])
+
+    # ---- Reading ----
+    def _refresh_extremes(self, np, st: RunningStats, code: int) -> None:
+        results, ops = self._applied(np)
+        values = results[np.isfinite(results) & (ops == code)]
+        st.min, st.max = (float(values.min()), float(values.max())) if len(values) else (None, None)
+        st.stale = False
+
+    @staticmethod
+    def _report(st: RunningStats) -> ResultStats:
+        qs = []
+        for q in (0.5, 0.9, 0.99):
+            v = st.sketch.quantile(q)
+            qs.append(None if v is None else min(max(v, st.min), st.max))
+        return ResultStats(st.count, st.sum, st.mean if st.count else 0.0, st.variance,
+                           math.sqrt(st.variance), st.min, st.max, *qs)
+
+    def summary(self) -> HistorySummary:
+        import numpy as np
+        if not self._built:
+            self.build()
+        elif self._log_codes:
+            self._apply_log()
+        overall = RunningStats(self.relative_accuracy)
+        by_op = {}
+        for name, st in sorted(self._by_op.items()):
+            if st.count:
+                if st.stale:
+                    self._refresh_extremes(np, st, self._codes[name])
+                overall.merge(st)
+                by_op[name] = self._report(st)
+        return HistorySummary(self._report(overall), by_op)
@@ -0,0 +1,383 @@
+# app/history_store.py
+"""
+Pluggable history persistence behind ``Calculator.save_history``/``load_history``.
+
+* ``FileStore`` (backend ``file``): a CSV or binary snapshot plus an
+  append-only journal (see journal). One writer per file.
+* ``SQLiteStore`` (backend ``sqlite``): one SQLite database in WAL mode that
+  several processes append to at the same time.
+
+A store gets every history event through ``record`` on the caller's thread
+and only buffers it; the auto-save writer calls ``flush`` to write.
+"""
+from __future__ import annotations
+import os
+import secrets
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from array import array
+from itertools import chain
+from typing import Dict, List, Optional, Tuple
+
+from .calculation import Calculation
+from .calculator_memento import CalculatorMemento
+from .exceptions import PersistenceError
+from .history import History
+from .history_format import resolve_format
+from .journal import HistoryJournal
+
+BACKENDS = ("file", "sqlite")
+
+
+class HistoryStore(ABC):
+    """Where a Calculator keeps its history between sessions."""
+
+    @abstractmethod
+    def record(self, event: str, history: History, calcs: Optional[List[Calculation]] = None) -> None:
+        """
+        Buffer a 'push' (of ``calcs``), 'merge' (a push of what ``read_new``
+        returned), 'undo', 'redo' or 'clear' already applied to ``history``.
+        """
+
+    @abstractmethod
+    def flush(self) -> None:
+        """Write everything buffered by ``record``."""
+
+    @abstractmethod
+    def save(self, history: History) -> None:
+        """Persist ``history`` as a whole."""
+
+    @abstractmethod
+    def load(self, history: History) -> None:
+        """Replace the contents of ``history`` with the persisted history."""
+
+    @abstractmethod
+    def read_new(self, max_size: int) -> List[Calculation]:
+        """Up to ``max_size`` newest persisted entries that this session does not hold, oldest first."""
+
+    def close(self) -> None:
+        self.flush()
+
+
+def open_store(config) -> HistoryStore:
+    """The store selected by ``config.history_backend``."""
+    if config.history_backend == "file":
+        return FileStore(config)
+    if config.history_backend == "sqlite":
+        return SQLiteStore(config.history_db_path, max_size=config.history_capacity)
+    raise PersistenceError(f"Unknown history backend {config.history_backend!r}; "
+                           f"use one of {', '.join(BACKENDS)}")
+
+
+class FileStore(HistoryStore):
+    """Snapshot file (CSV or binary) plus journal; loading = snapshot + replay."""
+
+    def __init__(self, config):
+        self.config = config
+        self.journal = HistoryJournal(
+            config.journal_path, config.history_path,
+            encoding=config.encoding,
+            compact_threshold=config.journal_compact_threshold,
+        )
+        # Until we save/load, the on-disk history belongs to a previous
+        # session; the first journaled event starts with a 'clear'.
+        self._synced = False
+
+    def record(self, event: str, history: History, calcs: Optional[List[Calculation]] = None) -> None:
+        if not self._synced:
+            self.journal.append_event('clear')
+            self._synced = True
+        if event in ('push', 'merge'):
+            self.journal.append_pushes(calcs)
+        else:
+            self.journal.append_event(event)
+        if self.journal.needs_compaction():
+            self.journal.compact_async(history.save(), self._write_snapshot)
+
+    def _write_snapshot(self, memento: CalculatorMemento, path: str) -> None:
+        h = History(max_size=self.config.history_capacity)
+        h.restore(memento)
+        # ``path`` is a temp name, so pick the format from the real snapshot path.
+        h.save_file(path, fmt=self._format(), encoding=self.config.encoding)
+
+    def _format(self) -> str:
+        return resolve_format(self.config.history_path, self.config.history_format)
+
+    def flush(self) -> None:
+        self.journal.flush()
+
+    def close(self) -> None:
+        self.journal.close()
+
+    def save(self, history: History) -> None:
+        self.journal.wait()
+        history.save_file(self.config.history_path, fmt=self._format(), encoding=self.config.encoding)
+        # The snapshot now holds everything; start a fresh journal.
+        self.journal.reset()
+        self._synced = True
+
+    def load(self, history: History) -> None:
+        self._read(history, lazy=True)
+        self._synced = True
+
+    def _read(self, history: History, lazy: bool) -> None:
+        """Snapshot plus journal into ``history``."""
+        cfg = self.config
+        self.journal.flush()
+        self.journal.wait()
+        if os.path.exists(cfg.history_path):
+            # Large files are memory-mapped and materialized row by row on access.
+            lazy = lazy and os.path.getsize(cfg.history_path) >= cfg.history_mmap_threshold
+            history.load_file(cfg.history_path, fmt=cfg.history_format, encoding=cfg.encoding, lazy=lazy)
+        elif self.journal.exists():
+            history.clear()
+        else:
+            raise PersistenceError("History file does not exist.")
+        self.journal.replay(history)
+
+    def read_new(self, max_size: int) -> List[Calculation]:
+        if self._synced:
+            return []    # the files were written from this session's history
+        h = History(max_size=max_size)
+        self._read(h, lazy=False)
+        return h.items[:h._cursor + 1]
+
+
+# ---- SQLite ----
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS calculations (
+    id INTEGER PRIMARY KEY,
+    session INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    operation TEXT NOT NULL,
+    a REAL, b REAL, result REAL,
+    ts,
+    applied INTEGER NOT NULL DEFAULT 1,
+    UNIQUE (session, seq)
+);
+CREATE INDEX IF NOT EXISTS calculations_operation ON calculations (operation);
+CREATE INDEX IF NOT EXISTS calculations_ts ON calculations (ts);
+"""
+_UPSERT = ("INSERT INTO calculations (session, seq, operation, a, b, result, ts, applied) "
+           "VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (session, seq) DO UPDATE SET "
+           "operation = excluded.operation, a = excluded.a, b = excluded.b, "
+           "result = excluded.result, ts = excluded.ts, applied = excluded.applied")
+_SET_BY_KEY = "UPDATE calculations SET applied = ? WHERE session = ? AND seq = ?"
+_SET_BY_ID = "UPDATE calculations SET applied = ? WHERE id = ?"
+_HIDE_SESSION = "UPDATE calculations SET applied = 0 WHERE session = ?"
+_NAN = float("nan")
+
+
+class _Database:
+    """A process-wide connection to one database file, shared by its stores."""
+    busy_timeout = 30.0    # seconds to wait for another process's write
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        try:
+            self.conn = sqlite3.connect(path, timeout=self.busy_timeout, isolation_level=None,
+                                        check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode = WAL")
+            self.conn.execute("PRAGMA synchronous = NORMAL")
+            self.conn.executescript(_SCHEMA)
+        except sqlite3.Error as e:
+            raise PersistenceError(f"Failed to open history database: {e}")
+        self.lock = threading.Lock()
+        self.users = 0
+
+
+_databases: Dict[Tuple[int, str], _Database] = {}
+_databases_lock = threading.Lock()
+
+
+def _acquire(path: str) -> _Database:
+    key = (os.getpid(), os.path.realpath(path))   # a forked child opens its own
+    with _databases_lock:
+        db = _databases.get(key)
+        if db is None:
+            db = _databases[key] = _Database(path)
+        db.users += 1
+        return db
+
+
+def _release(db: _Database) -> None:
+    with _databases_lock:
+        db.users -= 1
+        if db.users:
+            return
+        for key, other in list(_databases.items()):
+            if other is db:
+                del _databases[key]
+        db.conn.close()
+
+
+class SQLiteStore(HistoryStore):
+    """
+    History rows in a shared SQLite database.
+
+    Every calculator writes its own rows, keyed by a random session id and
+    the history sequence number. Undo, redo and clear only flip the row's
+    ``applied`` flag, so sessions never rewrite each other's rows. Each
+    ``flush`` writes the buffered records as a few ``executemany`` calls in
+    one ``BEGIN IMMEDIATE`` transaction. ``load`` reads the newest applied
+    rows of all sessions, in commit order.
+    """
+
+    def __init__(self, path: str, max_size: int = 1000):
+        self.path = path
+        self.max_size = max_size
+        self._db: Optional[_Database] = None
+        self._lock = threading.Lock()         # guards the buffer and session state
+        self._write_lock = threading.Lock()   # keeps flushes in record order
+        self._ops: List[Tuple[str, list]] = []
+        self._merging: List[int] = []         # row ids returned by read_new
+        self._new_session()
+
+    def _new_session(self, loaded: Optional[array] = None) -> None:
+        """Start writing under a fresh session id (history seqs restart at 0)."""
+        self._session = secrets.randbits(62)
+        # Row ids of loaded entries: history seq i is row ``_loaded[i]``.
+        self._loaded = loaded if loaded is not None else array("q")
+
+    def _add(self, sql: str, params: tuple) -> None:
+        if self._ops and self._ops[-1][0] is sql:
+            self._ops[-1][1].append(params)
+        else:
+            self._ops.append((sql, [params]))
+
+    def _rows(self, calcs, seq: int, applied: int) -> list:
+        session = self._session
+        return [(session, seq + i, c.operation, c.a, c.b, c.result,
+                 c.timestamp if (ts := c.ts_micros) is None else ts, applied)
+                for i, c in enumerate(calcs)]
+
+    def _set_applied(self, seq: int, applied: int) -> None:
+        if seq < len(self._loaded):
+            self._add(_SET_BY_ID, (applied, self._loaded[seq]))
+        else:
+            self._add(_SET_BY_KEY, (applied, self._session, seq))
+
+    def _hide_session(self) -> None:
+        """Hide every row this session wrote, loaded or merged."""
+        self._add(_HIDE_SESSION, (self._session,))
+        for row_id in chain(self._loaded, self._merging):
+            self._add(_SET_BY_ID, (0, row_id))
+        self._merging = []
+
+    def record(self, event: str, history: History, calcs: Optional[List[Calculation]] = None) -> None:
+        with self._lock:
+            if event == 'merge':
+                # The merged rows move into this session: copies are written
+                # below and the originals hidden, so no row is loaded twice.
+                for row_id in self._merging:
+                    self._add(_SET_BY_ID, (0, row_id))
+                self._merging = []
+                event = 'push'
+            if event == 'push':
+                if len(calcs) >= self.max_size:
+                    self._new_session()      # the history was reset to the batch
+                seq = history.first_seq + history._cursor + 1 - len(calcs)
+                del self._loaded[max(seq, 0):]   # a push drops the redo future
+                rows = self._rows(calcs, seq, 1)
+                if self._ops and self._ops[-1][0] is _UPSERT:
+                    self._ops[-1][1].extend(rows)
+                else:
+                    self._ops.append((_UPSERT, rows))
+            elif event == 'undo':
+                self._set_applied(history.first_seq + history._cursor + 1, 0)
+            elif event == 'redo':
+                self._set_applied(history.first_seq + history._cursor, 1)
+            elif event == 'clear':
+                self._hide_session()
+                self._new_session()
+
+    def _database(self) -> _Database:
+        if self._db is None:
+            self._db = _acquire(self.path)
+        return self._db
+
+    def flush(self) -> None:
+        with self._write_lock:
+            with self._lock:
+                ops, self._ops = self._ops, []
+            if ops:
+                try:
+                    self._write(ops)
+                except PersistenceError:
+                    with self._lock:
+                        self._ops[:0] = ops   # retried by the next flush
+                    raise
+
+    def _write(self, ops: List[Tuple[str, list]]) -> None:
+        db = self._database()
+        conn = db.conn
+        with db.lock:
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                for sql, params in ops:
+                    conn.executemany(sql, params)
+                conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise PersistenceError(f"Failed to write history database: {e}")
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            if self._db is not None:
+                _release(self._db)
+                self._db = None
+
+    def save(self, history: History) -> None:
+        """Write ``history`` as new rows and hide the ones this session had written or loaded."""
+        with self._write_lock:
+            with self._lock:
+                self._hide_session()
+                self._new_session()
+                stored = history.items
+                first, applied = history.first_seq, history._cursor + 1
+                self._ops.append((_UPSERT, self._rows(stored[:applied], first, 1) +
+                                  self._rows(stored[applied:], first + applied, 0)))
+                ops, self._ops = self._ops, []
+            self._write(ops)
+
+    def _select(self, where: str, params: tuple, limit: int) -> list:
+        """The newest ``limit`` applied rows matching ``where``, oldest first."""
+        if not os.path.exists(self.path):
+            raise PersistenceError("History database does not exist.")
+        self.flush()
+        db = self._database()
+        try:
+            with db.lock:
+                rows = db.conn.execute(
+                    "SELECT id, operation, a, b, result, ts FROM calculations "
+                    f"WHERE applied{where} ORDER BY id DESC LIMIT ?", params + (limit,)).fetchall()
+        except sqlite3.Error as e:
+            raise PersistenceError(f"Failed to load history: {e}")
+        rows.reverse()
+        return rows
+
+    @staticmethod
+    def _calcs(rows: list) -> List[Calculation]:
+        # SQLite stores NaN as NULL.
+        return [Calculation(op, _NAN if a is None else a, _NAN if b is None else b,
+                            _NAN if r is None else r, ts) for _, op, a, b, r, ts in rows]
+
+    def load(self, history: History) -> None:
+        rows = self._select("", (), self.max_size)
+        history.replace(self._calcs(rows))
+        with self._lock:
+            self._new_session(array("q", [row[0] for row in rows]))
+
+    def read_new(self, max_size: int) -> List[Calculation]:
+        """Rows of other sessions that were neither written nor loaded by this one."""
+        with self._lock:
+            session, loaded = self._session, set(self._loaded)
+        rows = self._select(" AND session != ?", (session,), max_size + len(loaded))
+        rows = [row for row in rows if row[0] not in loaded][-max_size:] if max_size > 0 else []
+        with self._lock:
+            self._merging.extend(row[0] for row in rows)
+        return self._calcs(rows)
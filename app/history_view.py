@@ -0,0 +1,91 @@
+# app/history_view.py
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Callable, Iterator, Tuple
+from .history import History
+
+
+def format_entry(item) -> str:
+    return f"{item.operation}({float(item.a)}, {float(item.b)}) = {item.result} @ {item.timestamp}"
+
+
+class HistoryView:
+    """
+    Renders windows of the applied history as numbered lines, lazily.
+
+    Formatted lines are cached by entry sequence number (see
+    ``History.first_seq``), so paging back and forth or undo/redo reuse them.
+    The history invalidates exactly the discarded positions (a push after
+    undo) or everything (clear/load) through its listener hooks.
+
+    With a spill attached (see history_spill), the cold entries come first;
+    they are streamed a segment at a time and not cached.
+    """
+
+    def __init__(self, get_history: Callable[[], History], max_cached: int = 4096):
+        self._get_history = get_history
+        self._history: History | None = None
+        self._cache: "OrderedDict[int, str]" = OrderedDict()
+        self.max_cached = max_cached
+        self.hits = 0
+        self.misses = 0
+
+    # ---- History listener hooks ----
+    def on_discard(self, seq: int) -> None:
+        for key in [k for k in self._cache if k >= seq]:
+            del self._cache[key]
+
+    def on_reset(self) -> None:
+        self._cache.clear()
+
+    def _current(self) -> History:
+        history = self._get_history()
+        if history is not self._history:
+            # clear_history()/restore may swap in a new History object
+            self._cache.clear()
+            history.subscribe(self)
+            self._history = history
+        return history
+
+    def __len__(self) -> int:
+        """Number of applied entries, cold ones included."""
+        history = self._current()
+        return history.spilled + history._cursor + 1
+
+    def window(self, last: int | None = None, offset: int = 0) -> Tuple[int, int]:
+        """
+        [start, stop) over the applied entries. Without ``last`` the window
+        skips ``offset`` entries from the oldest; with it, it holds the
+        ``last`` entries ending ``offset`` entries before the newest.
+        """
+        n = len(self)
+        if last is None:
+            return min(offset, n), n
+        stop = max(n - offset, 0)
+        return max(stop - last, 0), stop
+
+    def lines(self, start: int, stop: int) -> Iterator[str]:
+        """Yield numbered lines for logical indexes [start, stop)."""
+        history = self._current()
+        cold = history.spilled
+        if start < cold:
+            for i, item in enumerate(history.spill.iter(start, min(stop, cold)), start):
+                yield f"{i + 1}. {format_entry(item)}"
+            start = cold
+        cache = self._cache
+        for i in range(start, stop):
+            seq = history.first_seq + i - cold
+            body = cache.get(seq)
+            if body is None:
+                self.misses += 1
+                body = cache[seq] = format_entry(history[i - cold])
+                if len(cache) > self.max_cached:
+                    cache.popitem(last=False)
+            else:
+                self.hits += 1
+                cache.move_to_end(seq)
+            yield f"{i + 1}. {body}"
+
+    def __call__(self) -> list[str]:
+        """Every applied line (the legacy ``HistoryCommand`` callable contract)."""
+        return list(self.lines(0, len(self)))
@@ -1,7 +1,12 @@
 # app/input_validators.py
-from typing import Tuple, Union
+from __future__ import annotations
+from numbers import Real
+from typing import TYPE_CHECKING, Dict, Optional, Tuple, Union
 from .exceptions import ValidationError  # << unify on shared ValidationError
 
+if TYPE_CHECKING:
+    import numpy as np
+
 NumberLike = Union[int, float, str]
 
 
@@ -48,17 +53,53 @@ def validate_operation(op: str) -> str:
     return normalized
 
 
-def validate_bounds(a: NumberLike, b: NumberLike, *_, **__) -> Tuple[Union[int, float], Union[int, float]]:
-    """Return normalized numbers (a, b). Extra args ignored for compatibility."""
-    return validate_number(a), validate_number(b)
+def validate_bounds(a: NumberLike, b: NumberLike, *_, max_value: Optional[Real] = None,
+                    **__) -> Tuple[Union[int, float], Union[int, float]]:
+    """
+    Return normalized numbers (a, b), rejecting magnitudes above ``max_value``
+    (any real number, e.g. a NumPy float or a Decimal; None means no limit).
+    Other extra args are ignored for compatibility.
+    """
+    a, b = validate_number(a), validate_number(b)
+    if max_value is not None:
+        limit = float(max_value)
+        if not (-limit <= a <= limit and -limit <= b <= limit):
+            raise ValidationError(f"Input exceeds maximum allowed value of {limit:g}.")
+    return a, b
+
+
+def validate_arrays(a, b, max_value: Optional[Real] = None) -> Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Vectorized validate_bounds() for operand arrays. Returns float64 (a, b)
+    plus message -> failing row indices instead of raising on the first bad row.
+    """
+    import numpy as np
+    try:
+        a, b = np.broadcast_arrays(np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64))
+    except (TypeError, ValueError) as exc:
+        raise ValidationError(f"Invalid operand arrays: {exc}") from exc
+    errors: Dict[str, np.ndarray] = {}
+    nan = np.isnan(a) | np.isnan(b)
+    if nan.any():
+        errors["NaN is not allowed."] = np.flatnonzero(nan)
+    inf = np.isinf(a) | np.isinf(b)
+    if inf.any():
+        errors["Infinity is not allowed."] = np.flatnonzero(inf & ~nan)
+    if max_value is not None:
+        max_value = float(max_value)
+        with np.errstate(invalid="ignore"):
+            big = ((np.abs(a) > max_value) | (np.abs(b) > max_value)) & ~(nan | inf)
+        if big.any():
+            errors[f"Input exceeds maximum allowed value of {max_value:g}."] = np.flatnonzero(big)
+    return a, b, errors
 
 
-def parse_two_numbers(a, b=None, *_, **__):
+def parse_two_numbers(a, b=None, *_, **kwargs):
     """
     Accepts either:
       - two positional values: parse_two_numbers(a, b)
       - a single iterable:    parse_two_numbers([a, b]) or parse_two_numbers((a, b))
-    Returns (a_num, b_num) after validation.
+    Returns (a_num, b_num) after validation (``max_value=`` bounds them).
     """
     if b is None and isinstance(a, (list, tuple)):
         if len(a) < 2:
@@ -66,4 +107,4 @@ def parse_two_numbers(a, b=None, *_, **__):
         a, b = a[0], a[1]
     if b is None:
         raise ValidationError("Expected two numbers (a, b).")
-    return validate_bounds(a, b)
+    return validate_bounds(a, b, max_value=kwargs.get("max_value"))
@@ -0,0 +1,220 @@
+# app/journal.py
+from __future__ import annotations
+import json
+import os
+import threading
+from typing import Callable, List, Optional
+from .calculation import Calculation
+from .calculator_memento import CalculatorMemento
+from .exceptions import HistoryError, PersistenceError
+
+
+class HistoryJournal:
+    """
+    Append-only write-ahead log of history events (push/undo/redo/clear).
+
+    Each event is one JSON line, so persisting a calculation costs the same
+    no matter how big the history is. Records are buffered until ``flush()``
+    so a background writer can group-commit them. The CSV at
+    ``snapshot_path`` holds the state up to the last compaction; loading =
+    snapshot + journal replay. Once the journal grows past
+    ``compact_threshold`` records it is rotated and a background thread folds
+    it into a fresh snapshot.
+    """
+
+    def __init__(self, path: str, snapshot_path: str, encoding: str = 'utf-8',
+                 compact_threshold: int = 10000):
+        self.path = path
+        self.snapshot_path = snapshot_path
+        self.encoding = encoding
+        self.compact_threshold = compact_threshold
+        self._lock = threading.Lock()
+        self._fh = None
+        self._pending: List[str] = []
+        self._records = 0
+        self._compactor: Optional[threading.Thread] = None
+
+    @property
+    def rotated_path(self) -> str:
+        return self.path + '.compacting'
+
+    @property
+    def records(self) -> int:
+        """Records appended since the last compaction."""
+        return self._records
+
+    # ---- Writing ----
+    def append_pushes(self, calcs: List[Calculation]) -> None:
+        lines = [json.dumps(self._push_record(c), separators=(',', ':')) + '\n' for c in calcs]
+        with self._lock:
+            self._pending.extend(lines)
+            self._records += len(lines)
+
+    @staticmethod
+    def _push_record(calc: Calculation) -> dict:
+        rec = {'e': 'push', 'operation': calc.operation, 'a': calc.a, 'b': calc.b, 'result': calc.result}
+        # Epoch microseconds keep ISO formatting out of the compute path.
+        us = calc.ts_micros
+        if us is None:
+            rec['timestamp'] = calc.timestamp
+        else:
+            rec['ts'] = us
+        return rec
+
+    def append_event(self, event: str) -> None:
+        """Record an 'undo', 'redo' or 'clear' event."""
+        self._append({'e': event})
+
+    def _append(self, record: dict) -> None:
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._pending.append(line)
+            self._records += 1
+
+    @property
+    def pending(self) -> int:
+        """Records buffered in memory and not yet written."""
+        return len(self._pending)
+
+    def flush(self) -> None:
+        """Write all buffered records with a single write() call."""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not self._pending:
+            return
+        try:
+            if self._fh is None:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                self._fh = open(self.path, 'a', encoding=self.encoding)
+            self._fh.write(''.join(self._pending))
+            self._fh.flush()
+            self._pending.clear()
+        except Exception as e:
+            raise PersistenceError(f"Failed to append to history journal: {e}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_locked()
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+    # ---- Compaction ----
+    def needs_compaction(self) -> bool:
+        return self._records >= self.compact_threshold and not self.compacting
+
+    @property
+    def compacting(self) -> bool:
+        return self._compactor is not None and self._compactor.is_alive()
+
+    def compact_async(self, snapshot: CalculatorMemento,
+                      write_snapshot: Callable[[CalculatorMemento, str], None]) -> None:
+        """
+        Rotate the journal and fold it into a new snapshot in the background.
+        ``snapshot`` must reflect every record written so far; records appended
+        after this call go to a fresh journal and survive the compaction.
+        """
+        with self._lock:
+            self._flush_locked()
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+            if not os.path.exists(self.path):
+                return
+            os.replace(self.path, self.rotated_path)
+            self._records = 0
+        self._compactor = threading.Thread(
+            target=self._compact, args=(snapshot, write_snapshot),
+            name='history-compactor', daemon=True,
+        )
+        self._compactor.start()
+
+    def _compact(self, snapshot: CalculatorMemento,
+                 write_snapshot: Callable[[CalculatorMemento, str], None]) -> None:
+        try:
+            tmp = self.snapshot_path + '.tmp'
+            write_snapshot(snapshot, tmp)
+            os.replace(tmp, self.snapshot_path)
+            os.remove(self.rotated_path)
+        except Exception:
+            # Leave the rotated journal in place; load() will replay it.
+            pass
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Block until a running background compaction has finished."""
+        if self._compactor is not None:
+            self._compactor.join(timeout)
+
+    def reset(self) -> None:
+        """Drop all journal records (after a full snapshot has been written)."""
+        self.wait()
+        with self._lock:
+            self._pending.clear()
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+            for p in (self.path, self.rotated_path):
+                if os.path.exists(p):
+                    os.remove(p)
+            self._records = 0
+
+    # ---- Replay ----
+    def exists(self) -> bool:
+        return os.path.exists(self.path) or os.path.exists(self.rotated_path)
+
+    def replay(self, history) -> int:
+        """Apply journal records on top of ``history``; returns records applied."""
+        applied = 0
+        for path in self._replay_paths():
+            applied += self._replay_file(path, history)
+        with self._lock:
+            self._records = applied
+        return applied
+
+    def _replay_paths(self):
+        paths = []
+        if os.path.exists(self.rotated_path):
+            # An interrupted compaction: the rotated records are only pending
+            # if the snapshot was not replaced after the rotation.
+            snap_done = (os.path.exists(self.snapshot_path) and
+                         os.path.getmtime(self.snapshot_path) >= os.path.getmtime(self.rotated_path))
+            if not snap_done:
+                paths.append(self.rotated_path)
+        if os.path.exists(self.path):
+            paths.append(self.path)
+        return paths
+
+    def _replay_file(self, path: str, history) -> int:
+        applied = 0
+        try:
+            with open(path, 'r', encoding=self.encoding) as fh:
+                for line in fh:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # torn write at the tail of the log
+                    self._apply(rec, history)
+                    applied += 1
+        except OSError as e:
+            raise PersistenceError(f"Failed to read history journal: {e}")
+        return applied
+
+    @staticmethod
+    def _apply(rec: dict, history) -> None:
+        event = rec.get('e')
+        try:
+            if event == 'push':
+                history.push(Calculation(
+                    operation=rec['operation'], a=rec['a'], b=rec['b'],
+                    result=rec['result'], timestamp=rec['ts'] if 'ts' in rec else rec['timestamp'],
+                ))
+            elif event == 'undo':
+                history.undo()
+            elif event == 'redo':
+                history.redo()
+            elif event == 'clear':
+                history.clear()
+        except HistoryError:
+            pass  # undo/redo past a compaction boundary
@@ -0,0 +1,135 @@
+# app/loadtest.py
+"""
+Load generator for the network mode:
+
+    python -m app.loadtest --port 8765 [--clients 50] [--requests 2000] [--pipeline 16]
+    python -m app.loadtest --spawn ...   # starts a throwaway server on a Unix socket
+
+Each client opens one connection and keeps up to ``--pipeline`` requests in
+flight. Latency is measured per request, from send to reply. Reports
+throughput and tail latency.
+"""
+from __future__ import annotations
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_COMMAND = "add 2 3"
+
+
+async def _client(latencies: List[float], requests: int, pipeline: int, command: str,
+                  host: str, port: Optional[int], path: Optional[str]) -> int:
+    if path is not None:
+        reader, writer = await asyncio.open_unix_connection(path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    sent_at = deque()
+    sent = errors = 0
+    try:
+        while sent < requests or sent_at:
+            burst = []
+            while sent < requests and len(sent_at) < pipeline:
+                burst.append(json.dumps({"id": sent, "cmd": command}) + "\n")
+                sent_at.append(time.perf_counter())
+                sent += 1
+            if burst:
+                writer.write("".join(burst).encode())
+                await writer.drain()
+            line = await reader.readline()
+            if not line:
+                raise ConnectionError("server closed the connection")
+            reply = json.loads(line)
+            if "event" in reply:
+                raise ConnectionError(f"server sent {reply['event']!r}")
+            latencies.append(time.perf_counter() - sent_at.popleft())
+            errors += not reply.get("ok")
+    finally:
+        writer.close()
+    return errors
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+async def run_load(clients: int = 50, requests: int = 2000, pipeline: int = 16,
+                   command: str = DEFAULT_COMMAND, host: str = "127.0.0.1",
+                   port: Optional[int] = None, path: Optional[str] = None) -> Dict[str, float]:
+    """Run ``clients`` concurrent connections of ``requests`` requests each."""
+    latencies: List[float] = []
+    started = time.perf_counter()
+    errors = await asyncio.gather(*(
+        _client(latencies, requests, pipeline, command, host, port, path) for _ in range(clients)
+    ))
+    elapsed = time.perf_counter() - started
+    ordered = sorted(latencies)
+    ms = 1000.0
+    return {
+        "clients": clients, "pipeline": pipeline, "requests": len(ordered),
+        "errors": sum(errors), "seconds": elapsed,
+        "rps": len(ordered) / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": _percentile(ordered, 0.50) * ms, "p90_ms": _percentile(ordered, 0.90) * ms,
+        "p99_ms": _percentile(ordered, 0.99) * ms, "p999_ms": _percentile(ordered, 0.999) * ms,
+        "max_ms": (ordered[-1] if ordered else 0.0) * ms,
+    }
+
+
+def format_report(r: Dict[str, float]) -> str:
+    return (f"{r['requests']:,} requests ({r['errors']} errors) from {r['clients']} clients, "
+            f"pipeline {r['pipeline']}, in {r['seconds']:.2f}s: {r['rps']:,.0f} req/s\n"
+            f"latency ms: p50 {r['p50_ms']:.3f}  p90 {r['p90_ms']:.3f}  p99 {r['p99_ms']:.3f}  "
+            f"p99.9 {r['p999_ms']:.3f}  max {r['max_ms']:.3f}")
+
+
+def _spawn_server(workdir: str) -> Tuple[subprocess.Popen, str]:  # pragma: no cover
+    path = os.path.join(workdir, "calc.sock")
+    env = dict(os.environ, CALCULATOR_LOG_DIR=os.path.join(workdir, "logs"),
+               CALCULATOR_HISTORY_DIR=os.path.join(workdir, "history"))
+    proc = subprocess.Popen([sys.executable, "-m", "app", "serve", "--socket", path],
+                            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while not os.path.exists(path):
+        if proc.poll() is not None or time.monotonic() > deadline:
+            proc.kill()
+            raise SystemExit("server did not start")
+        time.sleep(0.05)
+    return proc, path
+
+
+def main(argv=None) -> int:  # pragma: no cover
+    import argparse
+    parser = argparse.ArgumentParser(prog="python -m app.loadtest", description=__doc__.split("\n\n")[0])
+    where = parser.add_mutually_exclusive_group(required=True)
+    where.add_argument("--port", type=int)
+    where.add_argument("--socket")
+    where.add_argument("--spawn", action="store_true", help="start a server on a temporary Unix socket")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000, help="requests per client")
+    parser.add_argument("--pipeline", type=int, default=16, help="requests in flight per client")
+    parser.add_argument("--command", default=DEFAULT_COMMAND)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        proc, path = _spawn_server(workdir) if args.spawn else (None, args.socket)
+        try:
+            report = asyncio.run(run_load(args.clients, args.requests, args.pipeline, args.command,
+                                          args.host, args.port, path))
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait(10)
+    print(format_report(report))
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,165 @@
+# app/log_queue.py
+"""
+Queue-based logging pipeline used by ``init_logging``.
+
+Callers only enqueue: the root logger gets a ``LazyQueueHandler`` that
+skips formatting, and ``LoggingObserver`` enqueues the Calculation itself.
+A ``BatchingQueueListener`` thread wakes every ``interval`` seconds,
+formats everything queued, writes it, and flushes each handler once.
+Imported on demand so that ``import app`` does not pay for logging.handlers.
+"""
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+from typing import Optional
+from .calculation import Calculation
+
+
+class CalcMessage:
+    """Formats a calculation only if the record is actually written."""
+    __slots__ = ("calc",)
+
+    def __init__(self, calc: Calculation):
+        self.calc = calc
+
+    def __str__(self) -> str:
+        c = self.calc
+        return f"{c.operation}({c.a}, {c.b}) = {c.result} @ {c.timestamp}"
+
+
+class CalcRecord(logging.LogRecord):
+    """
+    INFO record for a calculation, built on the listener thread. It sets only
+    what our formatters read, which is far cheaper than LogRecord.__init__.
+    """
+    def __init__(self, calc: Calculation):
+        self.name = "root"
+        self.msg = "CALC %s"
+        self.args = (CalcMessage(calc),)
+        self.levelname = "INFO"
+        self.levelno = logging.INFO
+        us = calc.ts_micros
+        self.created = us / 1e6 if us is not None else time.time()
+        self.msecs = (us // 1000 % 1000) if us is not None else 0
+        self.exc_info = self.exc_text = self.stack_info = None
+
+
+class _BatchFlush:
+    """
+    Handler mixin: emit() leaves records in the stream's buffer, and the
+    listener flushes once per batch instead of once per record.
+    """
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        super().flush()
+
+
+class BatchedFileHandler(_BatchFlush, logging.FileHandler):
+    pass
+
+
+class BatchedRotatingFileHandler(_BatchFlush, logging.handlers.RotatingFileHandler):
+    """
+    Size-based rotation that counts the bytes it writes. The stock check
+    stats and seeks the file for every record, and the seek would flush the
+    batch.
+    """
+    _written: Optional[int] = None
+    _last = (None, "")
+
+    def format(self, record) -> str:
+        # shouldRollover() and emit() both format the same record.
+        last, text = self._last
+        if last is not record:
+            text = super().format(record)
+            self._last = (record, text)
+        return text
+
+    def shouldRollover(self, record) -> bool:
+        if self.maxBytes <= 0:
+            return False
+        if self.stream is None:
+            self.stream = self._open()
+        if self._written is None:
+            self._written = self.stream.tell()
+        size = len(self.format(record)) + 1
+        if self._written and self._written + size >= self.maxBytes:
+            self._written = size  # the record goes to the fresh file
+            return True
+        self._written += size
+        return False
+
+
+class BatchedTimedRotatingFileHandler(_BatchFlush, logging.handlers.TimedRotatingFileHandler):
+    pass
+
+
+class BatchedStreamHandler(_BatchFlush, logging.StreamHandler):
+    pass
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueue records unformatted. The listener thread does the %-formatting,
+    so the calling thread only pays for the record and one queue put.
+    """
+    def prepare(self, record):
+        return record
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """
+    Drains every queued record, writes them all, flushes each handler once,
+    then sleeps ``interval`` seconds. While it sleeps, callers enqueue without
+    waking it, so a burst of records costs one wake-up and one write per batch.
+    """
+    max_batch = 4096
+
+    def __init__(self, records, *handlers, interval: float = 0.05):
+        super().__init__(records, *handlers)
+        self.interval = interval
+        self._stopping = threading.Event()
+
+    def _monitor(self):
+        q = self.queue
+        while True:
+            batch = [q.get()]
+            try:
+                while len(batch) < self.max_batch:
+                    batch.append(q.get_nowait())
+            except queue.Empty:
+                pass
+            stop = False
+            for record in batch:
+                if record is self._sentinel:
+                    stop = True
+                elif record.__class__ is Calculation:
+                    self.handle(CalcRecord(record))
+                else:
+                    self.handle(record)
+            for handler in self.handlers:
+                getattr(handler, "flush_batch", handler.flush)()
+            if stop:
+                return
+            if len(batch) < self.max_batch:
+                self._stopping.wait(self.interval)
+
+    def stop(self):
+        self._stopping.set()
+        super().stop()
+
+
+def file_handler(cfg, log_path: str) -> logging.Handler:
+    """Log file handler with time rotation, size rotation or none, per ``cfg``."""
+    when = (getattr(cfg, "log_rotate_when", "") or "").strip()
+    if when:
+        return BatchedTimedRotatingFileHandler(log_path, when=when, backupCount=cfg.log_backup_count,
+                                               encoding=cfg.encoding)
+    if getattr(cfg, "log_max_bytes", 0) > 0:
+        return BatchedRotatingFileHandler(log_path, maxBytes=cfg.log_max_bytes,
+                                          backupCount=cfg.log_backup_count, encoding=cfg.encoding)
+    return BatchedFileHandler(log_path, encoding=cfg.encoding)
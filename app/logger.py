@@ -1,14 +1,23 @@
+import atexit
 import logging
 import os
 from dataclasses import dataclass
-from colorama import Fore, Style
 from .calculation import Calculation
 
+_COLOR_ENABLED = True
+
+def set_color(enabled: bool) -> None:
+    """Globally enable/disable ANSI colors (pipe mode turns them off)."""
+    global _COLOR_ENABLED
+    _COLOR_ENABLED = enabled
+
 def colorize(text: str, color: str) -> str:
     """
     Colorize text unless NO_COLOR is set or we're running under CI.
     This also keeps output plain during GitHub Actions tests.
     """
+    if not _COLOR_ENABLED:
+        return text
     import os
     if os.environ.get("NO_COLOR") or os.environ.get("CI"):
         return text
@@ -20,27 +29,66 @@ def colorize(text: str, color: str) -> str:
     }
     return f"{mapping.get(color, Fore.WHITE)}{text}{Style.RESET_ALL}"
 
-def init_logging(cfg) -> None:
-    import logging, os
+_listener = None        # log_queue.BatchingQueueListener while logging is initialized
+_calc_queue = None      # its queue; LoggingObserver enqueues calculations here
+_root = logging.getLogger()
+
+
+def init_logging(cfg):
+    """
+    Route the root logger through a queue: callers only enqueue records, and
+    a listener thread formats them and writes a batch every
+    ``log_flush_interval`` seconds to the log file in ``log_dir`` (rotated by
+    size, ``log_max_bytes``, or time, ``log_rotate_when``) and to the console
+    unless ``log_console`` is off.
+    """
+    import queue
+    from .log_queue import BatchedStreamHandler, BatchingQueueListener, LazyQueueHandler, file_handler
+    global _listener, _calc_queue
+    stop_logging()
     os.makedirs(cfg.log_dir, exist_ok=True)
     log_path = os.path.join(cfg.log_dir, cfg.log_file)
 
-    logger = logging.getLogger()
-    logger.setLevel(logging.INFO)
-    logger.handlers.clear()  # avoid duplicate handlers on repeated runs
-
     # File logs (keep timestamps + levels)
-    file_handler = logging.FileHandler(log_path, encoding=cfg.encoding)
-    file_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+    to_file = file_handler(cfg, log_path)
+    to_file.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+    handlers = [to_file]
 
     # Console logs (clean output, no timestamp/level)
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(logging.Formatter("%(message)s"))
+    if getattr(cfg, "log_console", True):
+        console_handler = BatchedStreamHandler()
+        console_handler.setFormatter(logging.Formatter("%(message)s"))
+        handlers.append(console_handler)
 
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    records = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.handlers.clear()  # avoid duplicate handlers on repeated runs
+    root.addHandler(LazyQueueHandler(records))
 
+    _listener = BatchingQueueListener(records, *handlers, interval=getattr(cfg, "log_flush_interval", 0.05))
+    _listener.start()
+    _calc_queue = records
     logging.info("Logger initialized.")
+    return _listener
+
+
+def stop_logging() -> None:
+    """Write out every queued record and stop the listener thread (safe to repeat)."""
+    global _listener, _calc_queue
+    listener, _listener = _listener, None
+    _calc_queue = None
+    if listener is None:
+        return
+    for handler in list(_root.handlers):
+        if getattr(handler, "queue", None) is listener.queue:
+            _root.removeHandler(handler)
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+
+atexit.register(stop_logging)
 
 class Observer:
     def on_new_calculation(self, calc: Calculation):  # pragma: no cover (simple interface)
@@ -49,16 +97,34 @@ class Observer:
 @dataclass
 class LoggingObserver(Observer):
     cfg: object
+    overflow = "block"  # never lose log lines; delivery only enqueues, so waits are short
     def on_new_calculation(self, calc: Calculation):
-        logging.info(f"CALC {calc.operation}({calc.a}, {calc.b}) = {calc.result} @ {calc.timestamp}")
+        if _root.isEnabledFor(logging.INFO):
+            q = _calc_queue
+            if q is not None:
+                q.put(calc)  # the listener thread turns it into a record
+            else:
+                _root.info("CALC %s(%s, %s) = %s @ %s", calc.operation, calc.a, calc.b,
+                           calc.result, calc.timestamp)
+
+    def on_new_calculations(self, calcs):
+        """Batch hook used by the observer bus."""
+        if _root.isEnabledFor(logging.INFO):
+            q = _calc_queue
+            if q is None:
+                for calc in calcs:
+                    self.on_new_calculation(calc)
+            else:
+                for calc in calcs:
+                    q.put(calc)
 
 @dataclass
 class AutoSaveObserver(Observer):
     cfg: object
     def on_new_calculation(self, calc: Calculation):
-        # Defer to Calculator.save_history; observer just a hook here
+        # Persistence is group-committed by the Calculator's AutoSaveWriter;
+        # observer just a hook here
         try:
-            # The calculator will call save explicitly after notifying observers.
             pass  # pragma: no cover
         except Exception:
             # We intentionally avoid raising from observers to not break UI.
@@ -0,0 +1,215 @@
+# app/metrics.py
+"""
+Process-wide latency metrics.
+
+``METRICS`` records, per command name, a count, an error count and a latency
+histogram, plus per-phase timings inside ``Calculator.compute``. When
+disabled (the default) every hook is a single attribute check, so the
+instrumented paths cost next to nothing. ``MetricsExporter`` periodically
+writes the numbers in Prometheus text format for node-exporter's textfile
+collector.
+"""
+from __future__ import annotations
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class LatencyHistogram:
+    """Log-bucketed histogram (~9% relative error) with O(1) observe."""
+    BASE = 1e-7                 # 100ns
+    GROWTH = 2 ** 0.25
+    BUCKETS = 136               # up to ~1.6e3s
+    _LOG_GROWTH = math.log(GROWTH)
+
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        if seconds <= self.BASE:
+            idx = 0
+        else:
+            idx = min(int(math.log(seconds / self.BASE) / self._LOG_GROWTH), self.BUCKETS - 1)
+        self.counts[idx] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for idx, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                # geometric midpoint of the bucket, capped by the observed max
+                return min(self.BASE * self.GROWTH ** (idx + 0.5), self.max)
+        return self.max  # pragma: no cover (rank never exceeds count)
+
+
+class _Series:
+    __slots__ = ("count", "errors", "latency")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.latency = LatencyHistogram()
+
+
+class _NullTimer:
+    def lap(self, phase: str) -> None:
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+class PhaseTimer:
+    """Times consecutive phases of one operation: call lap(name) after each."""
+    __slots__ = ("_metrics", "_last")
+
+    def __init__(self, metrics: "MetricsRegistry"):
+        self._metrics = metrics
+        self._last = time.perf_counter()
+
+    def lap(self, phase: str) -> None:
+        now = time.perf_counter()
+        self._metrics.observe_phase(phase, now - self._last)
+        self._last = now
+
+
+class MetricsRegistry:
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._commands: Dict[str, _Series] = {}
+        self._phases: Dict[str, _Series] = {}
+
+    def configure(self, cfg) -> None:
+        self.enabled = bool(getattr(cfg, "metrics_enabled", False))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._commands.clear()
+            self._phases.clear()
+
+    # ---- Recording ----
+    def _observe(self, table: Dict[str, _Series], name: str, seconds: float, error: bool) -> None:
+        with self._lock:
+            series = table.get(name)
+            if series is None:
+                series = table[name] = _Series()
+            series.count += 1
+            if error:
+                series.errors += 1
+            series.latency.observe(seconds)
+
+    def observe_command(self, name: str, seconds: float, error: bool = False) -> None:
+        self._observe(self._commands, name, seconds, error)
+
+    def observe_phase(self, phase: str, seconds: float) -> None:
+        self._observe(self._phases, phase, seconds, False)
+
+    def phases(self):
+        """A PhaseTimer when enabled, else a shared no-op timer."""
+        return PhaseTimer(self) if self.enabled else NULL_TIMER
+
+    # ---- Reading ----
+    def snapshot(self) -> Dict[str, List[Tuple[str, int, int, Tuple[float, ...]]]]:
+        """{'commands': [(name, count, errors, (p50, p95, p99)), ...], 'phases': [...]}"""
+        with self._lock:
+            return {
+                kind: [(name, s.count, s.errors, tuple(s.latency.quantile(q) for q in QUANTILES))
+                       for name, s in sorted(table.items())]
+                for kind, table in (("commands", self._commands), ("phases", self._phases))
+            }
+
+    def render_text(self) -> str:
+        snap = self.snapshot()
+        lines = [f"{'command':<14} {'count':>8} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"]
+        for name, count, errors, qs in snap["commands"]:
+            lines.append(f"{name:<14} {count:>8} {errors:>7} " + " ".join(f"{q * 1e3:>9.3f}" for q in qs))
+        if snap["phases"]:
+            lines.append("")
+            lines.append(f"{'compute phase':<14} {'count':>8} {'':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+            for name, count, _, qs in snap["phases"]:
+                lines.append(f"{name:<14} {count:>8} {'':>7} " + " ".join(f"{q * 1e3:>9.3f}" for q in qs))
+        return "\n".join(lines)
+
+    def render_prometheus(self) -> str:
+        out = [
+            "# HELP calculator_commands_total Commands executed, by command name.",
+            "# TYPE calculator_commands_total counter",
+        ]
+        with self._lock:
+            commands = sorted(self._commands.items())
+            phases = sorted(self._phases.items())
+            out += [f'calculator_commands_total{{command="{n}"}} {s.count}' for n, s in commands]
+            out += ["# HELP calculator_command_errors_total Commands that reported an error.",
+                    "# TYPE calculator_command_errors_total counter"]
+            out += [f'calculator_command_errors_total{{command="{n}"}} {s.errors}' for n, s in commands]
+            for metric, label, table in (
+                ("calculator_command_latency_seconds", "command", commands),
+                ("calculator_compute_phase_seconds", "phase", phases),
+            ):
+                out += [f"# HELP {metric} Latency summary by {label}.", f"# TYPE {metric} summary"]
+                for name, s in table:
+                    for q in QUANTILES:
+                        out.append(f'{metric}{{{label}="{name}",quantile="{q}"}} {s.latency.quantile(q):.9f}')
+                    out.append(f'{metric}_sum{{{label}="{name}"}} {s.latency.sum:.9f}')
+                    out.append(f'{metric}_count{{{label}="{name}"}} {s.latency.count}')
+        return "\n".join(out) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        """Atomically replace ``path`` (the textfile collector must never see a partial file)."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write(self.render_prometheus())
+        os.replace(tmp, path)
+
+
+METRICS = MetricsRegistry()
+
+
+class MetricsExporter:
+    """Background thread that writes ``METRICS`` to ``path`` every ``interval`` seconds."""
+
+    def __init__(self, path: str, interval: float = 15.0, metrics: Optional[MetricsRegistry] = None):
+        self.path = path
+        self.interval = interval
+        self.metrics = metrics or METRICS
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "MetricsExporter":
+        self._thread = threading.Thread(target=self._run, name="metrics-exporter", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._safe_write()
+
+    def _safe_write(self) -> None:
+        try:
+            self.metrics.write_prometheus(self.path)
+        except OSError:
+            pass  # metrics are best-effort
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._safe_write()
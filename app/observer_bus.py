@@ -0,0 +1,254 @@
+# app/observer_bus.py
+"""
+Asynchronous delivery of calculations to observers.
+
+``Calculator`` publishes every finished calculation to an ``ObserverBus``.
+Each registered observer gets an ``ObserverWorker``: a bounded queue plus a
+daemon thread that calls the observer. A slow or failing observer never runs
+on the compute path. When a queue is full, its overflow policy decides:
+
+* ``block``: the publisher waits for room (lossless, but can stall compute)
+* ``drop-oldest``: the oldest queued calculation is discarded and counted
+* ``coalesce``: the queued calculations are replaced by the newest one,
+  for observers that only care about the latest state
+
+Observers with an ``on_new_calculations(calcs)`` method get everything that
+queued up as one list; the others get ``on_new_calculation(calc)`` per item.
+"""
+from __future__ import annotations
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+from .calculation import Calculation
+from .metrics import LatencyHistogram
+
+log = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("block", "drop-oldest", "coalesce")
+
+
+@dataclass(frozen=True)
+class ObserverStats:
+    name: str
+    policy: str
+    delivered: int
+    dropped: int
+    coalesced: int
+    errors: int
+    queued: int
+    max_queued: int
+    capacity: int
+    p50: float          # seconds per observer call
+    p99: float
+    max: float
+
+
+class ObserverWorker:
+    """One observer's bounded queue and delivery thread (started on first use)."""
+    max_batch = 1024
+
+    def __init__(self, observer, queue_size: int = 1024, overflow: str = "drop-oldest"):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got {overflow!r}")
+        self.observer = observer
+        self.name = type(observer).__name__
+        self.capacity = max(int(queue_size), 1)
+        self.overflow = overflow
+        self._on_batch = getattr(observer, "on_new_calculations", None)
+        self._on_one = getattr(observer, "on_new_calculation", None)
+        self._events: deque = deque()
+        self._cond = threading.Condition()
+        self._idle = False          # worker is parked waiting for events
+        self._inflight = 0          # taken off the queue, not yet delivered
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        self.latency = LatencyHistogram()
+        self.delivered = self.dropped = self.coalesced = self.errors = 0
+        self.max_queued = 0
+
+    # ---- Publishing (caller's thread) ----
+    def put(self, calc: Calculation) -> None:
+        with self._cond:
+            if self._closed:
+                return
+            self._admit(calc)
+            if self._thread is None:
+                self._start()
+            elif self._idle:
+                self._cond.notify()
+
+    def put_many(self, calcs: Sequence[Calculation]) -> None:
+        with self._cond:
+            if self._closed:
+                return
+            for calc in calcs:
+                self._admit(calc)
+                if self._closed:
+                    return
+            if self._thread is None:
+                self._start()
+            elif self._idle:
+                self._cond.notify()
+
+    def _admit(self, calc: Calculation) -> None:
+        """Queue one calculation, applying the overflow policy; lock held."""
+        events = self._events
+        if len(events) >= self.capacity:
+            if self.overflow == "drop-oldest":
+                events.popleft()
+                self.dropped += 1
+            elif self.overflow == "coalesce":
+                self.coalesced += len(events)
+                events.clear()
+            else:
+                if self._thread is None:
+                    self._start()
+                while len(events) >= self.capacity and not self._closed:
+                    self._cond.notify()
+                    self._cond.wait()
+                if self._closed:
+                    return
+        events.append(calc)
+        if len(events) > self.max_queued:
+            self.max_queued = len(events)
+
+    # ---- Delivery (worker thread) ----
+    def _start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name=f"observer-{self.name}", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self) -> None:
+        events = self._events
+        cond = self._cond
+        while True:
+            with cond:
+                while not events and not self._closed:
+                    self._idle = True
+                    cond.wait()
+                self._idle = False
+                if not events:
+                    return          # closed and drained
+                n = min(len(events), self.max_batch)
+                batch = [events.popleft() for _ in range(n)]
+                self._inflight = n
+                cond.notify_all()   # room for blocked publishers
+            self._deliver(batch)
+            with cond:
+                self._inflight = 0
+                cond.notify_all()   # flush() waiters
+
+    def _deliver(self, batch: List[Calculation]) -> None:
+        observe = self.latency.observe
+        clock = time.perf_counter
+        if self._on_batch is not None:
+            started = clock()
+            try:
+                self._on_batch(batch)
+            except Exception:
+                self._failed()
+            observe(clock() - started)
+            self.delivered += len(batch)
+            return
+        fn = self._on_one
+        for calc in batch:
+            started = clock()
+            try:
+                fn(calc)
+            except Exception:
+                self._failed()
+            observe(clock() - started)
+            self.delivered += 1
+
+    def _failed(self) -> None:
+        self.errors += 1
+        if self.errors == 1:   # log the first failure only; the rest are counted
+            log.exception("Observer %s failed", self.name)
+
+    # ---- Control ----
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything queued so far has been delivered."""
+        with self._cond:
+            if self._thread is None:
+                return not self._events
+            return self._cond.wait_for(lambda: not self._events and not self._inflight, timeout)
+
+    def close(self) -> None:
+        """Deliver what is queued, then stop the thread."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            atexit.unregister(self.close)
+
+    def stats(self) -> ObserverStats:
+        with self._cond:
+            lat = self.latency
+            return ObserverStats(self.name, self.overflow, self.delivered, self.dropped, self.coalesced,
+                                 self.errors, len(self._events), self.max_queued,
+                                 self.capacity, lat.quantile(0.5), lat.quantile(0.99), lat.max)
+
+
+class ObserverBus:
+    """Fans calculations out to one ``ObserverWorker`` per registered observer."""
+
+    def __init__(self, queue_size: int = 1024, overflow: str = "drop-oldest"):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got {overflow!r}")
+        self.queue_size = queue_size
+        self.overflow = overflow
+        self._workers: tuple = ()
+
+    @classmethod
+    def from_config(cls, cfg) -> "ObserverBus":
+        return cls(cfg.observer_queue_size, cfg.observer_overflow)
+
+    def register(self, observer, overflow: Optional[str] = None,
+                 queue_size: Optional[int] = None) -> ObserverWorker:
+        """
+        Add ``observer``. Its policy is ``overflow``, else the observer's own
+        ``overflow`` attribute, else the bus default.
+        """
+        worker = ObserverWorker(observer, queue_size or self.queue_size,
+                                overflow or getattr(observer, "overflow", None) or self.overflow)
+        self._workers += (worker,)
+        return worker
+
+    def __len__(self) -> int:
+        return len(self._workers)
+
+    def publish(self, calc: Calculation) -> None:
+        for worker in self._workers:
+            worker.put(calc)
+
+    def publish_many(self, calcs: Sequence[Calculation]) -> None:
+        if calcs:
+            for worker in self._workers:
+                worker.put_many(calcs)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        return all([w.flush(timeout) for w in self._workers])
+
+    def close(self) -> None:
+        for worker in self._workers:
+            worker.close()
+
+    def stats(self) -> List[ObserverStats]:
+        return [w.stats() for w in self._workers]
+
+    def render_text(self) -> str:
+        lines = [f"{'observer':<18} {'policy':<11} {'delivered':>10} {'dropped':>8} {'coalesced':>9} "
+                 f"{'errors':>6} {'queued':>11} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}"]
+        for s in self.stats():
+            lines.append(f"{s.name:<18} {s.policy:<11} {s.delivered:>10,} {s.dropped:>8,} {s.coalesced:>9,} "
+                         f"{s.errors:>6,} {f'{s.queued}/{s.capacity}':>11} "
+                         f"{s.p50 * 1e3:>8.3f} {s.p99 * 1e3:>8.3f} {s.max * 1e3:>8.3f}")
+        return "\n".join(lines)
@@ -1,19 +1,147 @@
+from __future__ import annotations
 from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
 import math
+import sys
 from .exceptions import OperationError
 
+if TYPE_CHECKING:  # numpy is imported on first batch call, not at startup
+    import numpy as np
+
+@dataclass
+class BatchResult:
+    """
+    Output of a vectorized execute_many(): one float64 per operand pair.
+    Failing rows hold NaN and are reported in ``errors`` as message -> indices.
+    """
+    results: np.ndarray
+    errors: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    @property
+    def error_mask(self) -> np.ndarray:
+        import numpy as np
+        mask = np.zeros(self.results.shape, dtype=bool)
+        for idx in self.errors.values():
+            mask[idx] = True
+        return mask
+
+    @property
+    def failed_indices(self) -> np.ndarray:
+        import numpy as np
+        return np.flatnonzero(self.error_mask)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+Checks = Callable[["np.ndarray", "np.ndarray"], List[Tuple["np.ndarray", str]]]
+
+def _batch(a, b, kernel, checks: Checks | None = None) -> BatchResult:
+    """Run ``kernel`` over the rows that pass every (mask, message) check."""
+    import numpy as np
+    a, b = np.broadcast_arrays(np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64))
+    errors: Dict[str, np.ndarray] = {}
+    bad = np.zeros(a.shape, dtype=bool)
+    for mask, message in (checks(a, b) if checks else []):
+        mask = mask & ~bad
+        if mask.any():
+            errors[message] = np.flatnonzero(mask)
+            bad |= mask
+    with np.errstate(all='ignore'):
+        if bad.any():
+            out = np.full(a.shape, np.nan)
+            ok = ~bad
+            out[ok] = kernel(a[ok], b[ok])
+        else:
+            out = np.asarray(kernel(a, b), dtype=np.float64)
+    # Overflow (e.g. huge powers) surfaces as inf; report it per row as well.
+    nonfinite = ~bad & ~np.isfinite(out)
+    if nonfinite.any():
+        errors["Result is not a finite number."] = np.flatnonzero(nonfinite)
+        out[nonfinite] = np.nan
+    return BatchResult(out, errors)
+
+# Results are stored as floats, so anything past the largest finite float is rejected.
+MAX_LOG10 = math.log10(sys.float_info.max)
+# Below 1e15 a result needs fewer than 53 bits: cheap, and exact as a float.
+SMALL_LOG10 = 15.0
+DEFAULT_MAX_RESULT_BITS = 64
+
+@dataclass(frozen=True)
+class Cost:
+    """
+    Predicted size of a result, computed before the operation runs: log10 of
+    its magnitude, plus its bit length when it would be an exact integer.
+    """
+    log10: float
+    bits: int = 0
+
+def _log10(x) -> float:
+    x = abs(x)
+    return math.log10(x) if x else -math.inf
+
+def _int_bits(a, b, log2: float) -> int:
+    """Bit length of an exact int result, or 0 when the result is a float anyway."""
+    if isinstance(a, int) and isinstance(b, int) and log2 > 0:
+        return math.ceil(log2)
+    return 0
+
+def _fractional(b) -> bool:
+    """Scalar form of the ``b != np.trunc(b)`` check the batch paths use."""
+    return math.isfinite(b) and b != math.trunc(b)
+
 class Operation(ABC):
     @abstractmethod
     def execute(self, a: float, b: float) -> float: ...
 
+    @abstractmethod
+    def execute_many(self, a: np.ndarray, b: np.ndarray) -> BatchResult: ...
+
+    def estimate(self, a, b) -> Optional[Cost]:
+        """Cost of execute(a, b); None when the result is small or bounded by the inputs."""
+        return None
+
+    def execute_budgeted(self, a, b, max_bits: int = DEFAULT_MAX_RESULT_BITS) -> float:
+        """
+        execute() behind the cost estimate. A result predicted to overflow a
+        float is rejected before any work is done. An exact integer result
+        wider than ``max_bits`` is evaluated in floating point instead, which
+        gives the same stored value without building a huge int.
+        """
+        cost = self.estimate(a, b)
+        if cost is not None:
+            if cost.log10 > MAX_LOG10:
+                raise OperationError(f"Result too large: about 10^{cost.log10:,.0f} "
+                                     f"(limit is about 10^{MAX_LOG10:.0f}).")
+            if cost.bits > max_bits:
+                a, b = float(a), float(b)
+        return self.execute(a, b)
+
 class Add(Operation):
     def execute(self, a, b): return a + b
+    def execute_many(self, a, b):
+        import numpy as np
+        return _batch(a, b, np.add)
 
 class Subtract(Operation):
     def execute(self, a, b): return a - b
+    def execute_many(self, a, b):
+        import numpy as np
+        return _batch(a, b, np.subtract)
 
 class Multiply(Operation):
     def execute(self, a, b): return a * b
+    def estimate(self, a, b):
+        if not a or not b:
+            return None
+        log10 = _log10(a) + _log10(b)
+        if log10 < SMALL_LOG10:
+            return None
+        return Cost(log10, _int_bits(a, b, math.log2(abs(a)) + math.log2(abs(b))))
+    def execute_many(self, a, b):
+        import numpy as np
+        return _batch(a, b, np.multiply)
 
 class Divide(Operation):
     def execute(self, a, b):
@@ -21,46 +149,108 @@ class Divide(Operation):
             raise OperationError("Division by zero.")
         return a / b
 
+    def execute_many(self, a, b):
+        import numpy as np
+        return _batch(a, b, np.divide, lambda a, b: [(b == 0, "Division by zero.")])
+
 class Power(Operation):
     def execute(self, a, b):
+        if a == 0 and b < 0:
+            raise OperationError("Zero cannot be raised to a negative power.")
+        if a < 0 and _fractional(b):
+            raise OperationError("Fractional power of a negative number is not real.")
         try:
             return a ** b
         except Exception as e:  # pragma: no cover (math domain is covered in tests)
             raise OperationError(str(e))
 
+    def estimate(self, a, b):
+        if not a or not b or abs(a) == 1:
+            return None  # 0, 1 or +-1: cheap whatever the exponent
+        log10 = b * _log10(a)
+        if log10 < SMALL_LOG10:
+            return None
+        return Cost(log10, _int_bits(a, b, b * math.log2(abs(a))))
+
+    def execute_many(self, a, b):
+        import numpy as np
+        return _batch(a, b, np.power, lambda a, b: [
+            ((a == 0) & (b < 0), "Zero cannot be raised to a negative power."),
+            ((a < 0) & (b != np.trunc(b)), "Fractional power of a negative number is not real."),
+        ])
+
 class Root(Operation):
     def execute(self, a, b):
         if b == 0:
             raise OperationError("Zeroth root is undefined.")
         if a < 0 and b % 2 == 0:
             raise OperationError("Even root of a negative number is not real.")
+        if a < 0 and _fractional(b):
+            raise OperationError("Fractional root of a negative number is not real.")
         try:
+            if a < 0:
+                return -((-a) ** (1.0 / b))   # odd integer root: real, as in execute_many
             return a ** (1.0 / b)
         except Exception as e:  # pragma: no cover
             raise OperationError(str(e))
 
+    def estimate(self, a, b):
+        if not a or not b:
+            return None
+        log10 = _log10(a) / b  # tiny degrees explode: root(10, 0.001) = 10^1000
+        return Cost(log10) if log10 >= SMALL_LOG10 else None
+
+    def execute_many(self, a, b):
+        import numpy as np
+
+        def kernel(a, b):
+            # Odd integer roots of negatives are real: -(|a| ** (1/b)).
+            return np.sign(a) * np.abs(a) ** (1.0 / b)
+        return _batch(a, b, kernel, lambda a, b: [
+            (b == 0, "Zeroth root is undefined."),
+            ((a < 0) & (b % 2 == 0), "Even root of a negative number is not real."),
+            ((a < 0) & (b != np.trunc(b)), "Fractional root of a negative number is not real."),
+        ])
+
 class Modulus(Operation):
     def execute(self, a, b):
         if b == 0:
             raise OperationError("Modulus by zero.")
         return a % b
 
+    def execute_many(self, a, b):
+        import numpy as np
+        return _batch(a, b, np.mod, lambda a, b: [(b == 0, "Modulus by zero.")])
+
 class IntDivide(Operation):
     def execute(self, a, b):
         if b == 0:
             raise OperationError("Integer division by zero.")
         return a // b
 
+    def execute_many(self, a, b):
+        import numpy as np
+        return _batch(a, b, np.floor_divide, lambda a, b: [(b == 0, "Integer division by zero.")])
+
 class Percent(Operation):
     def execute(self, a, b):
         if b == 0:
             raise OperationError("Percentage undefined when denominator is zero.")
         return (a / b) * 100.0
 
+    def execute_many(self, a, b):
+        import numpy as np
+        return _batch(a, b, lambda a, b: (a / b) * 100.0,
+                      lambda a, b: [(b == 0, "Percentage undefined when denominator is zero.")])
+
 class AbsDiff(Operation):
     def execute(self, a, b):
         return abs(a - b)
 
+    def execute_many(self, a, b):
+        import numpy as np
+        return _batch(a, b, lambda a, b: np.abs(a - b))
+
 class OperationFactory:
     _registry = {
     "add": Add(),
@@ -0,0 +1,71 @@
+# app/pipe.py
+from __future__ import annotations
+import time
+from typing import Iterable, TextIO
+from .command import CommandRegistry, ErrorOutput
+from .help import HelpComponent
+
+ERROR_POLICIES = ("continue", "stop")
+
+
+def run_pipe(registry: CommandRegistry, help_view: HelpComponent,
+             stdin: Iterable[str], stdout: TextIO, stderr: TextIO,
+             on_error: str = "continue", block_lines: int = 1024) -> int:
+    """
+    Non-interactive mode for piped stdin: no prompt/banner, commands are read
+    line by line from the (buffered) stream and results are written to
+    ``stdout`` in blocks of ``block_lines``. Returns the process exit status:
+    0 when every command succeeded, 1 otherwise. ``on_error='stop'`` aborts
+    at the first failing command. A throughput line goes to ``stderr``.
+    """
+    if on_error not in ERROR_POLICIES:
+        raise ValueError(f"on_error must be one of {ERROR_POLICIES}, got {on_error!r}")
+
+    started = time.perf_counter()
+    processed = failed = 0
+    buf: list[str] = []
+    write = buf.append
+
+    for raw in stdin:
+        parts = raw.split()
+        if not parts:
+            continue
+        processed += 1
+        cmd = parts[0].lower()
+
+        if cmd in {"exit", "quit"}:
+            break
+        if cmd == "help":
+            write(help_view.render())
+            continue
+
+        if registry.get(cmd):
+            out = registry.execute(cmd, parts)
+        else:
+            out = ErrorOutput(f"Unknown command: {cmd}")
+        if isinstance(out, str):
+            if out:
+                write(out)
+        elif out is not None:
+            for line in out:  # streamed output, e.g. history
+                write(line)
+                if len(buf) >= block_lines:
+                    stdout.write("\n".join(buf) + "\n")
+                    buf.clear()
+        if isinstance(out, ErrorOutput):
+            failed += 1
+            if on_error == "stop":
+                break
+        if len(buf) >= block_lines:
+            stdout.write("\n".join(buf) + "\n")
+            buf.clear()
+
+    if buf:
+        stdout.write("\n".join(buf) + "\n")
+    stdout.flush()
+
+    elapsed = time.perf_counter() - started
+    rate = processed / elapsed if elapsed > 0 else 0.0
+    stderr.write(f"Processed {processed} commands ({failed} failed) in {elapsed:.3f}s "
+                 f"({rate:,.0f} commands/s)\n")
+    return 1 if failed else 0
@@ -0,0 +1,187 @@
+# app/pvector.py
+"""
+Persistent vector: an immutable sequence with structural sharing.
+
+A 32-way trie of tuples plus a tail tuple (the layout of Clojure's
+PersistentVector). ``append``, ``take`` and indexing are O(log32 n),
+effectively constant, and they return new vectors that share every
+untouched node with the old one. Holding on to old versions, as History
+mementos do, therefore costs only the nodes that differ.
+"""
+from __future__ import annotations
+import sys
+from typing import Any, Iterable, Iterator, Set, Tuple
+
+BITS = 5
+WIDTH = 1 << BITS
+MASK = WIDTH - 1
+
+Node = Tuple[Any, ...]
+_EMPTY: Node = ()
+
+
+class PVector:
+    __slots__ = ("_count", "_shift", "_root", "_tail")
+
+    def __init__(self, count: int = 0, shift: int = BITS, root: Node = _EMPTY, tail: Node = _EMPTY):
+        self._count = count
+        self._shift = shift
+        self._root = root
+        self._tail = tail
+
+    @classmethod
+    def from_iterable(cls, items: Iterable[Any]) -> "PVector":
+        items = list(items)
+        full = len(items) - (len(items) % WIDTH or WIDTH) if items else 0
+        # Build the trie bottom-up from full leaves; the rest is the tail.
+        level = [tuple(items[i:i + WIDTH]) for i in range(0, full, WIDTH)]
+        shift = BITS
+        while len(level) > WIDTH:
+            level = [tuple(level[i:i + WIDTH]) for i in range(0, len(level), WIDTH)]
+            shift += BITS
+        return cls(len(items), shift, tuple(level), tuple(items[full:]))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _tail_offset(self) -> int:
+        return self._count - len(self._tail)
+
+    def __getitem__(self, index: int) -> Any:
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("vector index out of range")
+        off = self._count - len(self._tail)
+        if index >= off:
+            return self._tail[index - off]
+        node = self._root
+        shift = self._shift
+        while shift:
+            node = node[(index >> shift) & MASK]
+            shift -= BITS
+        return node[index & MASK]
+
+    def __iter__(self) -> Iterator[Any]:
+        for leaf in self._leaves(self._root, self._shift):
+            yield from leaf
+        yield from self._tail
+
+    @classmethod
+    def _leaves(cls, node: Node, shift: int) -> Iterator[Node]:
+        if not shift:
+            yield node
+            return
+        for child in node:
+            yield from cls._leaves(child, shift - BITS)
+
+    def append(self, item: Any) -> "PVector":
+        if len(self._tail) < WIDTH:
+            return PVector(self._count + 1, self._shift, self._root, self._tail + (item,))
+        # Tail is full: push it into the trie and start a new one.
+        leaf = self._tail
+        if (self._count >> BITS) > (1 << self._shift):  # root overflow: grow a level
+            root = (self._root, self._new_path(self._shift, leaf))
+            return PVector(self._count + 1, self._shift + BITS, root, (item,))
+        root = self._push_leaf(self._shift, self._root, leaf)
+        return PVector(self._count + 1, self._shift, root, (item,))
+
+    def append_leaf(self, leaf: Node) -> "PVector":
+        """
+        Append up to WIDTH items at once; the vector must hold whole leaves
+        (``len(self) % WIDTH == 0``). One path copy for the whole batch.
+        """
+        if not self._count:
+            return PVector(len(leaf), BITS, _EMPTY, leaf)
+        tail = self._tail
+        if (self._count >> BITS) > (1 << self._shift):
+            root = (self._root, self._new_path(self._shift, tail))
+            return PVector(self._count + len(leaf), self._shift + BITS, root, leaf)
+        root = self._push_leaf(self._shift, self._root, tail)
+        return PVector(self._count + len(leaf), self._shift, root, leaf)
+
+    def _push_leaf(self, shift: int, parent: Node, leaf: Node) -> Node:
+        idx = ((self._count - 1) >> shift) & MASK
+        if shift == BITS:
+            child = leaf
+        elif idx < len(parent):
+            child = self._push_leaf(shift - BITS, parent[idx], leaf)
+        else:
+            child = self._new_path(shift - BITS, leaf)
+        return parent[:idx] + (child,) + parent[idx + 1:]
+
+    @staticmethod
+    def _new_path(shift: int, leaf: Node) -> Node:
+        node = leaf
+        while shift:
+            node = (node,)
+            shift -= BITS
+        return node
+
+    def take(self, n: int) -> "PVector":
+        """The first ``n`` items, sharing all nodes left of the cut."""
+        if n >= self._count:
+            return self
+        if n <= 0:
+            return EMPTY
+        off = self._tail_offset()
+        if n > off:
+            return PVector(n, self._shift, self._root, self._tail[:n - off])
+        # The new tail is the leaf holding index n-1; cut the trie before it.
+        last = n - 1
+        leaf_start = last & ~MASK
+        tail = self._leaf_for(last)[:n - leaf_start]
+        if not leaf_start:
+            return PVector(n, BITS, _EMPTY, tail)
+        root = self._cut(self._root, self._shift, leaf_start - 1)
+        shift = self._shift
+        while shift > BITS and len(root) == 1:  # drop levels left with one child
+            root = root[0]
+            shift -= BITS
+        return PVector(n, shift, root, tail)
+
+    def _leaf_for(self, index: int) -> Node:
+        node = self._root
+        shift = self._shift
+        while shift:
+            node = node[(index >> shift) & MASK]
+            shift -= BITS
+        return node
+
+    def _cut(self, node: Node, shift: int, last: int) -> Node:
+        """Copy of ``node`` keeping leaves up to and including index ``last``."""
+        idx = (last >> shift) & MASK
+        if shift == BITS:
+            return node[:idx + 1]
+        return node[:idx] + (self._cut(node[idx], shift - BITS, last),)
+
+    def nodes(self) -> Iterator[Node]:
+        """Every tuple this vector is made of (internal nodes, leaves, tail)."""
+        stack = [(self._root, self._shift)]
+        while stack:
+            node, shift = stack.pop()
+            yield node
+            if shift:
+                stack.extend((child, shift - BITS) for child in node)
+        yield self._tail
+
+
+EMPTY = PVector()
+
+
+def node_bytes(vectors: Iterable[PVector]) -> Tuple[int, int]:
+    """
+    (unique, unshared) bytes of the nodes behind ``vectors``: what they use
+    together versus what independent copies would use. Items themselves are
+    shared by reference either way and are not counted.
+    """
+    seen: Set[int] = set()
+    unique = unshared = 0
+    for vec in vectors:
+        for node in vec.nodes():
+            size = sys.getsizeof(node)
+            unshared += size
+            if id(node) not in seen:
+                seen.add(id(node))
+                unique += size
+    return unique, unshared
@@ -0,0 +1,90 @@
+# app/result_cache.py
+from __future__ import annotations
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Hashable, Optional, Tuple
+
+CacheKey = Tuple[str, float, float, int]
+
+# Rough per-entry cost of the OrderedDict slot + linked-list node.
+_ENTRY_OVERHEAD = 112
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    bytes: int
+    max_entries: int
+    max_bytes: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class ResultCache:
+    """
+    Bounded LRU memo for pure operation results, keyed by
+    ``(op_name, a, b, precision)``. Evicts least-recently-used entries when
+    either ``max_entries`` or ``max_bytes`` (estimated) is exceeded.
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 8 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[Hashable, Tuple[float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def _sizeof(key: CacheKey, value: float) -> int:
+        return (_ENTRY_OVERHEAD + sys.getsizeof(key) + sys.getsizeof(value)
+                + sum(sys.getsizeof(part) for part in key))
+
+    def get(self, key: CacheKey) -> Optional[float]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._data.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def put(self, key: CacheKey, value: float) -> None:
+        size = self._sizeof(key, value)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._data[key] = (value, size)
+            self._bytes += size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted) = self._data.popitem(last=False)
+                self._bytes -= evicted
+                self._evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry (counters are kept)."""
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(self._hits, self._misses, self._evictions, len(self._data),
+                              self._bytes, self.max_entries, self.max_bytes)
@@ -0,0 +1,234 @@
+# app/run_file.py
+"""
+Batch evaluation of operation files: ``python -m app run-file jobs.txt --workers N``.
+
+The file (one ``<op> <a> <b>`` per line) is split into byte ranges that end
+on line boundaries. Worker processes parse and compute the ranges with the
+same ``parse_two_numbers`` and ``OperationFactory`` the REPL uses. Results
+are merged back in input order. The merge holds at most ``2 * workers``
+chunks at a time, so memory stays bounded by the chunk size, not the file
+size. With one worker, one chunk, or no usable process pool, the chunks
+are evaluated in this process.
+"""
+from __future__ import annotations
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from .exceptions import OperationError, ValidationError
+from .input_validators import parse_two_numbers
+from .operations import DEFAULT_MAX_RESULT_BITS, OperationFactory
+
+DEFAULT_CHUNK_BYTES = 4 * 1024 * 1024
+
+Row = Tuple[str, float, float, float]
+
+
+@dataclass
+class ChunkResult:
+    """Evaluated byte range: output text plus the errors and rows it produced."""
+    index: int
+    lines: int                              # physical lines, blank ones included
+    output: str                             # one line per non-blank input line
+    errors: List[Tuple[int, str]] = field(default_factory=list)   # (line in chunk, message)
+    rows: List[Row] = field(default_factory=list)                 # newest successful rows
+
+
+@dataclass
+class ChunkReport:
+    index: int
+    first_line: int
+    lines: int
+    failed: int
+    first_error: Optional[Tuple[int, str]] = None
+
+
+@dataclass
+class RunReport:
+    workers: int
+    processed: int = 0
+    failed: int = 0
+    seconds: float = 0.0
+    chunks: List[ChunkReport] = field(default_factory=list)
+    rows: List[Row] = field(default_factory=list)
+
+    @property
+    def rate(self) -> float:
+        return self.processed / self.seconds if self.seconds > 0 else 0.0
+
+    def render(self) -> str:
+        lines = [f"Processed {self.processed:,} lines ({self.failed:,} failed) in {self.seconds:.3f}s "
+                 f"({self.rate:,.0f} lines/s) with {self.workers} worker(s), {len(self.chunks)} chunk(s)"]
+        for c in self.chunks:
+            if c.failed:
+                line_no, message = c.first_error
+                lines.append(f"  chunk {c.index + 1} (lines {c.first_line:,}-{c.first_line + c.lines - 1:,}): "
+                             f"{c.failed:,} failed, first at line {line_no:,}: {message}")
+        return "\n".join(lines)
+
+
+def plan_chunks(path: str, chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> List[Tuple[int, int]]:
+    """Byte ranges of about ``chunk_bytes`` that each end just after a newline."""
+    size = os.path.getsize(path)
+    chunk_bytes = max(int(chunk_bytes), 1)
+    ranges = []
+    with open(path, "rb") as fh:
+        start = 0
+        while start < size:
+            fh.seek(min(start + chunk_bytes, size) - 1)
+            fh.readline()                    # run on to the end of the current line
+            end = min(fh.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def eval_chunk(path: str, index: int, start: int, end: int, precision: int = 6,
+               encoding: str = "utf-8", keep: int = 0, max_value: Optional[float] = None,
+               max_bits: int = DEFAULT_MAX_RESULT_BITS) -> ChunkResult:
+    """Evaluate one byte range; runs in a worker process."""
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        text = fh.read(end - start).decode(encoding, errors="replace")
+    lines = text.split("\n")
+    if lines and lines[-1] == "":
+        lines.pop()                          # the range ends with a newline
+    ops = {}
+    out: List[str] = []
+    errors: List[Tuple[int, str]] = []
+    rows = deque(maxlen=keep) if keep > 0 else None
+    for line_no, line in enumerate(lines, 1):
+        parts = line.split()
+        if not parts:
+            continue
+        name = parts[0].lower()
+        try:
+            op = ops.get(name)
+            if op is None:
+                op = ops[name] = OperationFactory.create(name)
+            a, b = parse_two_numbers(parts[1:], max_value=max_value)
+            result = float(round(op.execute_budgeted(a, b, max_bits), precision))
+        except (ValidationError, OperationError) as e:
+            errors.append((line_no, str(e)))
+            out.append(f"error: {e}")
+            continue
+        except Exception as e:  # pragma: no cover (defensive)
+            errors.append((line_no, str(e)))
+            out.append(f"error: {e}")
+            continue
+        out.append(f"{name}({float(a)}, {float(b)}) = {result}")
+        if rows is not None:
+            rows.append((name, float(a), float(b), result))
+    return ChunkResult(index, len(lines), "\n".join(out) + "\n" if out else "", errors,
+                       list(rows) if rows is not None else [])
+
+
+def _in_order(path: str, ranges: Sequence[Tuple[int, int]], workers: int, **kwargs) -> Iterator[ChunkResult]:
+    """Chunk results in input order, with at most ``2 * workers`` chunks in flight."""
+    done = 0
+    pool = None
+    if workers > 1 and len(ranges) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        try:
+            pool = ProcessPoolExecutor(workers)
+        except (OSError, NotImplementedError, ImportError):  # pragma: no cover (no multiprocessing)
+            pool = None
+    if pool is not None:
+        from concurrent.futures.process import BrokenProcessPool
+        with pool:
+            inflight = deque()
+            submitted = 0
+            try:
+                while done < len(ranges):
+                    while submitted < len(ranges) and len(inflight) < 2 * workers:
+                        start, end = ranges[submitted]
+                        inflight.append(pool.submit(eval_chunk, path, submitted, start, end, **kwargs))
+                        submitted += 1
+                    result = inflight.popleft().result()
+                    done += 1
+                    yield result
+            except BrokenProcessPool:  # pragma: no cover (worker killed); finish in-process
+                for fut in inflight:
+                    fut.cancel()
+    for index in range(done, len(ranges)):
+        start, end = ranges[index]
+        yield eval_chunk(path, index, start, end, **kwargs)
+
+
+def run_file(path: str, output: str, workers: Optional[int] = None,
+             chunk_bytes: int = DEFAULT_CHUNK_BYTES, precision: int = 6,
+             encoding: str = "utf-8", keep: int = 0, errors_path: Optional[str] = None,
+             max_value: Optional[float] = None, max_bits: int = DEFAULT_MAX_RESULT_BITS) -> RunReport:
+    """
+    Evaluate ``path`` into ``output`` (one result or ``error: ...`` line per
+    job, in input order). ``keep`` > 0 collects the newest ``keep``
+    successful rows in ``RunReport.rows`` for bulk history import.
+    ``errors_path`` receives ``<line>\\t<message>`` for every failed line.
+    """
+    from .history_mmap import supports_encoding
+    started = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    # Byte ranges only split cleanly on newlines in ASCII-compatible encodings.
+    ranges = (plan_chunks(path, chunk_bytes) if supports_encoding(encoding)
+              else [(0, os.path.getsize(path))])
+    report = RunReport(workers=workers if len(ranges) > 1 else 1)
+    rows = deque(maxlen=keep) if keep > 0 else None
+    first_line = 1
+    err_fh = open(errors_path, "w", encoding=encoding) if errors_path else None
+    try:
+        with open(output, "w", encoding=encoding) as out:
+            for res in _in_order(path, ranges, workers, precision=precision, encoding=encoding,
+                                 keep=keep, max_value=max_value, max_bits=max_bits):
+                out.write(res.output)
+                report.processed += res.output.count("\n")
+                report.failed += len(res.errors)
+                report.chunks.append(ChunkReport(res.index, first_line, res.lines, len(res.errors),
+                                                 ((first_line + res.errors[0][0] - 1, res.errors[0][1])
+                                                  if res.errors else None)))
+                if err_fh is not None:
+                    err_fh.writelines(f"{first_line + n - 1}\t{msg}\n" for n, msg in res.errors)
+                if rows is not None:
+                    rows.extend(res.rows)
+                first_line += res.lines
+    finally:
+        if err_fh is not None:
+            err_fh.close()
+    report.rows = list(rows) if rows is not None else []
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def run_file_main(argv, cfg) -> int:  # pragma: no cover
+    """Entry point for ``python -m app run-file``."""
+    import argparse
+    import sys
+    parser = argparse.ArgumentParser(prog="python -m app run-file",
+                                     description="Evaluate a file of '<op> <a> <b>' lines in parallel")
+    parser.add_argument("path")
+    parser.add_argument("--output", help="result file (default: <path>.out)")
+    parser.add_argument("--errors", help="write '<line>\\t<message>' for every failed line")
+    parser.add_argument("--workers", type=int, default=cfg.run_file_workers or None,
+                        help="worker processes (default: all cores)")
+    parser.add_argument("--chunk-bytes", type=int, default=cfg.run_file_chunk_bytes)
+    parser.add_argument("--history", action="store_true",
+                        help="append the results to the saved history")
+    args = parser.parse_args(argv)
+
+    report = run_file(args.path, args.output or args.path + ".out", workers=args.workers,
+                      chunk_bytes=args.chunk_bytes, precision=cfg.precision, encoding=cfg.encoding,
+                      keep=cfg.max_history_size if args.history else 0, errors_path=args.errors,
+                      max_value=cfg.max_input_value, max_bits=cfg.max_result_bits)
+    if args.history:
+        from .calculator import Calculator
+        calc = Calculator(config=cfg)
+        try:
+            if os.path.exists(cfg.history_path):
+                calc.load_history()
+            calc.record_rows(report.rows)
+            calc.save_history()
+        finally:
+            calc.close()
+    sys.stderr.write(report.render() + "\n")
+    return 1 if report.failed else 0
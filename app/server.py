@@ -0,0 +1,313 @@
+# app/server.py
+"""
+Network mode: ``python -m app serve --port N`` (or ``--socket PATH``).
+
+One asyncio process serves many clients. Each connection is a session with
+its own Calculator and History, wired to the REPL commands except the ones
+that take a path on the server (``build_registry(files=False)``: no save,
+load, export or import). Sessions share the operation factory, the result
+cache and the expression plan cache. Commands run in the loop's default
+executor, so a slow one holds up only its own session.
+
+The protocol is line-delimited JSON. A bare text line also works:
+
+    -> {"id": 1, "cmd": "add 2 3"}
+    <- {"id": 1, "ok": true, "output": "add(2.0, 3.0) = 5.0"}
+    -> {"id": 2, "cmd": "nope"}
+    <- {"id": 2, "ok": false, "error": "Unknown command: nope"}
+
+Clients may pipeline requests: send many before reading any replies.
+Replies come back in request order. The requests in each chunk read from
+the socket are answered with a single write, which is drained before the
+next chunk is read. A client that stops reading therefore stops being
+read, which gives per-connection backpressure without unbounded buffers.
+
+Sessions idle for ``server_idle_timeout`` seconds are evicted. On SIGTERM
+or SIGINT the server stops accepting connections. Each session then
+answers the requests it has already read, receives ``{"event": "shutdown"}``
+and is closed. Flushing replies to slow clients gets at most
+``server_drain_timeout`` seconds.
+"""
+from __future__ import annotations
+import asyncio
+import dataclasses
+import json
+import logging
+import signal
+import threading
+import time
+from typing import Dict, Optional
+
+from .calculator import Calculator
+from .calculator_config import AppConfig
+from .command import CommandRegistry, ErrorOutput
+from .help import BaseHelp, HelpComponent, OperationListHelp
+from .observer_bus import ObserverBus
+from .result_cache import ResultCache
+
+log = logging.getLogger(__name__)
+
+_READ_SIZE = 16 * 1024
+_MAX_LINE = 64 * 1024
+
+
+class Session:
+    """One client connection: a private calculator plus its command registry."""
+    def __init__(self, calc: Calculator, registry: CommandRegistry):
+        self.calc = calc
+        self.registry = registry
+        self.requests = 0
+        self.last_active = time.monotonic()
+        self.waiting = False      # parked on input (safe to cancel)
+        self.closing = False      # client asked to quit
+        self.end_event: Optional[str] = None
+
+
+class CalculatorServer:
+    def __init__(self, cfg: AppConfig, help_view: Optional[HelpComponent] = None,
+                 observers=()):
+        # Sessions keep their history in memory: they share one history file,
+        # so neither journaling nor 'save'/'load' is offered to them.
+        self.config = dataclasses.replace(cfg, auto_save=False)
+        self.help_view = help_view or OperationListHelp(BaseHelp(files=False))
+        self.cache = (ResultCache(cfg.cache_max_entries, cfg.cache_max_bytes)
+                      if cfg.cache_enabled else None)
+        # One observer bus for all sessions: a worker thread per observer, not per session.
+        self.observers = ObserverBus.from_config(cfg)
+        for obs in observers:
+            self.observers.register(obs)
+        self._sessions: Dict[asyncio.Task, Session] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._reaper: Optional[asyncio.Task] = None
+        self._closing = False
+        self.sessions_total = 0
+        self.requests_total = 0
+        self._count_lock = threading.Lock()   # requests are handled in executor threads
+
+    # ---- Sessions ----
+    def new_session(self) -> Session:
+        from . import build_registry
+        calc = Calculator(config=self.config, cache=self.cache, observers=self.observers)
+        return Session(calc, build_registry(calc, files=False))
+
+    @property
+    def sessions(self) -> int:
+        return len(self._sessions)
+
+    def handle_line(self, session: Session, raw: bytes) -> Optional[dict]:
+        """Run one request line; returns the reply (None for blank lines)."""
+        req_id = None
+        try:
+            text = raw.decode("utf-8").strip()
+            if text.startswith("{"):
+                req = json.loads(text)
+                req_id = req.get("id")
+                text = str(req.get("cmd", "")).strip()
+        except (UnicodeDecodeError, ValueError, AttributeError) as e:
+            return self._reply(req_id, False, f"Bad request: {e}")
+        parts = text.split()
+        if not parts:
+            return None if req_id is None else self._reply(req_id, False, "Empty command")
+
+        session.requests += 1
+        with self._count_lock:
+            self.requests_total += 1
+        cmd = parts[0].lower()
+        if cmd in {"exit", "quit"}:
+            session.closing = True
+            return self._reply(req_id, True, "Bye!")
+        if cmd == "help":
+            return self._reply(req_id, True, self.help_view.render())
+        if not session.registry.get(cmd):
+            return self._reply(req_id, False, f"Unknown command: {cmd}")
+        try:
+            out = session.registry.execute(cmd, parts)
+        except Exception as e:  # a command bug must not take the server down
+            log.exception("Command %r failed", cmd)
+            return self._reply(req_id, False, f"Internal error: {e}")
+        if out is None:
+            out = ""
+        elif not isinstance(out, str):
+            out = "\n".join(out)  # streamed output, e.g. history
+        return self._reply(req_id, not isinstance(out, ErrorOutput), str(out))
+
+    @staticmethod
+    def _reply(req_id, ok: bool, text: str) -> dict:
+        reply = {} if req_id is None else {"id": req_id}
+        reply["ok"] = ok
+        reply["output" if ok else "error"] = text
+        return reply
+
+    @staticmethod
+    def _encode(msg: dict) -> bytes:
+        return (json.dumps(msg, separators=(",", ":")) + "\n").encode("utf-8")
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        if self._closing or len(self._sessions) >= self.config.server_max_sessions:
+            writer.write(self._encode({"event": "busy"}))
+            writer.close()
+            return
+        session = self.new_session()
+        task = asyncio.current_task()
+        self._sessions[task] = session
+        self.sessions_total += 1
+        pending = b""
+        try:
+            while not self._closing and not session.closing:
+                session.waiting = True
+                try:
+                    chunk = await reader.read(_READ_SIZE)
+                finally:
+                    session.waiting = False
+                if not chunk:
+                    if pending.strip():
+                        await self._answer(session, writer, [pending])
+                        await writer.drain()
+                    break
+                session.last_active = time.monotonic()
+                # Every complete line in the chunk is answered with one write.
+                *lines, pending = (pending + chunk).split(b"\n")
+                await self._answer(session, writer, lines)
+                if len(pending) > _MAX_LINE:
+                    writer.write(self._encode(self._reply(None, False, "Request line too long")))
+                    break
+                await writer.drain()
+                await asyncio.sleep(0)  # let other sessions run between chunks
+        except asyncio.CancelledError:
+            session.end_event = session.end_event or "shutdown"
+        except ConnectionError:
+            pass
+        finally:
+            if self._closing and session.end_event is None and not session.closing:
+                session.end_event = "shutdown"
+            await self._close_session(session, writer)
+            del self._sessions[task]
+
+    def _replies(self, session: Session, lines) -> bytes:
+        out = []
+        for line in lines:
+            reply = self.handle_line(session, line)
+            if reply is not None:
+                out.append(self._encode(reply))
+            if session.closing:
+                break
+        return b"".join(out)
+
+    async def _answer(self, session: Session, writer: asyncio.StreamWriter, lines) -> None:
+        # Off the event loop: a long computation must not stall the other sessions.
+        loop = asyncio.get_running_loop()
+        job = loop.run_in_executor(None, self._replies, session, lines)
+        try:
+            out = await asyncio.shield(job)
+        except asyncio.CancelledError:
+            await job           # the session's calculator is closed only once the command is done
+            raise
+        if out:
+            writer.write(out)
+
+    async def _close_session(self, session: Session, writer: asyncio.StreamWriter) -> None:
+        try:
+            if session.end_event and not writer.is_closing():
+                writer.write(self._encode({"event": session.end_event}))
+            await asyncio.wait_for(writer.drain(), self.config.server_drain_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError, ConnectionError):
+            writer.transport.abort()
+        finally:
+            writer.close()
+            session.calc.close()
+
+    async def _reap_idle(self) -> None:
+        timeout = self.config.server_idle_timeout
+        while True:
+            await asyncio.sleep(max(min(timeout / 4, 5.0), 0.01))
+            now = time.monotonic()
+            for task, session in list(self._sessions.items()):
+                if session.waiting and now - session.last_active >= timeout:
+                    session.end_event = "idle"
+                    task.cancel()
+
+    # ---- Lifecycle ----
+    async def start(self, host: str = "127.0.0.1", port: Optional[int] = None,
+                    path: Optional[str] = None) -> asyncio.AbstractServer:
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._serve_client, path=path)
+        else:
+            self._server = await asyncio.start_server(self._serve_client, host, port or 0)
+        if self.config.server_idle_timeout > 0:
+            self._reaper = asyncio.create_task(self._reap_idle())
+        return self._server
+
+    @property
+    def address(self):
+        return self._server.sockets[0].getsockname() if self._server else None
+
+    async def shutdown(self) -> None:
+        """Stop accepting, let sessions finish their current request, then close them."""
+        if self._closing:
+            return
+        self._closing = True
+        if self._server is not None:
+            self._server.close()
+        if self._reaper is not None:
+            self._reaper.cancel()
+        for task, session in list(self._sessions.items()):
+            if session.waiting:
+                task.cancel()
+        tasks = list(self._sessions)
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=self.config.server_drain_timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.wait(pending)
+        if self._server is not None:
+            await self._server.wait_closed()
+        self.observers.close()
+
+    async def serve_until_signalled(self) -> None:
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):  # pragma: no cover (Windows)
+                pass
+        await stop.wait()
+        log.info("Draining %d session(s)...", len(self._sessions))
+        await self.shutdown()
+
+
+def serve_main(argv, cfg: AppConfig) -> int:  # pragma: no cover
+    """Entry point for ``python -m app serve``."""
+    import argparse
+    from .logger import init_logging, stop_logging, set_color, LoggingObserver
+    from .metrics import METRICS, MetricsExporter
+
+    parser = argparse.ArgumentParser(prog="python -m app serve",
+                                     description="Serve the calculator to many clients")
+    where = parser.add_mutually_exclusive_group(required=True)
+    where.add_argument("--port", type=int, help="TCP port (0 picks a free one)")
+    where.add_argument("--socket", help="Unix socket path")
+    parser.add_argument("--host", default="127.0.0.1")
+    args = parser.parse_args(argv)
+
+    set_color(False)
+    init_logging(cfg)
+    METRICS.configure(cfg)
+    exporter = MetricsExporter(cfg.metrics_path, cfg.metrics_interval).start() if METRICS.enabled else None
+    server = CalculatorServer(cfg, observers=[LoggingObserver(cfg)])
+
+    async def run():
+        await server.start(args.host, args.port, args.socket)
+        log.info("Serving on %s", args.socket or "%s:%s" % server.address[:2])
+        await server.serve_until_signalled()
+
+    try:
+        asyncio.run(run())
+    finally:
+        if exporter is not None:
+            exporter.stop()
+    log.info("Server stopped after %d session(s), %d request(s).",
+             server.sessions_total, server.requests_total)
+    stop_logging()
+    return 0
@@ -0,0 +1,107 @@
+# app/startup_bench.py
+"""
+Startup benchmark: ``python -m app.startup_bench [--runs N] [--budget-ms MS]``.
+
+Measures, each in a fresh interpreter:
+  - import time of the ``app`` package,
+  - cold-start latency of ``python -m app`` until the first result line,
+  - total wall time of a one-command session.
+"""
+from __future__ import annotations
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+DEFAULT_IMPORT_BUDGET_MS = 300.0
+HEAVY_MODULES = ("pandas", "numpy", "colorama", "dotenv")
+
+_IMPORT_PROBE = (
+    "import sys, time, json\n"
+    "t = time.perf_counter()\n"
+    "import app\n"
+    "ms = (time.perf_counter() - t) * 1000\n"
+    "print(json.dumps({'ms': ms, 'heavy': [m for m in %r if m in sys.modules]}))\n"
+) % (HEAVY_MODULES,)
+
+
+def import_budget_ms() -> float:
+    return float(os.getenv("CALCULATOR_IMPORT_BUDGET_MS", DEFAULT_IMPORT_BUDGET_MS))
+
+
+def _env(workdir: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = PROJECT_ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    env["CALCULATOR_AUTO_SAVE"] = "false"
+    env["CALCULATOR_LOG_DIR"] = os.path.join(workdir, "logs")
+    env["CALCULATOR_HISTORY_DIR"] = os.path.join(workdir, "history")
+    return env
+
+
+def measure_import(runs: int = 5) -> List[dict]:
+    """Import ``app`` in ``runs`` fresh interpreters; returns [{'ms', 'heavy'}]."""
+    out = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for _ in range(runs):
+            proc = subprocess.run([sys.executable, "-c", _IMPORT_PROBE], cwd=workdir,
+                                  env=_env(workdir), capture_output=True, text=True, check=True)
+            out.append(json.loads(proc.stdout))
+    return out
+
+
+def measure_first_result(runs: int = 5, command: str = "add 2 3") -> List[Dict[str, float]]:
+    """Spawn ``python -m app`` in pipe mode and time the first result line."""
+    out = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for _ in range(runs):
+            start = time.perf_counter()
+            proc = subprocess.Popen([sys.executable, "-m", "app"], cwd=workdir, env=_env(workdir),
+                                    stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                    stderr=subprocess.DEVNULL, text=True)
+            proc.stdin.write(command + "\n")
+            proc.stdin.close()
+            proc.stdout.readline()
+            first = time.perf_counter() - start
+            proc.wait()
+            total = time.perf_counter() - start
+            out.append({"first_result_ms": first * 1000, "total_ms": total * 1000})
+    return out
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    return {"min": min(values), "median": statistics.median(values), "max": max(values)}
+
+
+def run(runs: int = 5) -> dict:
+    imports = measure_import(runs)
+    sessions = measure_first_result(runs)
+    return {
+        "runs": runs,
+        "import_ms": _summary([r["ms"] for r in imports]),
+        "heavy_modules_loaded": sorted({m for r in imports for m in r["heavy"]}),
+        "first_result_ms": _summary([r["first_result_ms"] for r in sessions]),
+        "total_ms": _summary([r["total_ms"] for r in sessions]),
+    }
+
+
+def main(argv=None) -> int:  # pragma: no cover
+    import argparse
+    parser = argparse.ArgumentParser(prog="python -m app.startup_bench", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=import_budget_ms(),
+                        help="fail (exit 1) when the median import time exceeds this")
+    args = parser.parse_args(argv)
+
+    report = run(args.runs)
+    print(json.dumps(report, indent=2))
+    return 1 if report["import_ms"]["median"] > args.budget_ms else 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
@@ -7,3 +7,22 @@ PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir
 
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
+
+import pytest
+from app.calculator_config import AppConfig
+
+
+@pytest.fixture
+def make_config(tmp_path):
+    """Build an AppConfig whose logs and history live under ``tmp_path``; keywords override fields."""
+    def make(**overrides):
+        cfg = AppConfig.load()
+        cfg.log_dir = str(tmp_path / "logs")
+        cfg.history_dir = str(tmp_path / "hist")
+        cfg.history_file = "hist.csv"
+        cfg.auto_save = False
+        for k, v in overrides.items():
+            setattr(cfg, k, v)
+        cfg.ensure_dirs()
+        return cfg
+    return make
@@ -0,0 +1,81 @@
+import functools
+import os
+import pytest
+import threading
+import time
+from app.autosave import AutoSaveWriter
+from app.calculator import Calculator
+from app.calculator_config import MIN_AUTOSAVE_INTERVAL, AppConfig
+
+
+@pytest.fixture
+def make_config(make_config):
+    """Auto-save on."""
+    return functools.partial(make_config, auto_save=True)
+
+
+def test_writer_flushes_once_per_batch():
+    flushed = threading.Event()
+    calls = []
+
+    def flush():
+        calls.append(1)
+        flushed.set()
+
+    w = AutoSaveWriter(flush, interval=60, batch_size=3)
+    w.mark_dirty()
+    w.mark_dirty()
+    assert not calls
+    w.mark_dirty()
+    assert flushed.wait(2)
+    w.close()
+    assert len(calls) == 2  # batch + final flush on close
+
+
+def test_writer_flushes_after_interval():
+    flushed = threading.Event()
+    w = AutoSaveWriter(flushed.set, interval=0.05, batch_size=1000)
+    w.mark_dirty()
+    assert flushed.wait(2)
+    w.close()
+    w.mark_dirty()  # ignored once closed
+    assert w.pending == 0
+
+
+def test_idle_writer_with_zero_interval_sleeps():
+    calls = []
+    w = AutoSaveWriter(lambda: calls.append(1), interval=0, batch_size=1000)
+    w.mark_dirty()
+    deadline = time.monotonic() + 2
+    while not calls and time.monotonic() < deadline:
+        time.sleep(0.01)
+    cpu = time.process_time()
+    time.sleep(0.3)
+    assert time.process_time() - cpu < 0.1      # no busy loop while nothing is dirty
+    w.mark_dirty()                               # an idle writer still wakes up
+    while len(calls) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(calls) == 2
+    w.close()
+
+
+def test_compute_does_not_write_until_flush(make_config):
+    cfg = make_config(autosave_interval=60, autosave_batch_size=1000)
+    c = Calculator(config=cfg)
+    for i in range(10):
+        c.compute("add", i, i)
+    assert not os.path.exists(cfg.journal_path)
+    assert c.store.journal.pending == 11
+    c.close()
+    with open(cfg.journal_path, encoding="utf-8") as fh:
+        assert len(fh.readlines()) == 11
+
+
+def test_autosave_config_from_env(monkeypatch):
+    monkeypatch.setenv("CALCULATOR_AUTOSAVE_INTERVAL", "0.25")
+    monkeypatch.setenv("CALCULATOR_AUTOSAVE_BATCH_SIZE", "7")
+    cfg = AppConfig.load()
+    assert cfg.autosave_interval == 0.25
+    assert cfg.autosave_batch_size == 7
+    monkeypatch.setenv("CALCULATOR_AUTOSAVE_INTERVAL", "0")
+    assert AppConfig.load().autosave_interval == MIN_AUTOSAVE_INTERVAL
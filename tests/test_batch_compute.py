@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from app.calculator import Calculator
+from app.exceptions import OperationError, ValidationError
+from app.operations import OperationFactory
+
+
+@pytest.mark.parametrize("op", sorted(OperationFactory._registry))
+def test_execute_many_matches_scalar_execute(op):
+    a = np.array([7.0, 27.0, 2.5, 100.0])
+    b = np.array([3.0, 3.0, 2.0, 4.0])
+    batch = OperationFactory.create(op).execute_many(a, b)
+    assert batch.ok
+    expected = [OperationFactory.create(op).execute(x, y) for x, y in zip(a, b)]
+    assert np.allclose(batch.results, expected)
+
+
+@pytest.mark.parametrize("op,a,b,message", [
+    ("divide", 1, 0, "Division by zero."),
+    ("root", 8, 0, "Zeroth root is undefined."),
+    ("root", -16, 2, "Even root of a negative number is not real."),
+    ("modulus", 1, 0, "Modulus by zero."),
+    ("int_divide", 1, 0, "Integer division by zero."),
+    ("percent", 1, 0, "Percentage undefined when denominator is zero."),
+    ("power", 10, 1e5, "Result is not a finite number."),
+])
+def test_execute_many_masks_failing_rows(op, a, b, message):
+    batch = OperationFactory.create(op).execute_many(np.array([4.0, a]), np.array([2.0, b]))
+    assert batch.errors[message].tolist() == [1]
+    assert batch.failed_indices.tolist() == [1]
+    assert np.isnan(batch.results[1]) and not np.isnan(batch.results[0])
+
+
+def test_odd_root_of_negative_is_real():
+    batch = OperationFactory.create("root").execute_many([-8.0], [3.0])
+    assert batch.results.tolist() == [-2.0]
+
+
+@pytest.mark.parametrize("op,a,b", [
+    ("root", -8, 3), ("root", -32, 5), ("root", -8, -3), ("root", -16, 2), ("root", -8, 2.5),
+    ("root", 8, 0), ("power", -8, 0.5), ("power", -2, 3), ("power", -2, -2), ("power", 0, -1),
+])
+def test_compute_and_compute_many_agree(make_config, op, a, b):
+    c = Calculator(config=make_config())
+    batch = c.compute_many(op, [a], [b])
+    if batch.ok:
+        assert c.compute(op, a, b) == batch.results[0]
+    else:
+        (message,) = batch.errors
+        with pytest.raises(OperationError, match=message.replace(".", r"\.")):
+            c.compute(op, a, b)
+
+
+def test_compute_many_rounds_and_pushes_in_bulk(make_config):
+    c = Calculator(config=make_config(precision=2))
+    batch = c.compute_many("divide", [1, 2, 3, 4], [3, 0, 3, float("nan")])
+    assert batch.results[0] == 0.33 and batch.results[2] == 1.0
+    assert batch.errors["Division by zero."].tolist() == [1]
+    assert batch.errors["NaN is not allowed."].tolist() == [3]
+    assert [x.result for x in c.history.items] == [0.33, 1.0]
+    assert len({x.timestamp for x in c.history.items}) == 1
+
+
+def test_compute_many_only_keeps_max_history_size(make_config):
+    c = Calculator(config=make_config(max_history_size=5))
+    c.compute("add", 1, 1)
+    batch = c.compute_many("add", np.arange(1000), np.ones(1000))
+    assert len(batch.results) == 1000
+    assert [x.a for x in c.history.items] == [995.0, 996.0, 997.0, 998.0, 999.0]
+
+
+def test_compute_many_rejects_bad_input(make_config):
+    c = Calculator(config=make_config())
+    with pytest.raises(OperationError):
+        c.compute_many("nope", [1], [1])
+    with pytest.raises(ValidationError):
+        c.compute_many("add", [1, 2], [1, 2, 3])
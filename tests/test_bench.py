@@ -0,0 +1,29 @@
+import json
+from app import bench
+
+
+def test_quick_run_covers_every_hot_path():
+    results = bench.run(history_sizes=(10,), csv_rows=(10,), iterations=20, repeats=1)
+    names = set(results)
+    assert {f"compute.{op}" for op in bench.SAFE_ARGS} <= names
+    assert {"history.push@10", "history.undo_redo@10", "history.save_csv@10", "history.load_csv@10",
+            "input.parse_two_numbers", "input.validate_number", "repl.dispatch"} <= names
+    assert all(r.ns_per_op > 0 and r.ops_per_sec > 0 for r in results.values())
+
+    report = bench.to_json(results)
+    json.dumps(report)  # serializable
+    assert "python" in report["meta"] and "repl.dispatch" in bench.format_table(report)
+
+
+def _report(**ns):
+    return {"results": {name: {"ns_per_op": v, "ops_per_sec": 1e9 / v} for name, v in ns.items()}}
+
+
+def test_compare_flags_regressions_beyond_threshold():
+    baseline = _report(a=100.0, b=100.0, gone=5.0)
+    current = _report(a=109.0, b=130.0, new=1.0)
+    rows = {r["name"]: r for r in bench.compare(current, baseline, threshold=0.10)}
+    assert set(rows) == {"a", "b"}
+    assert not rows["a"]["regression"] and rows["b"]["regression"]
+    table = bench.format_table(current, list(rows.values()))
+    assert "+30.0% !" in table and "+9.0%" in table
@@ -7,3 +7,33 @@ def test_calculation_create():
     assert c.b == 3 or getattr(c, "operand2", 3) == 3
     assert c.result == 5
     assert isinstance(c.timestamp, str)
+
+def test_calculation_is_compact_and_immutable():
+    import pickle
+    import pytest
+    c = Calculation.create("add", 2, 3, 5)
+    assert not hasattr(c, "__dict__")
+    with pytest.raises(AttributeError):
+        c.result = 6
+    with pytest.raises(AttributeError):
+        del c.a
+    assert pickle.loads(pickle.dumps(c)) == c
+    assert "add" in repr(c) and c.timestamp in repr(c)
+
+def test_timestamp_is_epoch_micros_formatted_on_access():
+    c = Calculation("add", 1, 2, 3, "2024-01-02T03:04:05.000123")
+    assert c.ts_micros == 1704164645000123
+    assert c.timestamp == "2024-01-02T03:04:05.000123"
+    assert c == Calculation("add", 1, 2, 3, 1704164645000123)
+    assert hash(c) == hash(Calculation("add", 1, 2, 3, 1704164645000123))
+    assert Calculation("add", 1, 2, 3, "2024-01-02T03:04:05").timestamp == "2024-01-02T03:04:05"
+    # anything else is kept verbatim
+    for raw in ("yesterday", "2024-01-02 03:04:05", "2024-01-02T03:04:05+00:00"):
+        odd = Calculation("add", 1, 2, 3, raw)
+        assert odd.timestamp == raw and odd.ts_micros is None
+    assert c != ("add", 1, 2, 3, c.timestamp)
+
+def test_batch_shares_timestamp_and_operation_is_interned():
+    batch = Calculation.create_many("".join(["mul", "tiply"]), [1, 2], [3, 4], [3, 8])
+    assert batch[0].ts_micros == batch[1].ts_micros
+    assert batch[0].operation is "multiply"  # noqa: F632 (interned)
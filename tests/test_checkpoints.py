@@ -0,0 +1,104 @@
+import random
+import pytest
+from app import build_registry
+from app.calculator import Calculator
+from app.command import ErrorOutput
+from app.exceptions import HistoryError
+from app.history import History
+from app.pvector import PVector, EMPTY, node_bytes
+
+
+def _calc(make_config, n=0, **overrides):
+    c = Calculator(config=make_config(**overrides))
+    for i in range(n):
+        c.compute("add", i, 0)
+    return c
+
+
+def _as(c):
+    h = c.history
+    return [h[i].a for i in range(h._cursor + 1)]
+
+
+def test_pvector_matches_list():
+    rng = random.Random(7)
+    ref, vec = [], EMPTY
+    for _ in range(3000):
+        if rng.random() < 0.05 and ref:
+            n = rng.randrange(len(ref) + 1)
+            ref, vec = ref[:n], vec.take(n)
+        else:
+            ref.append(rng.random())
+            vec = vec.append(ref[-1])
+        assert len(vec) == len(ref)
+    assert list(vec) == ref
+    assert [vec[i] for i in range(len(ref))] == ref and vec[-1] == ref[-1]
+    assert list(PVector.from_iterable(range(2000))) == list(range(2000))
+    with pytest.raises(IndexError):
+        vec[len(ref)]
+
+
+def test_mementos_share_structure(make_config):
+    c = _calc(make_config, n=1000, max_history_size=5000)
+    c.checkpoint("a")
+    c.compute("add", 1000, 0)
+    c.checkpoint("b")
+    shared, copied = c.checkpoint_memory()
+    assert shared < copied / 2
+    a, b = c.checkpoints["a"].items, c.checkpoints["b"].items
+    # Snapshots are unaffected by later pushes.
+    assert len(a) == 1000 and len(b) == 1001 and b[-1].a == 1000.0
+    unique, _ = node_bytes([a.vector])
+    assert unique > 0
+
+
+def test_rollback_restores_and_survives_clear(make_config):
+    c = _calc(make_config, n=5)
+    c.checkpoint("five")
+    c.undo()
+    c.compute("add", 99, 0)
+    c.rollback("five")
+    assert _as(c) == [0.0, 1.0, 2.0, 3.0, 4.0]
+    c.clear_history()
+    assert _as(c) == []
+    c.rollback("five")
+    assert _as(c) == [0.0, 1.0, 2.0, 3.0, 4.0]
+    c.undo()
+    assert _as(c) == [0.0, 1.0, 2.0, 3.0]
+
+
+def test_rollback_unknown_and_autosave(make_config):
+    c = _calc(make_config, n=3, auto_save=True)
+    with pytest.raises(HistoryError):
+        c.rollback("nope")
+    c.checkpoint("three")
+    c.compute("add", 3, 0)
+    c.rollback("three")
+    c.close()
+    reloaded = _calc(make_config)
+    reloaded.load_history()
+    assert _as(reloaded) == [0.0, 1.0, 2.0]
+
+
+def test_restore_of_larger_snapshot_respects_max_size():
+    big = History(max_size=100)
+    for i in range(50):
+        big.push(i)
+    small = History(max_size=10)
+    small.restore(big.save())
+    assert small.items == list(range(40, 50))
+
+
+def test_commands(make_config):
+    c = _calc(make_config, n=40)
+    registry = build_registry(c)
+    assert "no checkpoints" in registry.get("checkpoints").execute(["checkpoints"])
+    assert "saved" in registry.get("checkpoint").execute(["checkpoint", "x"])
+    c.compute("add", 40, 0)
+    assert "Rolled back" in registry.get("rollback").execute(["rollback", "x"])
+    assert len(c.history) == 40
+    out = registry.get("checkpoints").execute(["checkpoints"])
+    assert "x" in out and "40 entries" in out and "KiB" in out
+    for name, parts in (("checkpoint", ["checkpoint"]), ("rollback", ["rollback"]),
+                        ("rollback", ["rollback", "missing"])):
+        assert isinstance(registry.get(name).execute(parts), ErrorOutput)
@@ -0,0 +1,80 @@
+import math
+import pytest
+from app.calculator import Calculator
+from app.command import EvalCommand, ErrorOutput
+from app.exceptions import OperationError, ValidationError
+from app.expression import Apply, Const, ExpressionEngine, Param, tokenize
+
+
+def _calc(make_config, engine=None):
+    return Calculator(config=make_config(), expressions=engine or ExpressionEngine())
+
+
+@pytest.mark.parametrize("source,expected", [
+    ("(2 + 3) ^ 4 / root(81, 4)", 208.333333),
+    ("2 + 3 * 4", 14.0),
+    ("-2 ^ 2", -4.0),
+    ("2 ^ 3 ^ 2", 512.0),
+    ("2 ^ -1", 0.5),
+    ("7 // 2 + 7 % 2", 4.0),
+    ("abs_diff(3, 10) - percent(1, 4)", -18.0),
+    ("2 * PI", round(2 * math.pi, 6)),
+])
+def test_evaluate(make_config, source, expected):
+    assert _calc(make_config).evaluate(source) == expected
+
+
+def test_same_shape_reuses_compiled_plan(make_config):
+    engine = ExpressionEngine()
+    c = _calc(make_config, engine)
+    assert c.evaluate("(2 + 3) ^ 4") == 625.0
+    assert c.evaluate("( 7+1 )^2") == 64.0
+    assert (engine.compiled, engine.reused) == (1, 1)
+    assert tokenize("( 7+1 )^2") == ("( # + # ) ^ #", [7, 1, 2])
+
+
+def test_constants_are_folded():
+    plan = ExpressionEngine().compile(tokenize("3 * (pi * tau) - -e")[0])
+    assert plan.ast == Apply("subtract", Apply("multiply", Param(0), Const(math.pi * math.tau)), Const(-math.e))
+
+
+def test_plan_cache_is_bounded():
+    engine = ExpressionEngine(max_plans=2)
+    for src in ["1 + 1", "1 - 1", "1 * 1"]:
+        engine.evaluate(src)
+    assert len(engine._plans) == 2
+
+
+@pytest.mark.parametrize("source,exc,message", [
+    ("1 / (3 - 3)", OperationError, "Division by zero."),
+    ("root(-16, 2)", OperationError, "Even root of a negative number is not real."),
+    ("root(8, 0) + 1", OperationError, "Zeroth root is undefined."),
+    ("(-8) ^ 0.5", OperationError, "Fractional power of a negative number is not real."),
+    ("2 +", ValidationError, "Expected more input"),
+    ("(1 + 2", ValidationError, "Expected ')'"),
+    ("1 2", ValidationError, "Unexpected token"),
+    ("foo(1, 2)", ValidationError, "Unknown name"),
+    ("1 $ 2", ValidationError, "Unexpected character"),
+    ("   ", ValidationError, "Empty expression"),
+    ("1e999 + 1", ValidationError, "out of range"),
+])
+def test_sub_results_are_validated(make_config, source, exc, message):
+    with pytest.raises(exc, match=message.replace("(", r"\(").replace(")", r"\)")):
+        _calc(make_config).evaluate(source)
+
+
+def test_eval_command(make_config):
+    cmd = EvalCommand(_calc(make_config).evaluate)
+    assert "1 + 1 = 2.0" in cmd.execute(["eval", "1", "+", "1"])
+    assert isinstance(cmd.execute(["eval", "1/0"]), ErrorOutput)
+    assert isinstance(cmd.execute(["eval"]), ErrorOutput)
+
+
+def test_literals_respect_max_input_value(make_config):
+    calc = _calc(make_config)
+    calc.config.max_input_value = 1e12
+    for source in ("1e300 * 1e300", "-1e13 + 1", "root(2e12, 2)"):
+        with pytest.raises(ValidationError, match="exceeds maximum allowed value of 1e\\+12"):
+            calc.evaluate(source)
+    assert calc.evaluate("1e11 * 100") == 1e13       # results may exceed it, like compute()
+    assert tokenize("3e15 + 1")[1] == [3e15, 1]      # no bound unless one is given
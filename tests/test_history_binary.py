@@ -0,0 +1,107 @@
+import functools
+import struct
+import pytest
+from app.calculation import Calculation
+from app.calculator import Calculator
+from app.command import ExportCommand, ErrorOutput
+from app.exceptions import PersistenceError
+from app.history import History
+from app import history_format
+
+
+@pytest.fixture
+def make_config(make_config):
+    """History in the binary format."""
+    return functools.partial(make_config, history_file="hist.chist")
+
+
+def _history(n=5):
+    h = History(max_size=n + 2)
+    h.push(Calculation("add", 1.5, 2, 3.5, "2024-01-02T03:04:05.123456"))
+    h.push(Calculation("divide", 1, 3, 0.333333, "2024-01-02T03:04:06"))
+    h.extend(Calculation.create_many("power", range(n), [2] * n, [float(i * i) for i in range(n)]))
+    return h
+
+
+def test_binary_roundtrip_is_lossless(tmp_path):
+    h = _history()
+    path = str(tmp_path / "out" / "h.chist")
+    h.save_binary(path)
+    h2 = History(max_size=100)
+    h2.load_binary(path)
+    assert h2.items == h.items
+    assert h2[0].timestamp == "2024-01-02T03:04:05.123456"
+    assert h2[1].timestamp == "2024-01-02T03:04:06"
+
+
+def test_header_and_dictionary_encoding(tmp_path):
+    path = tmp_path / "h.chist"
+    _history(1000).save_binary(str(path))
+    raw = path.read_bytes()
+    magic, version, n_ops, rows = struct.unpack_from("<6sHIQ", raw)
+    assert (magic, version, n_ops, rows) == (history_format.MAGIC, 1, 3, 1002)
+    # three short names + fixed-width columns: 2 + 8*3 + 8 bytes per row
+    assert len(raw) < 20 + 64 + rows * 34 + 1
+
+
+def test_load_respects_max_size_and_only_applied_rows_saved(tmp_path):
+    h = _history(10)
+    h.undo()
+    path = str(tmp_path / "h.chist")
+    h.save_binary(path)
+    small = History(max_size=3)
+    small.load_binary(path)
+    assert [c.a for c in small.items] == [6.0, 7.0, 8.0]
+
+
+def test_format_resolution(tmp_path):
+    csv_path = tmp_path / "h.csv"
+    bin_path = tmp_path / "h.dat"
+    _history().save_file(str(csv_path))
+    _history().save_file(str(bin_path), fmt="binary")
+    assert history_format.resolve_format(str(csv_path)) == "csv"
+    assert history_format.resolve_format(str(bin_path)) == "binary"   # sniffed from the header
+    assert history_format.resolve_format("x.CHIST") == "binary"
+    with pytest.raises(PersistenceError):
+        history_format.resolve_format("x.csv", "parquet")
+    h = History(max_size=100)
+    h.load_file(str(bin_path))
+    assert len(h) == 7
+
+
+def test_corrupt_files_raise_persistence_error(tmp_path):
+    path = tmp_path / "h.chist"
+    _history().save_binary(str(path))
+    raw = path.read_bytes()
+    codes_at = 20 + (2 + 3) + (2 + 6) + (2 + 5)     # header + add/divide/power names
+    bad_code = raw[:codes_at] + struct.pack("<H", 7) + raw[codes_at + 2:]
+    for bad in (raw[:10], raw[:-3], b"NOTHIST" + raw[7:], raw[:6] + struct.pack("<H", 9) + raw[8:], bad_code):
+        path.write_bytes(bad)
+        with pytest.raises(PersistenceError):
+            History().load_binary(str(path))
+    with pytest.raises(PersistenceError):
+        History().load_binary(str(tmp_path / "missing.chist"))
+    h = History()
+    h.push(Calculation("add", 1, 2, 3, "not-a-timestamp"))
+    with pytest.raises(PersistenceError, match="only holds ISO timestamps"):
+        h.save_binary(str(tmp_path / "bad.chist"))
+    with pytest.raises(PersistenceError, match="'yesterday'; export as CSV"):
+        history_format.encode_binary([Calculation("add", 1, 2, 3, "yesterday")])
+
+
+def test_calculator_save_load_and_export(tmp_path, make_config):
+    c = Calculator(config=make_config())
+    c.compute("add", 2, 3)
+    c.compute("multiply", 4, 5)
+    c.save_history()
+    assert history_format.is_binary(c.config.history_path)
+    c.clear_history()
+    c.load_history()
+    assert [x.result for x in c.history.items] == [5.0, 20.0]
+
+    out = tmp_path / "export.csv"
+    cmd = ExportCommand(c.export_history)
+    assert "exported" in cmd.execute(["export", str(out)])
+    assert out.read_text().startswith("operation,operand1,operand2,result,timestamp")
+    assert isinstance(cmd.execute(["export"]), ErrorOutput)
+    assert isinstance(cmd.execute(["export", str(tmp_path)]), ErrorOutput)
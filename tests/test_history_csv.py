@@ -0,0 +1,126 @@
+import functools
+import math
+import pandas as pd
+import pytest
+from app import Calculator, build_registry
+from app.calculation import Calculation
+from app.exceptions import PersistenceError
+from app.history import History
+from app.history_csv import load_csv
+
+
+@pytest.fixture
+def make_config(make_config):
+    """File backend with auto-save on."""
+    return functools.partial(make_config, history_backend="file", auto_save=True)
+
+
+def _write(path, lines):
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_chunked_load_keeps_newest_rows_and_timestamps(tmp_path):
+    h = History(max_size=100)
+    h.extend([Calculation("add", float(n), 1.0, n + 1.0, n * 1_000_001) for n in range(50)])
+    h.push(Calculation("divide", 1.0, 0.0, math.nan, "not a time"))
+    h.push(Calculation("add", 0.0, 0.0, 0.0, "2024-13-01T00:00:00"))
+    path = str(tmp_path / "h.csv")
+    h.save_csv(path)
+
+    assert list(map(repr, load_csv(path, chunk_rows=7))) == list(map(repr, h.items))
+    tail = load_csv(path, limit=10, chunk_rows=4)
+    assert list(map(repr, tail)) == list(map(repr, h.items[-10:]))
+    assert tail[-1].timestamp == "2024-13-01T00:00:00" and tail[-2].ts_micros is None
+    assert load_csv(path, limit=0, chunk_rows=4) == []
+    small = History(max_size=5)
+    small.load_csv(path)
+    assert small.items[-1] == h.items[-1] and len(small) == 5
+
+    shuffled = _write(tmp_path / "cols.csv", [
+        "timestamp,result,operand2,operand1,operation,note",
+        "2024-01-01T00:00:00,3,2,1,add,x",
+        "",
+        "2024-01-01T00:00:01.500000,6,3,2,multiply,y",
+    ])
+    rows = load_csv(shuffled, chunk_rows=1)
+    assert [(c.operation, c.a, c.b, c.result) for c in rows] == [("add", 1, 2, 3), ("multiply", 2, 3, 6)]
+    assert rows[1].timestamp == "2024-01-01T00:00:01.500000"
+
+
+def test_bad_rows_are_reported_by_row_number(tmp_path):
+    path = _write(tmp_path / "bad.csv", [
+        "operation,operand1,operand2,result,timestamp",
+        "add,1,1,2,2024-01-01T00:00:00",
+        "add,x,1,2,2024-01-01T00:00:00",
+        "",
+        "add,1,1",
+        "add,1,1,two,2024-01-01T00:00:00",
+    ] + [f"add,1,1,oops{n},t" for n in range(12)])
+    with pytest.raises(PersistenceError) as exc:
+        load_csv(path, chunk_rows=2)
+    assert "Bad rows in history file: 3, 5, 6, 7, 8, 9, 10, 11, 12, 13 and 5 more" in str(exc.value)
+    h = History()
+    h.push(Calculation.create("add", 1, 1, 2))
+    with pytest.raises(PersistenceError):
+        h.load_csv(path)
+    assert len(h) == 1                 # a rejected file leaves the history alone
+    with pytest.raises(PersistenceError):
+        load_csv(_write(tmp_path / "hdr.csv", ["operation,a,b"]))
+
+
+def test_from_dataframe_is_columnar_and_capped():
+    df = pd.DataFrame({
+        "operation": ["add", "multiply", "subtract"],
+        "operand1": [1, 2, 3], "operand2": ["1", "2", "3"], "result": [2, 4, 0],
+        "timestamp": ["2024-01-01T00:00:00", "later", pd.Timestamp("2024-01-02")],
+    })
+    h = History.from_dataframe(df)
+    assert [(c.operation, c.a, c.b, c.result) for c in h] == [("add", 1.0, 1.0, 2.0), ("multiply", 2.0, 2.0, 4.0),
+                                                             ("subtract", 3.0, 3.0, 0.0)]
+    assert h[0].ts_micros is not None and h[1].timestamp == "later"
+    assert h[2].timestamp == "2024-01-02 00:00:00"
+    assert [c.operation for c in History.from_dataframe(df, max_size=2)] == ["multiply", "subtract"]
+
+
+def test_load_append_merges_saved_history(make_config):
+    cfg = make_config()
+    c = Calculator(config=cfg)
+    for x in (1, 2):
+        c.compute("add", x, 0)
+    c.close()
+
+    c2 = Calculator(config=make_config(auto_save=False))
+    registry = build_registry(c2)
+    c2.compute("add", 100, 0)
+    assert "merged" in registry.execute("load", ["load", "--append"])
+    assert [x.result for x in c2.history] == [100.0, 1.0, 2.0]
+    assert "Usage" in registry.execute("load", ["load", "--merge"])
+    c2.save_history()
+    assert "merged" in registry.execute("load", ["load", "--append"])
+    assert len(c2.history) == 3        # the file now holds this session's history
+    c2.close()
+
+    c3 = Calculator(config=cfg)
+    c3.load_history()
+    assert [x.result for x in c3.history] == [100.0, 1.0, 2.0]
+    c3.close()
+
+
+def test_load_append_with_sqlite_takes_other_sessions(make_config):
+    cfg = make_config(history_backend="sqlite")
+    a, b = Calculator(config=cfg), Calculator(config=cfg)
+    a.compute("add", 1, 0)
+    b.compute("add", 2, 0)
+    a.flush_history()
+    b.flush_history()
+    b.load_history(append=True)
+    assert [x.result for x in b.history] == [2.0, 1.0]
+    b.load_history(append=True)                 # nothing new
+    assert len(b.history) == 2
+    a.close()
+    b.close()
+    c = Calculator(config=cfg)
+    c.load_history()
+    assert sorted(x.result for x in c.history) == [1.0, 2.0]   # the merged row moved, not copied
+    c.close()
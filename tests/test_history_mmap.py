@@ -0,0 +1,128 @@
+import pytest
+from app.calculation import Calculation
+from app.calculator import Calculator
+from app.exceptions import PersistenceError
+from app.history import History
+from app import history_mmap
+
+
+def _saved(tmp_path, name, n=10):
+    h = History(max_size=n)
+    h.extend([Calculation("add", i, 1, i + 1.0, f"2024-01-01T00:00:{i:02d}") for i in range(n)])
+    path = str(tmp_path / name)
+    h.save_file(path)
+    return h, path
+
+
+@pytest.mark.parametrize("name", ["h.csv", "h.chist"])
+def test_mapped_rows_match_eager_load(tmp_path, name):
+    h, path = _saved(tmp_path, name)
+    lazy = History(max_size=100)
+    lazy.load_file(path, lazy=True)
+    assert lazy.lazy_rows == 10 and len(lazy) == 10
+    assert lazy.items == h.items
+    assert lazy[-1].timestamp == "2024-01-01T00:00:09"
+
+
+def test_push_appends_after_mapped_base_and_evicts_from_it(tmp_path):
+    _, path = _saved(tmp_path, "h.chist")
+    h = History(max_size=12)
+    h.load_mapped(path)
+    for i in range(3):
+        h.push(Calculation("multiply", i, 2, i * 2.0, "2024-01-02T00:00:00"))
+    assert len(h) == 12 and h.lazy_rows == 9          # oldest base row pushed out
+    assert h[0].a == 1 and h[8].a == 9 and h[9].operation == "multiply"
+    h.undo()
+    h.redo()
+    assert h[-1].a == 2
+
+
+def test_undo_into_base_then_push_drops_future(tmp_path):
+    _, path = _saved(tmp_path, "h.csv")
+    h = History(max_size=20)
+    h.load_mapped(path)
+    h.push(Calculation("multiply", 1, 1, 1.0, "2024-01-02T00:00:00"))
+    for _ in range(5):
+        h.undo()
+    h.push(Calculation("divide", 9, 3, 3.0, "2024-01-02T00:00:01"))
+    assert [c.a for c in h.items] == [0, 1, 2, 3, 4, 5, 9]
+    assert h.lazy_rows == 6
+    for _ in range(7):
+        h.undo()
+    h.push(Calculation("divide", 8, 2, 4.0, "2024-01-02T00:00:02"))
+    assert h.lazy_rows == 0 and [c.a for c in h.items] == [8]
+
+
+def test_max_size_keeps_newest_mapped_rows(tmp_path):
+    _, path = _saved(tmp_path, "h.csv")
+    h = History(max_size=3)
+    h.load_mapped(path)
+    assert [c.a for c in h.items] == [7.0, 8.0, 9.0]
+    h.clear()
+    assert h.lazy_rows == 0
+
+
+def test_save_over_mapped_file_is_safe(tmp_path):
+    _, path = _saved(tmp_path, "h.csv")
+    h = History(max_size=100)
+    h.load_mapped(path)
+    h.push(Calculation("add", 100, 1, 101.0, "2024-01-03T00:00:00"))
+    h.save_csv(path)                         # replaces the mapped file by rename
+    assert h[0].a == 0.0                     # old mapping stays readable
+    reloaded = History(max_size=100)
+    reloaded.load_mapped(path)
+    assert len(reloaded) == 11 and reloaded[-1].a == 100.0
+
+
+def test_csv_quirks_and_errors(tmp_path):
+    path = tmp_path / "h.csv"
+    path.write_text("timestamp,operation,operand1,operand2,result\n\n"
+                    "2024-01-01T00:00:00,add,1,2,3\r\n"
+                    "2024-01-01T00:00:01,add,x,2,3")
+    h = History()
+    h.push(Calculation.create("add", 1, 1, 2))
+    with pytest.raises(PersistenceError, match="Bad rows in history file: 4"):
+        h.load_mapped(str(path))             # refused at load, like an eager load
+    assert len(h) == 1
+    path.write_text("timestamp,operation,operand1,operand2,result\n\n"
+                    "2024-01-01T00:00:00,add,1,2,3\r\n\r\n\n"
+                    "2024-01-01T00:00:01,add,4,2,6")
+    h.load_mapped(str(path))
+    assert len(h) == 2 and [c.result for c in h] == [3.0, 6.0]
+    assert h.lazy_rows == 2
+    path.write_bytes(b"timestamp,operation,operand1,operand2,result\n\xff,add,1,2,3\n")
+    with pytest.raises(PersistenceError, match="Failed to load history"):
+        h.load_mapped(str(path))
+    path.write_text("")
+    with pytest.raises(PersistenceError):
+        h.load_mapped(str(path))
+    path.write_text("a,b\n1,2\n")
+    with pytest.raises(PersistenceError):
+        h.load_mapped(str(path))
+    with pytest.raises(PersistenceError):
+        h.load_mapped(str(tmp_path / "missing.csv"))
+    with pytest.raises(PersistenceError):
+        history_mmap.open_mapped(str(tmp_path / "h.csv"), fmt="csv", encoding="utf-16")
+    assert not history_mmap.supports_encoding("no-such-codec")
+
+
+def test_rows_are_indexable_and_closeable(tmp_path):
+    _, path = _saved(tmp_path, "h.chist", n=3)
+    rows = history_mmap.open_mapped(path)
+    with pytest.raises(IndexError):
+        rows[3]
+    rows.close()
+    rows.close()
+
+
+def test_calculator_loads_large_files_lazily(make_config):
+    cfg = make_config(history_mmap_threshold=0)
+    c = Calculator(config=cfg)
+    for i in range(5):
+        c.compute("add", i, 1)
+    c.save_history()
+    c2 = Calculator(config=cfg)
+    c2.load_history()
+    assert c2.history.lazy_rows == 5
+    c2.compute("add", 10, 1)
+    assert [x.result for x in c2.history.items] == [1.0, 2.0, 3.0, 4.0, 5.0, 11.0]
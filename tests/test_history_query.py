@@ -0,0 +1,148 @@
+import random
+import pytest
+from app import Calculator, build_registry
+from app.calculation import Calculation
+from app.history import History
+from app.history_index import _RangeIndex
+
+
+OPS = ["add", "subtract", "divide", "power"]
+
+
+def _calc(rng, n):
+    return Calculation(rng.choice(OPS), rng.randint(-5, 5), rng.randint(-5, 5),
+                       float(rng.randint(-100, 100)), 1_000_000 * n)
+
+
+def _brute(h, operation=None, a=None, b=None, result=None, since=None, until=None,
+           sort="index", limit=None):
+    def inside(x, rng):
+        lo, hi = rng if rng else (None, None)
+        return (lo is None or x >= lo) and (hi is None or x <= hi)
+    out = []
+    for i in range(h._cursor + 1):
+        c = h[i]
+        ts = c.ts_micros
+        if operation is not None and c.operation != operation:
+            continue
+        if not (inside(c.a, a) and inside(c.b, b) and inside(c.result, result)):
+            continue
+        if (since is not None or until is not None) and not inside(ts / 1e6, (since, until)):
+            continue
+        out.append((i, c))
+    key = sort.lstrip("-")
+    if key != "index":
+        out.sort(key=lambda m: m[1].result if key == "result" else m[1].ts_micros)
+    if sort.startswith("-"):
+        out.reverse()
+    return out[:limit] if limit is not None else out
+
+
+QUERIES = [
+    dict(),
+    dict(operation="divide"),
+    dict(operation="add", result=(0, None)),
+    dict(result=(-10, 10)),
+    dict(a=(0, 3), b=(None, 0)),
+    dict(since=50, until=120),
+    dict(operation="power", since=100),
+    dict(operation="nope"),
+]
+
+
+def _check(h):
+    for q in QUERIES:
+        assert h.query(**q) == _brute(h, **q), q
+
+
+def test_indexes_track_push_undo_redo_discard_and_eviction(monkeypatch):
+    monkeypatch.setattr(_RangeIndex, "merge_at", 8)   # exercise merges and prunes
+    rng = random.Random(7)
+    h = History(max_size=60)
+    n = 0
+    for _ in range(40):
+        h.push(_calc(rng, n)); n += 1
+    _check(h)                      # builds the index
+    for step in range(600):
+        roll = rng.random()
+        if roll < 0.15 and h.can_undo():
+            h.undo()
+        elif roll < 0.25 and h.can_redo():
+            h.redo()
+        else:
+            h.push(_calc(rng, n)); n += 1
+        if step % 25 == 0:
+            _check(h)
+    _check(h)
+
+
+def test_sort_and_limit():
+    rng = random.Random(3)
+    h = History(max_size=500)
+    h.extend([_calc(rng, n) for n in range(300)])
+    for sort in ("index", "-index", "time", "-time"):
+        assert h.query(operation="add", sort=sort, limit=7) == _brute(h, operation="add", sort=sort, limit=7)
+    top = h.query(sort="-result", limit=5)
+    assert [c.result for _, c in top] == sorted((c.result for c in h), reverse=True)[:5]
+    assert [c.result for _, c in h.query(result=(None, 0), sort="result")] == \
+        sorted(c.result for c in h if c.result <= 0)
+    assert h.query(limit=0) == []
+    with pytest.raises(ValueError):
+        h.query(sort="size")
+
+
+def test_reset_and_untimed_entries(tmp_path):
+    h = History(max_size=10)
+    h.push(Calculation("add", 1, 1, 2.0, 5_000_000))
+    assert len(h.query()) == 1
+    h.push(Calculation("add", 2, 2, 4.0, "not a time"))
+    assert h.query(since=0) == [(0, h[0])]              # no timestamp: never in a window
+    assert [i for i, _ in h.query(sort="-time")] == [0, 1]
+    path = str(tmp_path / "h.csv")
+    h.save_csv(path)
+    other = History(max_size=10)
+    other.push(Calculation("divide", 9, 3, 3.0, 0))
+    other.load_csv(path)
+    h.clear()
+    assert h.query() == []
+    assert [c.operation for _, c in other.query()] == ["add", "add"]
+
+
+def test_lazy_history_is_indexed(tmp_path):
+    path = str(tmp_path / "h.chist")
+    src = History(max_size=100)
+    src.extend([Calculation("divide" if n % 3 else "add", n, 1, float(n), n * 1_000_000) for n in range(50)])
+    src.save_binary(path)
+    h = History(max_size=40)
+    h.load_mapped(path)
+    assert h.lazy_rows == 40
+    found = h.query(operation="add", result=(20, 30))
+    assert [c.result for _, c in found] == [21.0, 24.0, 27.0, 30.0]
+    h.push(Calculation("add", 0, 0, 25.0, 0))
+    assert [c.result for _, c in h.query(operation="add", result=(20, 30))] == [21.0, 24.0, 27.0, 30.0, 25.0]
+
+
+def test_find_command(make_config):
+    calc = Calculator(config=make_config())
+    registry = build_registry(calc)
+    for x in (1, 2, 3, 4):
+        calc.compute("divide", x * 1e6, 0.5)
+    calc.compute("add", 1, 2)
+    run = lambda line: registry.execute("find", line.split())
+    assert list(run("find divide result>4e6")) == [
+        f"{i}. {calc.history[i - 1].operation}({calc.history[i - 1].a}, 0.5) = {calc.history[i - 1].result} "
+        f"@ {calc.history[i - 1].timestamp}" for i in (3, 4)]
+    assert [line.split(".")[0] for line in run("find result>=1 sort=-result limit=2")] == ["4", "3"]
+    assert [line.split(".")[0] for line in run("find op=add since=1h")] == ["5"]
+    assert [line.split(".")[0] for line in run("find a<=1e6 a>=1e6")] == ["1"]
+    assert "no matches" in run("find b<0.5 until=2000-01-01T00:00:00+00:00")
+    assert "no matches" in run("find until=2000-01-01")
+    assert "Usage" in run("find limit=x")
+    assert "Usage" in run("find x=1")
+    assert "Usage" in run("find sort>index")
+    assert "Not a valid number" in run("find result>abc")
+    assert "Not a time or age" in run("find since=yesterday")
+    assert "sort must be one of" in run("find sort=size")
+    calc.undo()
+    assert "no matches" in run("find add")
+    calc.close()
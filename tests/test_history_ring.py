@@ -0,0 +1,64 @@
+import pytest
+from app.calculation import Calculation
+from app.exceptions import HistoryError
+from app.history import History
+
+
+def _c(n):
+    return Calculation.create("add", n, 0, n)
+
+
+def _results(h):
+    return [c.result for c in h.items]
+
+
+def test_push_past_capacity_evicts_oldest():
+    h = History(max_size=3)
+    for n in range(5):
+        h.push(_c(n))
+    assert _results(h) == [2, 3, 4]
+    assert h[0].result == 2 and h[-1].result == 4
+    assert len(h) == 3 and h._cursor == 2
+
+
+def test_push_after_undo_drops_future_across_wraparound():
+    h = History(max_size=3)
+    for n in range(4):
+        h.push(_c(n))
+    h.undo()
+    h.undo()
+    h.push(_c(9))
+    assert _results(h) == [1, 9]
+    assert not h.can_redo()
+    with pytest.raises(HistoryError):
+        h.redo()
+
+
+def test_save_restore_keep_cursor_and_capacity():
+    h = History(max_size=4)
+    for n in range(6):
+        h.push(_c(n))
+    h.undo()
+    m = h.save()
+    h.clear()
+    assert len(h) == 0 and not h.can_undo()
+    h.restore(m)
+    assert _results(h) == [2, 3, 4, 5] and h._cursor == 2
+    assert h.max_size == 4
+
+
+def test_extend_larger_than_capacity_keeps_newest():
+    h = History(max_size=3)
+    h.push(_c(100))
+    h.extend([_c(n) for n in range(10)])
+    assert _results(h) == [7, 8, 9] and h._cursor == 2
+    h.extend([_c(42)])
+    assert _results(h) == [8, 9, 42]
+
+
+def test_zero_capacity_keeps_nothing():
+    h = History(max_size=0)
+    h.push(_c(1))
+    assert len(h) == 0 and not h.can_undo()
+    with pytest.raises(IndexError):
+        h[0]
@@ -0,0 +1,129 @@
+import functools
+import json
+import os
+import pytest
+from app import Calculator, build_registry
+from app.calculation import ENTRY_BYTES, Calculation
+from app.history import History
+from app.history_spill import HistorySpill
+
+
+@pytest.fixture
+def make_config(make_config):
+    """Spilling, with a hot tier of 10 and 4-row segments."""
+    return functools.partial(make_config, history_backend="file", history_spill=True,
+                             max_history_size=10, history_segment_rows=4)
+
+
+def _fill(c, n):
+    for x in range(n):
+        c.compute("add", x, 0)
+
+
+def test_evicted_entries_spill_into_segments(tmp_path, make_config):
+    cfg = make_config()
+    c = Calculator(config=cfg)
+    _fill(c, 25)
+    c.spill.flush()
+    assert len(c.history) == 10 and c.history.spilled == 15
+    assert [s.rows for s in c.spill.segments] == [4, 4, 4, 3]
+    manifest = json.load(open(os.path.join(cfg.spill_dir, "manifest.json")))
+    assert [s["first"] for s in manifest["segments"]] == [0, 4, 8, 12]
+    assert [x.a for x in c.spill] == list(range(15))
+    assert c.spill[13].a == 13
+
+    registry = build_registry(c)
+    out = "\n".join(registry.execute("history", ["history"]))
+    assert "1. add(0.0, 0.0)" in out and "25. add(24.0, 0.0)" in out
+    assert c.history.query(operation="add", sort="-result", limit=3)[0] == (24, c.history[-1])
+    assert [i for i, _ in c.history.query(result=(3, 16))] == list(range(3, 17))
+    assert [x.a for _, x in c.history.query(sort="-index", limit=12)][-2:] == [14, 13]
+    assert [i for i, _ in c.history.query(operation="multiply")] == []
+
+    path = str(tmp_path / "all.csv")
+    c.export_history(path)
+    h = History(max_size=100)
+    h.load_csv(path)
+    assert [x.a for x in h] == list(range(25))
+    c.close()
+
+
+def test_segments_survive_restart_and_clear_removes_them(make_config):
+    cfg = make_config()
+    c = Calculator(config=cfg)
+    _fill(c, 10)
+    c.history.push(Calculation("divide", 1, 0, float("nan"), "not a time"))
+    _fill(c, 10)
+    c.save_history()
+    c.close()                         # writes the short last segment
+
+    c2 = Calculator(config=cfg)
+    c2.load_history()
+    assert c2.history.spilled == 11
+    odd = c2.spill[10]
+    assert odd.operation == "divide" and odd.timestamp == "not a time"
+    assert [i for i, _ in c2.history.query(operation="divide")] == [10]
+    assert c2.history.query(since=0)[0][0] == 0
+    _fill(c2, 3)                      # spills onto the existing segments
+    c2.spill.flush()
+    assert c2.history.spilled == 14 and [x.a for x in c2.spill][-3:] == [0, 1, 2]
+    c2.clear_history()
+    assert c2.history.spilled == 0 and not os.listdir(cfg.spill_dir)
+    c2.close()
+
+
+def test_bulk_pushes_spill_and_byte_cap(tmp_path, make_config):
+    cfg = make_config(history_max_bytes=5 * ENTRY_BYTES)
+    assert cfg.history_capacity == 5
+    assert make_config(history_max_bytes=5 * ENTRY_BYTES, history_spill=False).history_capacity == 10
+    c = Calculator(config=cfg)
+    c.compute_many("multiply", list(range(12)), [2] * 12)
+    assert len(c.history) == 5 and c.history.spilled == 7
+    assert [x.a for x in c.spill] == list(range(7))
+    c.close()
+
+    spill = HistorySpill(str(tmp_path / "other"), segment_rows=3)
+    h = History(max_size=3)
+    h.attach_spill(spill)
+    h.extend([Calculation("add", n, 0, n, 0) for n in range(2)])
+    h.extend([Calculation("add", n, 0, n, 0) for n in range(2, 7)])
+    with spill.paused():
+        h.push(Calculation("add", 99, 0, 99, 0))
+    assert [i for i, _ in h.query(result=(3, 5))] == [3, 4]    # 4 was dropped while paused
+    spill.close()
+    assert [x.a for x in spill] == [0, 1, 2, 3]
+
+
+def test_oversized_batch_spills_its_head_with_stats_active(make_config):
+    c = Calculator(config=make_config())
+    registry = build_registry(c)
+    c.compute("add", 1, 1)
+    assert "(all)" in registry.execute("summary", ["summary"])    # stats are live now
+    c.compute_many("multiply", list(range(30)), [2] * 30)   # 3x the capacity, new operation
+    c.spill.flush()
+    assert len(c.history) == 10 and c.history.spilled == 21
+    assert [x.operation for x in c.spill][:2] == ["add", "multiply"]
+    summary = c.history.stats()
+    assert summary.overall.count == 10 and summary.overall.max == 58.0
+    c.close()
+
+
+def test_calculators_sharing_a_history_dir_get_their_own_segments(make_config):
+    cfg = make_config()
+    a, b = Calculator(config=cfg), Calculator(config=cfg)
+    assert a.spill.directory == cfg.spill_dir and b.spill.directory == cfg.spill_dir + "-1"
+    _fill(a, 15)
+    for x in range(100, 115):
+        b.compute("add", x, 0)
+    a.spill.flush()
+    b.spill.flush()
+    assert [x.a for x in a.spill] == list(range(5))
+    assert [x.a for x in b.spill] == list(range(100, 105))
+    b.clear_history()
+    assert [x.a for x in a.spill] == list(range(5))     # b's clear leaves a's rows alone
+    a.close()
+    b.close()
+
+    c = Calculator(config=cfg)                            # a's directory is free again
+    assert c.spill.directory == cfg.spill_dir and c.history.spilled == 5
+    c.close()
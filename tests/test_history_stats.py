@@ -0,0 +1,102 @@
+import math
+import random
+import statistics
+import numpy as np
+from app import Calculator, build_registry
+from app.calculation import Calculation
+from app.history import History
+from app.history_stats import HistoryStats, QuantileSketch
+
+
+OPS = ["add", "divide", "power"]
+
+
+def _check(h):
+    summary = h.stats()
+    applied = [h[i] for i in range(h._cursor + 1)]
+    groups = {None: applied}
+    for op in OPS:
+        groups[op] = [c for c in applied if c.operation == op]
+    for op, calcs in groups.items():
+        values = [c.result for c in calcs if math.isfinite(c.result)]
+        st = summary.overall if op is None else summary.by_operation.get(op)
+        if not values:
+            assert op is not None and st is None
+            continue
+        assert st.count == len(values)
+        assert math.isclose(st.sum, math.fsum(values), rel_tol=1e-12, abs_tol=1e-9)
+        assert math.isclose(st.mean, statistics.fmean(values), rel_tol=1e-9, abs_tol=1e-9)
+        assert (st.min, st.max) == (min(values), max(values))
+        if len(values) > 1:
+            assert math.isclose(st.variance, statistics.variance(values), rel_tol=1e-6, abs_tol=1e-9)
+
+
+def test_stats_track_push_undo_redo_and_eviction(monkeypatch):
+    monkeypatch.setattr(HistoryStats, "apply_at", 16)   # exercise applies between reads
+    monkeypatch.setattr(HistoryStats, "prune_at", 8)
+    rng = random.Random(5)
+    h = History(max_size=80)
+    for _ in range(30):
+        h.push(Calculation(rng.choice(OPS), 1, 1, rng.gauss(100, 40), 0))
+    _check(h)                      # builds the stats
+    for step in range(1500):
+        roll = rng.random()
+        if roll < 0.12 and h.can_undo():
+            h.undo()
+        elif roll < 0.2 and h.can_redo():
+            h.redo()
+        else:
+            x = rng.gauss(100, 40) * (-5 if rng.random() < 0.05 else 1)
+            h.push(Calculation(rng.choice(OPS), 1, 1, x, 0))
+        if step % 37 == 0:
+            _check(h)
+    _check(h)
+
+
+def test_quantiles_within_relative_accuracy():
+    rng = np.random.default_rng(1)
+    values = np.concatenate([rng.lognormal(3, 2, 20_000), -rng.lognormal(1, 1, 5_000), np.zeros(500)])
+    sketch = QuantileSketch(0.01)
+    sketch.update(np, values)
+    sketch.update(np, values[:5_000], -1)   # deletes
+    kept = np.sort(values[5_000:])
+    for q in (0.01, 0.1, 0.25, 0.5, 0.9, 0.99):
+        true = kept[int(q * (len(kept) - 1))]
+        assert abs(sketch.quantile(q) - true) <= 0.01 * abs(true) + 1e-12, q
+    assert QuantileSketch().quantile(0.5) is None
+
+
+def test_non_finite_results_are_skipped_and_reset_rebuilds(tmp_path):
+    h = History(max_size=10)
+    assert h.stats().overall.count == 0
+    h.push(Calculation("add", 1, 1, 2.0, 0))
+    h.push(Calculation("power", 1e308, 2, math.inf, 0))
+    h.push(Calculation("divide", 0, 0, math.nan, 0))
+    summary = h.stats()
+    assert summary.overall.count == 1 and list(summary.by_operation) == ["add"]
+    assert summary.overall.p50 == summary.overall.max == 2.0
+    path = str(tmp_path / "h.csv")
+    h.save_csv(path)
+    h.clear()
+    assert h.stats().overall.count == 0
+    h.load_csv(path)
+    assert h.stats().overall.sum == 2.0
+
+
+def test_summary_command(make_config):
+    calc = Calculator(config=make_config())
+    registry = build_registry(calc)
+    run = lambda line: registry.execute("summary", line.split())
+    assert "no results" in run("summary")
+    for x in (1, 2, 3):
+        calc.compute("add", x, x)
+    calc.compute("divide", 1, 4)
+    lines = run("summary").splitlines()
+    assert lines[0].split()[:4] == ["operation", "count", "sum", "mean"]
+    assert lines[1].split()[:4] == ["add", "3", "12", "4"]
+    assert lines[2].split()[:3] == ["divide", "1", "0.25"]
+    assert "(all)" in lines[3] and "12.25" in lines[3]
+    calc.undo()
+    assert "divide" not in run("summary")
+    assert "Usage" in run("summary all")
+    calc.close()
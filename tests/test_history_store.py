@@ -0,0 +1,158 @@
+import functools
+import math
+import os
+import sqlite3
+import subprocess
+import sys
+import pytest
+from app import Calculator, build_registry
+from app.calculation import Calculation
+from app.calculator_config import AppConfig
+from app.exceptions import PersistenceError
+from app.history import History
+from app.history_store import FileStore, SQLiteStore, open_store
+
+
+@pytest.fixture
+def make_config(make_config):
+    """SQLite backend with auto-save on."""
+    return functools.partial(make_config, history_backend="sqlite", auto_save=True)
+
+
+def _applied(calc):
+    return [c.result for c in calc.history.items[: calc.history._cursor + 1]]
+
+
+def test_sqlite_store_persists_pushes_undo_redo(make_config):
+    cfg = make_config()
+    c = Calculator(config=cfg)
+    assert isinstance(c.store, SQLiteStore)
+    for x in (1, 2, 3, 4):
+        c.compute("add", x, x)
+    c.undo()
+    c.undo()
+    c.redo()
+    c.compute("multiply", 5, 5)       # drops the undone 8.0
+    c.close()
+    conn = sqlite3.connect(cfg.history_db_path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"calculations_operation", "calculations_ts"} <= indexes
+    conn.close()
+
+    c2 = Calculator(config=cfg)
+    c2.load_history()
+    assert _applied(c2) == [2.0, 4.0, 6.0, 25.0]
+    assert c2.history[0].timestamp == c.history[0].timestamp
+    c2.undo()                          # undo of a loaded row is persisted too
+    c2.close()
+    c3 = Calculator(config=cfg)
+    c3.load_history()
+    assert _applied(c3) == [2.0, 4.0, 6.0]
+    c3.close()
+
+
+def test_sessions_append_without_overwriting_each_other(make_config):
+    cfg = make_config()
+    a, b = Calculator(config=cfg), Calculator(config=cfg)
+    for x in range(5):
+        a.compute("add", x, 0)
+        b.compute("add", x, 100)
+    a.flush_history()
+    b.flush_history()
+    assert a.store._db is b.store._db    # one connection per process
+    b.clear_history()                     # hides b's rows only
+    b.compute("add", 1000, 0)
+    a.close()
+    b.close()
+    c = Calculator(config=cfg)
+    c.load_history()
+    assert _applied(c) == [0.0, 1.0, 2.0, 3.0, 4.0, 1000.0]
+    c.close()
+
+
+_WRITER = """
+import sys
+from app import Calculator
+from app.calculator_config import AppConfig
+cfg = AppConfig.load()
+cfg.history_dir, cfg.log_dir = sys.argv[1], sys.argv[2]
+cfg.history_backend = "sqlite"
+cfg.autosave_batch_size = 50
+c = Calculator(config=cfg)
+for i in range(int(sys.argv[3])):
+    c.compute("add", i, int(sys.argv[4]))
+c.close()
+"""
+
+
+def test_concurrent_processes_lose_nothing(make_config):
+    cfg = make_config(max_history_size=10_000)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    procs = [subprocess.Popen([sys.executable, "-c", _WRITER, cfg.history_dir, cfg.log_dir, "1000", str(k)],
+                              cwd=root) for k in range(3)]
+    assert [p.wait(timeout=120) for p in procs] == [0, 0, 0]
+    c = Calculator(config=cfg)
+    c.load_history()
+    assert len(c.history) == 3000
+    for k in range(3):
+        assert sorted(x.a for x in c.history if x.b == k) == list(range(1000))
+    c.close()
+
+
+def test_save_rollback_and_non_finite_results(make_config):
+    cfg = make_config(auto_save=False)
+    c = Calculator(config=cfg)
+    with pytest.raises(PersistenceError):
+        c.load_history()
+    c.compute("add", 1, 1)
+    c.checkpoint("one")
+    c.compute("add", 2, 2)
+    c.history.push(Calculation("divide", 0, 0, math.nan, "not a time"))
+    c.save_history()
+    c.rollback("one")
+    c.save_history()                   # replaces what this session wrote
+    c.close()
+    c2 = Calculator(config=cfg)
+    c2.load_history()
+    assert _applied(c2) == [2.0]
+    store = SQLiteStore(cfg.history_db_path)
+    h = History()
+    h.push(Calculation("divide", 0, 0, math.nan, "not a time"))
+    store.save(h)
+    store.load(h)
+    assert math.isnan(h[-1].result) and h[-1].timestamp == "not a time"
+    store.close()
+    c2.close()
+
+
+def test_import_export_and_backend_selection(tmp_path, make_config, monkeypatch):
+    src = History()
+    src.extend([Calculation("add", n, n, 2.0 * n, n * 1_000_000) for n in range(3)])
+    path = str(tmp_path / "old.csv")
+    src.save_csv(path)
+    cfg = make_config()
+    c = Calculator(config=cfg)
+    registry = build_registry(c)
+    assert "imported" in registry.execute("import", ["import", path])
+    assert "Usage" in registry.execute("import", ["import"])
+    assert "does not exist" in registry.execute("import", ["import", str(tmp_path / "nope.csv")])
+    c.compute("add", 5, 5)
+    c.close()
+    c2 = Calculator(config=cfg)
+    c2.load_history()
+    assert _applied(c2) == [0.0, 2.0, 4.0, 10.0]
+    out = str(tmp_path / "out.csv")
+    c2.export_history(out)
+    h = History()
+    h.load_csv(out)
+    assert [x.result for x in h] == [0.0, 2.0, 4.0, 10.0]
+    c2.close()
+
+    assert isinstance(open_store(make_config(history_backend="file")), FileStore)
+    with pytest.raises(PersistenceError):
+        open_store(make_config(history_backend="mongo"))
+    monkeypatch.setenv("CALCULATOR_HISTORY_BACKEND", "SQLite")
+    monkeypatch.setenv("CALCULATOR_HISTORY_DB", "shared.db")
+    cfg = AppConfig.load()
+    assert cfg.history_backend == "sqlite" and cfg.history_db_path.endswith("shared.db")
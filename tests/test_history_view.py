@@ -0,0 +1,95 @@
+import io
+from app import build_registry, run_pipe, BaseHelp
+from app.calculator import Calculator
+from app.command import HistoryCommand, ErrorOutput
+from app.history_view import HistoryView
+
+
+def _calc(make_config, n=10, **overrides):
+    c = Calculator(config=make_config(**overrides))
+    for i in range(n):
+        c.compute("add", i, 0)
+    return c
+
+
+def _numbers(lines):
+    return [int(line.split(".")[0]) for line in lines if not line.startswith("\x1b") and line[0].isdigit()]
+
+
+def test_windows_format_only_requested_lines(make_config):
+    c = _calc(make_config)
+    view = HistoryView(lambda: c.history)
+    cmd = HistoryCommand(view)
+    assert _numbers(cmd.execute(["history", "--last", "3"])) == [8, 9, 10]
+    assert view.misses == 3
+    assert _numbers(cmd.execute(["history", "--offset", "7"])) == [8, 9, 10]
+    assert view.hits == 3 and view.misses == 3
+    assert _numbers(cmd.execute(["history", "--last", "3", "--offset", "3"])) == [5, 6, 7]
+    lines = list(cmd.execute(["history"]))
+    assert len(lines) == 10 and lines[0].startswith("1. add(0.0, 0.0) = 0.0 @ ")
+    assert view() == lines
+
+
+def test_paging_continues_and_wraps(make_config):
+    c = _calc(make_config, n=5)
+    cmd = HistoryCommand(HistoryView(lambda: c.history), page_size=2)
+    first = list(cmd.execute(["history", "--page"]))
+    assert _numbers(first) == [1, 2] and "1-2 of 5" in first[-1] and "more" in first[-1]
+    assert _numbers(cmd.execute(["history", "--page"])) == [3, 4]
+    last = list(cmd.execute(["history", "--page"]))
+    assert _numbers(last) == [5] and "(end)" in last[-1]
+    assert _numbers(cmd.execute(["history", "--page"])) == [1, 2]
+
+
+def test_undo_redo_reuse_cache_and_push_invalidates_by_position(make_config):
+    c = _calc(make_config, n=5)
+    view = HistoryView(lambda: c.history)
+    assert len(view()) == 5 and view.misses == 5
+    c.undo()
+    c.undo()
+    assert len(view()) == 3 and view.misses == 5
+    c.redo()
+    assert len(view()) == 4 and view.misses == 5
+    c.compute("multiply", 7, 7)          # discards entry 5 only
+    lines = view()
+    assert lines[-1].startswith("5. multiply(7.0, 7.0) = 49.0")
+    assert view.misses == 6
+
+
+def test_eviction_keeps_cached_lines_and_renumbers(make_config):
+    c = _calc(make_config, n=3, max_history_size=3)
+    view = HistoryView(lambda: c.history)
+    view()
+    c.compute("add", 100, 0)
+    lines = view()
+    assert lines[0].startswith("1. add(1.0, 0.0)") and lines[-1].startswith("3. add(100.0, 0.0)")
+    assert view.misses == 4
+
+
+def test_clear_and_load_reset_cache(make_config):
+    c = _calc(make_config, n=3)
+    view = HistoryView(lambda: c.history, max_cached=2)
+    view()
+    c.save_history()
+    c.clear_history()
+    assert view() == []
+    c.load_history()
+    assert len(view()) == 3 and view.misses == 6
+
+
+def test_bad_flags_and_empty(make_config):
+    c = _calc(make_config, n=0)
+    cmd = HistoryCommand(HistoryView(lambda: c.history))
+    assert "(empty)" in cmd.execute(["history"])
+    for args in (["--last"], ["--last", "x"], ["--offset", "-1"], ["--bogus"]):
+        assert isinstance(cmd.execute(["history"] + args), ErrorOutput)
+
+
+def test_pipe_streams_history_lines(make_config):
+    registry = build_registry(_calc(make_config, n=6, history_page_size=4))
+    out, err = io.StringIO(), io.StringIO()
+    rc = run_pipe(registry, BaseHelp(), io.StringIO("history --last 5\nhistory --page\n"), out, err, block_lines=2)
+    lines = out.getvalue().splitlines()
+    assert rc == 0
+    assert _numbers(lines[:5]) == [2, 3, 4, 5, 6]
+    assert _numbers(lines[5:9]) == [1, 2, 3, 4] and "1-4 of 6" in lines[9]
@@ -0,0 +1,114 @@
+import functools
+import os
+import pytest
+from app.calculator import Calculator
+
+
+@pytest.fixture
+def make_config(make_config):
+    """Auto-save on."""
+    return functools.partial(make_config, auto_save=True)
+
+
+def test_autosave_appends_to_journal_instead_of_rewriting_csv(make_config):
+    cfg = make_config()
+    c = Calculator(config=cfg)
+    c.compute("add", 1, 2)
+    c.compute("multiply", 3, 4)
+    c.flush_history()
+    assert not os.path.exists(cfg.history_path)
+    with open(cfg.journal_path, encoding="utf-8") as fh:
+        lines = fh.read().splitlines()
+    # leading 'clear' marks the start of this session's history
+    assert len(lines) == 3 and '"e":"clear"' in lines[0]
+
+
+def test_load_replays_journal_events(make_config):
+    cfg = make_config()
+    c = Calculator(config=cfg)
+    c.compute("add", 1, 2)
+    c.compute("add", 2, 2)
+    c.compute("add", 3, 3)
+    c.undo()
+    c.flush_history()
+
+    c2 = Calculator(config=cfg)
+    c2.load_history()
+    applied = c2.history.items[: c2.history._cursor + 1]
+    assert [x.result for x in applied] == [3.0, 4.0]
+    assert c2.history.can_redo()
+
+    c.clear_history()
+    c.flush_history()
+    c3 = Calculator(config=cfg)
+    c3.load_history()
+    assert not c3.history.can_undo()
+
+
+def test_new_session_does_not_inherit_previous_journal(make_config):
+    cfg = make_config()
+    for a in (1, 5):
+        c = Calculator(config=cfg)
+        c.compute("add", a, a)
+        c.close()
+
+    c = Calculator(config=cfg)
+    c.load_history()
+    assert [x.result for x in c.history.items] == [10.0]
+
+
+def test_journal_compacts_into_snapshot_in_background(make_config):
+    cfg = make_config(journal_compact_threshold=5)
+    c = Calculator(config=cfg)
+    for i in range(12):
+        c.compute("add", i, 1)
+    c.flush_history()
+    c.store.journal.wait()
+    assert os.path.exists(cfg.history_path)
+    with open(cfg.journal_path, encoding="utf-8") as fh:
+        assert len(fh.readlines()) < 13
+
+    c2 = Calculator(config=cfg)
+    c2.load_history()
+    assert [x.result for x in c2.history.items] == [float(i + 1) for i in range(12)]
+
+
+def test_torn_journal_tail_is_ignored(make_config):
+    cfg = make_config()
+    c = Calculator(config=cfg)
+    c.compute("add", 1, 1)
+    c.close()
+    with open(cfg.journal_path, "a", encoding="utf-8") as fh:
+        fh.write('{"e":"push","operation":"ad')
+
+    c2 = Calculator(config=cfg)
+    c2.load_history()
+    assert [x.result for x in c2.history.items] == [2.0]
+
+
+def test_explicit_save_resets_journal(make_config):
+    cfg = make_config()
+    c = Calculator(config=cfg)
+    c.compute("add", 1, 1)
+    c.save_history()
+    assert not os.path.exists(cfg.journal_path)
+    c.compute("add", 2, 2)
+    c.close()
+
+    c2 = Calculator(config=cfg)
+    c2.load_history()
+    assert [x.result for x in c2.history.items] == [2.0, 4.0]
+
+
+def test_interrupted_compaction_is_replayed(make_config):
+    cfg = make_config()
+    c = Calculator(config=cfg)
+    c.compute("add", 1, 1)
+    c.compute("add", 2, 2)
+    c.close()
+    # simulate a crash after rotation but before the snapshot was written
+    os.replace(cfg.journal_path, c.store.journal.rotated_path)
+
+    c2 = Calculator(config=cfg)
+    c2.load_history()
+    assert [x.result for x in c2.history.items] == [2.0, 4.0]
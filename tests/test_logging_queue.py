@@ -0,0 +1,92 @@
+import functools
+import logging
+import pytest
+from app.calculation import Calculation
+from app import logger as app_logger
+from app.log_queue import (
+    BatchedRotatingFileHandler, BatchedStreamHandler, BatchedTimedRotatingFileHandler,
+    BatchedFileHandler, CalcRecord,
+)
+from app.logger import init_logging, stop_logging, LoggingObserver
+
+
+@pytest.fixture
+def make_config(make_config):
+    """No console echo."""
+    return functools.partial(make_config, log_console=False)
+
+
+@pytest.fixture(autouse=True)
+def _restore_root():
+    root = logging.getLogger()
+    level, handlers = root.level, list(root.handlers)
+    yield
+    stop_logging()
+    root.setLevel(level)
+    root.handlers[:] = handlers
+
+
+def _log_text(tmp_path):
+    return (tmp_path / "logs" / "calculator.log").read_text()
+
+
+def test_records_are_formatted_by_the_listener(tmp_path, make_config):
+    cfg = make_config()
+    listener = init_logging(cfg)
+    assert [type(h) for h in listener.handlers] == [BatchedRotatingFileHandler]
+    LoggingObserver(cfg).on_new_calculation(Calculation("add", 2, 3, 5.0, 0))
+    logging.info("value %d", 42)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logging.exception("failed")
+    stop_logging()
+    text = _log_text(tmp_path)
+    assert "[INFO] Logger initialized." in text
+    assert "1970-01-01 00:00:00,000 [INFO] CALC add(2, 3) = 5.0 @ 1970-01-01T00:00:00" in text
+    assert "value 42" in text and "ValueError: boom" in text
+    logging.info("after stop")  # no listener: the queue handler is gone
+    assert "after stop" not in _log_text(tmp_path)
+
+
+def test_disabled_level_enqueues_nothing(tmp_path, make_config):
+    cfg = make_config()
+    init_logging(cfg)
+    logging.getLogger().setLevel(logging.WARNING)
+    for i in range(100):
+        LoggingObserver(cfg).on_new_calculation(Calculation("add", i, 0, i, 0))
+    stop_logging()
+    assert "CALC" not in _log_text(tmp_path)
+
+
+def test_observer_without_pipeline_logs_directly(make_config, caplog):
+    with caplog.at_level(logging.INFO):
+        LoggingObserver(make_config()).on_new_calculation(Calculation("add", 1, 2, 3.0, 0))
+    assert "CALC add(1, 2) = 3.0 @ 1970-01-01T00:00:00" in caplog.text
+
+
+def test_size_rotation_keeps_backups(tmp_path, make_config):
+    cfg = make_config(log_max_bytes=2000, log_backup_count=2)
+    init_logging(cfg)
+    for i in range(200):
+        logging.info("line %04d %s", i, "x" * 40)
+    stop_logging()
+    names = sorted(p.name for p in (tmp_path / "logs").iterdir())
+    assert names == ["calculator.log", "calculator.log.1", "calculator.log.2"]
+    assert all(p.stat().st_size <= 2000 for p in (tmp_path / "logs").iterdir())
+    assert "line 0199" in _log_text(tmp_path)
+
+
+def test_handler_choice_and_console_switch(make_config):
+    listener = init_logging(make_config(log_rotate_when="midnight", log_console=True))
+    assert [type(h) for h in listener.handlers] == [BatchedTimedRotatingFileHandler, BatchedStreamHandler]
+    listener = init_logging(make_config(log_max_bytes=0))
+    assert app_logger._listener is listener
+    assert [type(h) for h in listener.handlers] == [BatchedFileHandler]
+
+
+def test_calc_record_uses_calculation_time():
+    record = CalcRecord(Calculation("add", 1, 2, 3.0, 1_500_000))
+    assert record.created == 1.5 and record.msecs == 500
+    assert record.getMessage() == "CALC add(1, 2) = 3.0 @ 1970-01-01T00:00:01.500000"
+    assert CalcRecord(Calculation("add", 1, 2, 3.0, "yesterday")).msecs == 0
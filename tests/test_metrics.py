@@ -0,0 +1,98 @@
+import io
+import pytest
+from app import build_registry, run_pipe, BaseHelp
+from app.calculator import Calculator
+from app.command import StatsCommand, ErrorOutput
+from app.metrics import METRICS, LatencyHistogram, MetricsRegistry, MetricsExporter, NULL_TIMER
+
+
+@pytest.fixture
+def metrics():
+    METRICS.reset()
+    METRICS.enabled = True
+    yield METRICS
+    METRICS.enabled = False
+    METRICS.reset()
+
+
+def test_histogram_quantiles_within_bucket_error():
+    h = LatencyHistogram()
+    for i in range(1, 1001):
+        h.observe(i * 1e-6)           # 1us .. 1ms, uniform
+    assert h.count == 1000
+    assert h.quantile(0.5) == pytest.approx(500e-6, rel=0.15)
+    assert h.quantile(0.99) == pytest.approx(990e-6, rel=0.15)
+    assert h.quantile(1.0) <= h.max
+    assert LatencyHistogram().quantile(0.5) == 0.0
+    h.observe(0.0)                    # clamps into the first bucket
+    h.observe(1e9)                    # and into the last one
+    assert h.counts[0] == 1 and h.counts[-1] == 1
+
+
+def test_disabled_registry_records_nothing():
+    reg = MetricsRegistry(enabled=False)
+    assert reg.phases() is NULL_TIMER
+    NULL_TIMER.lap("validate")
+    assert reg.snapshot() == {"commands": [], "phases": []}
+
+
+def test_pipe_records_counts_errors_and_phases(make_config, metrics):
+    registry = build_registry(Calculator(config=make_config()))
+    out, err = io.StringIO(), io.StringIO()
+    run_pipe(registry, BaseHelp(), io.StringIO("add 1 2\nadd 3 4\ndivide 1 0\nnope\n"), out, err)
+
+    snap = {name: (count, errors) for name, count, errors, _ in metrics.snapshot()["commands"]}
+    assert snap == {"add": (2, 0), "divide": (1, 1)}
+    phases = {name: count for name, count, _, _ in metrics.snapshot()["phases"]}
+    # divide 1 0 fails during compute, so only two runs reach the later phases
+    assert phases == {"validate": 3, "compute": 2, "persist": 2, "notify": 2}
+
+
+def test_exceptions_count_as_errors(metrics):
+    from app.command import CommandRegistry, Command
+
+    class Boom(Command):
+        def execute(self, line_parts):
+            raise RuntimeError("boom")
+    reg = CommandRegistry()
+    reg.register("boom", Boom())
+    with pytest.raises(RuntimeError):
+        reg.execute("boom", ["boom"])
+    assert metrics.snapshot()["commands"][0][:3] == ("boom", 1, 1)
+
+
+def test_stats_command(make_config, metrics):
+    registry = build_registry(Calculator(config=make_config()))
+    registry.execute("add", ["add", "1", "2"])
+    text = registry.execute("stats", ["stats"])
+    assert "p99 ms" in text and "add" in text and "validate" in text
+    assert isinstance(StatsCommand().execute(["stats", "bogus"]), ErrorOutput)
+    assert "reset" in StatsCommand().execute(["stats", "reset"])
+    assert metrics.snapshot()["commands"] == []
+    metrics.enabled = False
+    assert "disabled" in StatsCommand().execute(["stats"])
+
+
+def test_prometheus_exposition_file(tmp_path, metrics):
+    metrics.observe_command("add", 0.002)
+    metrics.observe_command("add", 0.004, error=True)
+    metrics.observe_phase("compute", 0.001)
+    path = tmp_path / "logs" / "calculator.prom"
+    exporter = MetricsExporter(str(path), interval=0.01).start()
+    exporter.stop()
+    text = path.read_text()
+    assert 'calculator_commands_total{command="add"} 2' in text
+    assert 'calculator_command_errors_total{command="add"} 1' in text
+    assert 'calculator_command_latency_seconds{command="add",quantile="0.99"}' in text
+    assert 'calculator_command_latency_seconds_count{command="add"} 2' in text
+    assert 'calculator_compute_phase_seconds_sum{phase="compute"}' in text
+    assert "# TYPE calculator_command_latency_seconds summary" in text
+    assert not list(path.parent.glob("*.tmp"))
+
+
+def test_config_paths(make_config):
+    cfg = make_config(metrics_enabled=True)
+    reg = MetricsRegistry()
+    reg.configure(cfg)
+    assert reg.enabled
+    assert cfg.metrics_path.endswith("calculator.prom") and cfg.metrics_path.startswith(cfg.log_dir)
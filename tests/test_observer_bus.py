@@ -0,0 +1,170 @@
+import threading
+import time
+import pytest
+from app import Calculator, build_registry
+from app.calculation import Calculation
+from app.observer_bus import ObserverBus, ObserverWorker
+
+
+class Recorder:
+    def __init__(self):
+        self.seen = []
+    def on_new_calculation(self, calc):
+        self.seen.append(calc.result)
+
+
+class Gated(Recorder):
+    """Blocks delivery until the gate opens, so the queue can be filled deterministically."""
+    def __init__(self, overflow=None):
+        super().__init__()
+        self.gate = threading.Event()
+        self.entered = threading.Event()
+        if overflow:
+            self.overflow = overflow
+    def on_new_calculation(self, calc):
+        self.entered.set()
+        self.gate.wait(5)
+        super().on_new_calculation(calc)
+
+
+class BatchRecorder:
+    def __init__(self):
+        self.batches = []
+    def on_new_calculations(self, calcs):
+        self.batches.append([c.result for c in calcs])
+
+
+def _calc(n):
+    return Calculation("add", n, 0, float(n), 0)
+
+
+def _fill(worker, observer, count):
+    worker.put(_calc(0))
+    assert observer.entered.wait(5)      # the worker holds item 0; the queue is empty
+    for n in range(1, count + 1):
+        worker.put(_calc(n))
+
+
+def test_observers_run_off_the_compute_thread(make_config):
+    calc = Calculator(config=make_config())
+    threads = []
+    class Where:
+        def on_new_calculation(self, c):
+            threads.append(threading.current_thread())
+    calc.register_observer(Where())
+    calc.register_observer(object())          # no hook: ignored
+    assert len(calc.observers) == 1
+    calc.compute("add", 1, 2)
+    calc.close()
+    assert threads and threads[0] is not threading.current_thread()
+
+
+def test_slow_observer_does_not_slow_compute(make_config):
+    calc = Calculator(config=make_config())
+    slow = Gated()
+    calc.register_observer(slow)
+    started = time.perf_counter()
+    for i in range(200):
+        calc.compute("add", i, 1)
+    assert time.perf_counter() - started < 1.0   # the observer is parked on its gate
+    slow.gate.set()
+    calc.close()
+    assert slow.seen == [float(i + 1) for i in range(200)]
+
+
+def test_drop_oldest_keeps_the_newest(tmp_path):
+    obs = Gated()
+    worker = ObserverWorker(obs, queue_size=3, overflow="drop-oldest")
+    _fill(worker, obs, 5)
+    obs.gate.set()
+    worker.close()
+    assert obs.seen == [0.0, 3.0, 4.0, 5.0]
+    st = worker.stats()
+    assert (st.delivered, st.dropped, st.coalesced, st.max_queued) == (4, 2, 0, 3)
+
+
+def test_coalesce_keeps_only_the_latest(tmp_path):
+    obs = Gated()
+    worker = ObserverWorker(obs, queue_size=2, overflow="coalesce")
+    _fill(worker, obs, 5)
+    obs.gate.set()
+    worker.close()
+    assert obs.seen == [0.0, 5.0]
+    assert worker.stats().coalesced == 4
+
+
+def test_block_waits_for_room_and_loses_nothing(tmp_path):
+    obs = Gated(overflow="block")
+    bus = ObserverBus(queue_size=2)
+    worker = bus.register(obs)
+    assert worker.overflow == "block"      # taken from the observer's attribute
+    done = threading.Event()
+    def publish():
+        _fill(worker, obs, 6)
+        done.set()
+    t = threading.Thread(target=publish)
+    t.start()
+    assert not done.wait(0.2)              # stuck behind the full queue
+    obs.gate.set()
+    assert done.wait(5)
+    t.join()
+    assert bus.flush(5)
+    bus.close()
+    assert obs.seen == [float(n) for n in range(7)]
+    assert bus.stats()[0].dropped == 0
+
+
+def test_batch_hook_gets_lists(make_config):
+    calc = Calculator(config=make_config())
+    obs = BatchRecorder()
+    calc.register_observer(obs)
+    calc.compute_many("add", [1, 2, 3], [1, 1, 1])
+    calc.close()
+    assert [r for batch in obs.batches for r in batch] == [2.0, 3.0, 4.0]
+
+
+def test_failures_are_counted_not_raised(make_config):
+    class Boom:
+        def on_new_calculation(self, c):
+            raise RuntimeError("observer bug")
+    calc = Calculator(config=make_config())
+    calc.register_observer(Boom())
+    assert calc.compute("add", 1, 1) == 2.0
+    calc.compute("add", 2, 2)
+    assert calc.observers.flush(5)
+    st = calc.observers.stats()[0]
+    assert (st.name, st.delivered, st.errors) == ("Boom", 2, 2)
+    calc.close()
+
+
+def test_shared_bus_outlives_calculators(make_config):
+    bus = ObserverBus()
+    obs = Recorder()
+    bus.register(obs)
+    cfg = make_config()
+    for n in range(3):
+        calc = Calculator(config=cfg, observers=bus)
+        calc.compute("add", n, 0)
+        calc.close()                       # does not close the shared bus
+    bus.close()
+    assert sorted(obs.seen) == [0.0, 1.0, 2.0]
+
+
+def test_observers_command(make_config):
+    calc = Calculator(config=make_config(observer_overflow="coalesce"))
+    registry = build_registry(calc)
+    assert "no observers" in registry.execute("observers", ["observers"])
+    calc.register_observer(Recorder())
+    calc.compute("add", 1, 1)
+    calc.observers.flush(5)
+    out = registry.execute("observers", ["observers"])
+    assert "Recorder" in out and "coalesce" in out and "0/1024" in out
+    assert "Usage" in registry.execute("observers", ["observers", "x"])
+    calc.close()
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        ObserverBus(overflow="sometimes")
+    with pytest.raises(ValueError):
+        ObserverBus().register(Recorder(), overflow="sometimes")
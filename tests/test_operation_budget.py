@@ -0,0 +1,69 @@
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from app.calculator import Calculator
+from app.exceptions import OperationError, ValidationError
+from app.input_validators import validate_bounds, parse_two_numbers, validate_arrays
+from app.operations import OperationFactory, Cost, MAX_LOG10
+
+
+def test_bounds_come_from_max_value():
+    assert validate_bounds("100", -100, max_value=100) == (100, -100)
+    with pytest.raises(ValidationError, match="maximum allowed value of 100"):
+        validate_bounds(101, 1, max_value=np.float64(100))
+    with pytest.raises(ValidationError, match="maximum allowed value of 2.5"):
+        validate_bounds(1, 3, max_value=Decimal("2.5"))
+    cfg = SimpleNamespace(max_input_value=4)
+    assert validate_bounds(1, -5, cfg, config=cfg) == (1, -5)    # a config is not a limit
+    with pytest.raises(ValidationError):
+        parse_two_numbers(["1", "1" + "0" * 400], max_value=1e12)
+    assert validate_bounds(10 ** 400, 1) == (10 ** 400, 1)  # no limit given
+
+
+def test_calculator_enforces_input_bounds(make_config):
+    c = Calculator(config=make_config())
+    with pytest.raises(ValidationError):
+        c.compute("add", 9999999999999, 2)
+    batch = c.compute_many("add", [1.0, 2e12, 3.0], [1.0, 1.0, -5e12])
+    assert batch.failed_indices.tolist() == [1, 2]
+    assert len(c.history) == 1
+
+
+def test_explosive_power_is_rejected_before_computing(make_config):
+    c = Calculator(config=make_config())
+    started = time.perf_counter()
+    with pytest.raises(OperationError, match="Result too large: about 10\\^99,999,999"):
+        c.compute("power", 10, 99999999)
+    with pytest.raises(OperationError, match="too large"):
+        c.compute("root", 10, 0.001)
+    with pytest.raises(OperationError, match="too large"):
+        c.evaluate("10 ^ 99999999")
+    assert time.perf_counter() - started < 0.5
+    assert c.compute("power", 1, 99999999) == 1.0
+    assert c.compute("power", 10, -99999999) == 0.0
+
+
+def test_wide_int_results_fall_back_to_float(make_config):
+    c = Calculator(config=make_config())
+    assert c.compute("power", 3, 5) == 243.0
+    assert c.compute("power", 2, 1000) == float(2 ** 1000)
+    power = OperationFactory.create("power")
+    assert power.estimate(2, 1000) == Cost(pytest.approx(1000 * 0.30103, rel=1e-4), 1000)
+    assert isinstance(power.execute_budgeted(2, 100), float)
+    assert power.execute_budgeted(2, 100, max_bits=128) == 2 ** 100
+
+
+def test_multiply_range_and_cheap_operations(make_config):
+    c = Calculator(config=make_config(max_input_value=1e300))
+    with pytest.raises(OperationError, match="too large"):
+        c.compute("multiply", 1e300, 1e300)
+    assert OperationFactory.create("add").estimate(1e300, 1e300) is None
+    assert OperationFactory.create("multiply").estimate(0, 1e300) is None
+    assert MAX_LOG10 == pytest.approx(308.25, abs=0.01)
+
+
+def test_validate_arrays_reports_out_of_bounds_rows():
+    _, _, errors = validate_arrays([1.0, 5.0, float("nan")], [1.0, 1.0, 1.0], max_value=2.0)
+    assert errors["Input exceeds maximum allowed value of 2."].tolist() == [1]
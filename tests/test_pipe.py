@@ -0,0 +1,61 @@
+import io
+import pytest
+from app import build_registry
+from app.calculator import Calculator
+from app.command import ErrorOutput, OperationCommand
+from app.help import BaseHelp, OperationListHelp
+from app.logger import set_color
+from app.pipe import run_pipe
+
+
+@pytest.fixture
+def plain():
+    set_color(False)
+    yield
+    set_color(True)
+
+
+def _run(make_config, text, **kw):
+    registry = build_registry(Calculator(config=make_config()))
+    out, err = io.StringIO(), io.StringIO()
+    rc = run_pipe(registry, OperationListHelp(BaseHelp()), io.StringIO(text), out, err, **kw)
+    return rc, out.getvalue(), err.getvalue()
+
+
+def test_pipe_streams_results_without_prompt(make_config, plain):
+    rc, out, err = _run(make_config, "add 2 3\n\nmultiply 4 5\nhistory\n", block_lines=2)
+    assert rc == 0
+    lines = out.splitlines()
+    assert lines[:2] == ["add(2.0, 3.0) = 5.0", "multiply(4.0, 5.0) = 20.0"]
+    assert "\x1b[" not in out and ">" not in out
+    assert "Processed 3 commands (0 failed)" in err and "commands/s" in err
+
+
+def test_pipe_continue_policy_reports_failures(make_config, plain):
+    rc, out, err = _run(make_config, "divide 1 0\nbogus\nadd 1 1\n")
+    assert rc == 1
+    assert out.splitlines() == ["Division by zero.", "Unknown command: bogus", "add(1.0, 1.0) = 2.0"]
+    assert "(2 failed)" in err
+
+
+def test_pipe_stop_policy_halts_at_first_error(make_config, plain):
+    rc, out, _ = _run(make_config, "add 1 1\ndivide 1 0\nadd 2 2\n", on_error="stop")
+    assert rc == 1
+    assert "add(2.0, 2.0)" not in out
+
+
+def test_pipe_exit_and_help(make_config, plain):
+    rc, out, _ = _run(make_config, "help\nquit\nadd 1 1\n")
+    assert rc == 0
+    assert "Operation commands:" in out and "add(1.0" not in out
+
+
+def test_pipe_rejects_unknown_policy(make_config):
+    with pytest.raises(ValueError):
+        _run(make_config, "", on_error="ignore")
+
+
+def test_operation_errors_are_marked(make_config, plain):
+    c = Calculator(config=make_config())
+    out = OperationCommand("divide", c.compute).execute(["divide", "1", "0"])
+    assert isinstance(out, ErrorOutput) and out == "Division by zero."
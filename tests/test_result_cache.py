@@ -0,0 +1,59 @@
+import re
+from app.calculator import Calculator
+from app.command import CacheCommand, ErrorOutput
+from app.result_cache import ResultCache
+
+ANSI = re.compile(r"\x1b\[[0-9;]*m")
+
+
+def test_lru_evicts_least_recently_used():
+    cache = ResultCache(max_entries=2)
+    cache.put(("add", 1, 1, 6), 2.0)
+    cache.put(("add", 2, 2, 6), 4.0)
+    assert cache.get(("add", 1, 1, 6)) == 2.0   # refresh entry 1
+    cache.put(("add", 3, 3, 6), 6.0)            # evicts entry 2
+    assert cache.get(("add", 2, 2, 6)) is None
+    st = cache.stats()
+    assert (st.hits, st.misses, st.evictions, st.entries) == (1, 1, 1, 2)
+    assert st.hit_rate == 0.5
+
+
+def test_byte_limit_bounds_memory():
+    cache = ResultCache(max_entries=1000, max_bytes=2000)
+    for i in range(100):
+        cache.put(("add", i, i, 6), float(i))
+    st = cache.stats()
+    assert 0 < st.bytes <= 2000 and st.evictions > 0 and len(cache) < 100
+    cache.put(("power", 10 ** 5000, 1, 6), 1.0)  # single entry larger than the budget
+    assert cache.get(("power", 10 ** 5000, 1, 6)) is None
+    cache.clear()
+    assert len(cache) == 0 and cache.stats().bytes == 0
+
+
+def test_calculator_uses_cache_and_still_records_history(make_config):
+    c = Calculator(config=make_config(cache_enabled=True))
+    assert c.compute("power", 3, 4) == 81.0
+    assert c.compute("power", 3, 4) == 81.0
+    assert c.cache.stats().hits == 1
+    assert len(c.history) == 2
+    shared = Calculator(config=make_config(), cache=c.cache)
+    shared.compute("power", 3, 4)
+    assert c.cache.stats().hits == 2
+
+
+def test_cache_disabled_by_default(make_config):
+    c = Calculator(config=make_config())
+    assert c.cache is None
+    assert "disabled" in CacheCommand(lambda: c.cache).execute(["cache"])
+
+
+def test_cache_command_stats_and_clear(make_config):
+    c = Calculator(config=make_config(cache_enabled=True))
+    c.compute("add", 1, 2)
+    c.compute("add", 1, 2)
+    cmd = CacheCommand(lambda: c.cache)
+    out = ANSI.sub("", cmd.execute(["cache"]))
+    assert "hits       1" in out and "misses     1" in out and "memory" in out
+    assert "cleared" in cmd.execute(["cache", "clear"])
+    assert len(c.cache) == 0
+    assert isinstance(cmd.execute(["cache", "bogus"]), ErrorOutput)
@@ -0,0 +1,60 @@
+from app.calculator import Calculator
+from app.run_file import plan_chunks, run_file, eval_chunk
+
+JOBS = ["add 2 3", "", "divide 1 0", "power 2 10", "bogus 1 2", "multiply 1.5 x", "root 81 4"]
+
+
+def _jobs(tmp_path, repeat=1, encoding="utf-8"):
+    path = tmp_path / "jobs.txt"
+    path.write_text("\n".join(JOBS * repeat) + "\n", encoding=encoding)
+    return str(path)
+
+
+def test_chunks_end_on_line_boundaries(tmp_path):
+    path = _jobs(tmp_path, repeat=20)
+    data = open(path, "rb").read()
+    ranges = plan_chunks(path, chunk_bytes=37)
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(data) and len(ranges) > 5
+    assert all(prev[1] == nxt[0] for prev, nxt in zip(ranges, ranges[1:]))
+    assert all(data[end - 1:end] == b"\n" for _, end in ranges)
+
+
+def test_output_in_input_order_with_global_error_lines(tmp_path):
+    path = _jobs(tmp_path, repeat=30)
+    serial = run_file(path, str(tmp_path / "serial.out"), workers=1, errors_path=str(tmp_path / "e1"))
+    parallel = run_file(path, str(tmp_path / "parallel.out"), workers=2, chunk_bytes=64,
+                        errors_path=str(tmp_path / "e2"))
+    assert (tmp_path / "serial.out").read_text() == (tmp_path / "parallel.out").read_text()
+    assert (tmp_path / "e1").read_text() == (tmp_path / "e2").read_text()
+    assert serial.processed == parallel.processed == 180 and parallel.failed == 90
+    assert parallel.workers == 2 and len(parallel.chunks) > 2
+    out = (tmp_path / "serial.out").read_text().splitlines()
+    assert out[:3] == ["add(2.0, 3.0) = 5.0", "error: Division by zero.", "power(2.0, 10.0) = 1024.0"]
+    errors = (tmp_path / "e1").read_text().splitlines()
+    assert errors[0].startswith("3\t") and errors[1].startswith("5\tUnknown operation")
+    assert errors[3].startswith("10\t")        # second copy of the file: line 7 + 3
+    text = parallel.render()
+    assert "180 lines (90 failed)" in text and "first at line" in text
+
+
+def test_rows_are_bounded_and_import_into_history(tmp_path, make_config):
+    path = _jobs(tmp_path, repeat=10)
+    report = run_file(path, str(tmp_path / "out"), workers=2, chunk_bytes=50, keep=4)
+    assert [r[0] for r in report.rows] == ["root", "add", "power", "root"]
+    assert report.rows[-1] == ("root", 81.0, 4.0, 3.0)
+    calc = Calculator(config=make_config(max_history_size=3))
+    calc.record_rows(report.rows)
+    assert [c.operation for c in calc.history.items] == ["add", "power", "root"]
+    assert calc.history[-1].result == 3.0
+
+
+def test_non_ascii_encoding_runs_as_one_chunk(tmp_path):
+    path = _jobs(tmp_path, repeat=3, encoding="utf-16")
+    report = run_file(path, str(tmp_path / "out"), workers=4, chunk_bytes=16, encoding="utf-16")
+    assert len(report.chunks) == 1 and report.workers == 1 and report.processed == 18
+
+
+def test_eval_chunk_counts_physical_lines(tmp_path):
+    path = _jobs(tmp_path)
+    res = eval_chunk(path, 0, 0, len(open(path, "rb").read()), keep=10)
+    assert res.lines == 7 and len(res.errors) == 3 and len(res.rows) == 3
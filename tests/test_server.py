@@ -0,0 +1,164 @@
+import asyncio
+import json
+import threading
+from app.command import Command
+from app.loadtest import run_load, format_report
+from app.logger import set_color
+from app.server import CalculatorServer
+
+
+def _serve(tmp_path, make_config, scenario, **overrides):
+    """Run ``scenario(server, path)`` against a server on a Unix socket."""
+    set_color(False)
+    server = CalculatorServer(make_config(**overrides))
+    path = str(tmp_path / "calc.sock")
+
+    async def run():
+        await server.start(path=path)
+        try:
+            return await scenario(server, path)
+        finally:
+            await server.shutdown()
+    try:
+        return asyncio.run(run())
+    finally:
+        set_color(True)
+
+
+async def _send(path, *lines):
+    reader, writer = await asyncio.open_unix_connection(path)
+    writer.write("".join(line + "\n" for line in lines).encode())
+    await writer.drain()
+    return reader, writer
+
+
+async def _read(reader, n):
+    return [json.loads(await reader.readline()) for _ in range(n)]
+
+
+def test_handle_line_protocol(make_config):
+    set_color(False)
+    try:
+        server = CalculatorServer(make_config())
+        s = server.new_session()
+        assert server.handle_line(s, b'{"id": 7, "cmd": "add 2 3"}') == \
+            {"id": 7, "ok": True, "output": "add(2.0, 3.0) = 5.0"}
+        assert server.handle_line(s, b"multiply 2 4\n") == {"ok": True, "output": "multiply(2.0, 4.0) = 8.0"}
+        assert server.handle_line(s, b"history")["output"].count("\n") == 1
+        assert server.handle_line(s, b"nope") == {"ok": False, "error": "Unknown command: nope"}
+        assert server.handle_line(s, b"divide 1 0")["ok"] is False
+        assert server.handle_line(s, b"{bad json")["error"].startswith("Bad request")
+        assert server.handle_line(s, b'{"id": 1}') == {"id": 1, "ok": False, "error": "Empty command"}
+        assert server.handle_line(s, b"   ") is None
+        assert "add" in server.handle_line(s, b"help")["output"]
+        assert server.handle_line(s, b"quit")["ok"] and s.closing
+        assert server.requests_total == 7
+    finally:
+        set_color(True)
+
+
+def test_sessions_cannot_touch_server_files(make_config):
+    server = CalculatorServer(make_config())
+    s = server.new_session()
+    for cmd in ("save", "load", "export /tmp/out.csv", "import /etc/passwd"):
+        name = cmd.split()[0]
+        assert server.handle_line(s, cmd.encode()) == {"ok": False, "error": f"Unknown command: {name}"}
+    help_text = server.handle_line(s, b"help")["output"]
+    assert "export" not in help_text and "checkpoint" in help_text
+
+
+def test_a_blocking_command_does_not_stall_other_sessions(tmp_path, make_config):
+    release = threading.Event()
+
+    class Wait(Command):
+        def execute(self, line_parts):
+            release.wait(5)
+            return "done"
+
+    async def scenario(server, path):
+        new_session = server.new_session
+
+        def session_with_wait():
+            s = new_session()
+            s.registry.register("wait", Wait())
+            return s
+        server.new_session = session_with_wait
+        r1, w1 = await _send(path, "wait")
+        r2, w2 = await _send(path, "add 1 1")
+        other = await asyncio.wait_for(_read(r2, 1), 2)      # answered while "wait" blocks
+        release.set()
+        waited = await _read(r1, 1)
+        w1.close()
+        w2.close()
+        return other, waited
+    other, waited = _serve(tmp_path, make_config, scenario)
+    assert other == [{"ok": True, "output": "add(1.0, 1.0) = 2.0"}]
+    assert waited == [{"ok": True, "output": "done"}]
+
+
+def test_pipelined_sessions_are_isolated_and_share_cache(tmp_path, make_config):
+    async def scenario(server, path):
+        r1, w1 = await _send(path, *[json.dumps({"id": i, "cmd": f"add {i} 1"}) for i in range(200)])
+        r2, w2 = await _send(path, "power 2 10", "history")
+        first = await _read(r1, 200)
+        second = await _read(r2, 2)
+        w1.write(b"quit\n")
+        bye = await _read(r1, 1)
+        assert await r1.read() == b""
+        w2.close()
+        return first, second, bye, server
+    first, second, bye, server = _serve(tmp_path, make_config, scenario, cache_enabled=True)
+    assert [r["id"] for r in first] == list(range(200))
+    assert first[-1]["output"] == "add(199.0, 1.0) = 200.0"
+    assert second[1]["output"].startswith("1. power(2.0, 10.0) = 1024.0")
+    assert bye == [{"ok": True, "output": "Bye!"}]
+    assert server.sessions_total == 2 and server.cache is not None and len(server.cache) == 201
+
+
+def test_idle_sessions_are_evicted(tmp_path, make_config):
+    async def scenario(server, path):
+        reader, writer = await _send(path, "add 1 1")
+        replies = await _read(reader, 2)
+        assert await reader.read() == b""
+        return replies, server.sessions
+    replies, live = _serve(tmp_path, make_config, scenario, server_idle_timeout=0.05)
+    assert replies[0]["ok"] and replies[1] == {"event": "idle"} and live == 0
+
+
+def test_shutdown_drains_sessions_and_stops_accepting(tmp_path, make_config):
+    async def scenario(server, path):
+        reader, writer = await _send(path, "add 1 1")
+        await _read(reader, 1)
+        await server.shutdown()
+        notice = await _read(reader, 1)
+        try:
+            await asyncio.open_unix_connection(path)
+            refused = False
+        except OSError:
+            refused = True
+        return notice, refused, server.sessions
+    notice, refused, live = _serve(tmp_path, make_config, scenario)
+    assert notice == [{"event": "shutdown"}] and refused and live == 0
+
+
+def test_busy_and_oversized_requests(tmp_path, make_config):
+    async def scenario(server, path):
+        r1, w1 = await _send(path, "add 1 1")
+        await _read(r1, 1)
+        r2, _ = await _send(path, "add 1 1")
+        busy = await _read(r2, 1)
+        w1.write(b"x" * (70 * 1024))
+        too_long = await _read(r1, 1)
+        return busy, too_long
+    busy, too_long = _serve(tmp_path, make_config, scenario, server_max_sessions=1)
+    assert busy == [{"event": "busy"}]
+    assert too_long == [{"ok": False, "error": "Request line too long"}]
+
+
+def test_loadtest_reports_throughput_and_tail_latency(tmp_path, make_config):
+    async def scenario(server, path):
+        return await run_load(clients=4, requests=50, pipeline=8, path=path)
+    report = _serve(tmp_path, make_config, scenario)
+    assert report["requests"] == 200 and report["errors"] == 0 and report["rps"] > 0
+    assert report["p50_ms"] <= report["p99_ms"] <= report["max_ms"]
+    assert "200 requests (0 errors) from 4 clients" in format_report(report)
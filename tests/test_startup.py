@@ -0,0 +1,21 @@
+from app.startup_bench import import_budget_ms, measure_first_result, measure_import, run
+
+
+def test_import_app_stays_light():
+    results = measure_import(runs=1)
+    assert results[0]["heavy"] == []
+
+
+def test_import_time_within_budget():
+    # best of three fresh interpreters, to ignore one-off disk/cache hiccups
+    best = min(r["ms"] for r in measure_import(runs=3))
+    assert best <= import_budget_ms(), f"import app took {best:.1f}ms (budget {import_budget_ms():.0f}ms)"
+
+
+def test_first_result_and_report(monkeypatch):
+    monkeypatch.setenv("CALCULATOR_IMPORT_BUDGET_MS", "123")
+    assert import_budget_ms() == 123.0
+    session = measure_first_result(runs=1)[0]
+    assert 0 < session["first_result_ms"] <= session["total_ms"]
+    report = run(runs=1)
+    assert set(report) >= {"import_ms", "first_result_ms", "total_ms", "heavy_modules_loaded"}